@@ -0,0 +1,340 @@
+"""
+benchmarks for the seq_tools hot paths on synthetic libraries
+
+    python benchmarks/run.py --size 1k
+    python benchmarks/run.py --size 100k -k mw -o new.json --compare old.json
+
+each benchmark is timed over a whole library, the peak memory of one extra
+run is measured with tracemalloc. Results are written as json so two runs
+can be compared, comparing exits with 1 if anything got slower than the
+threshold
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import tabulate
+from click.testing import CliRunner
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# pylint: disable=wrong-import-position
+from seq_tools import cli, dataframe, dot_bracket, extinction_coeff, sequence
+from seq_tools.structure import SequenceStructure, find
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def generate_library(n_seqs, seed=0, min_len=60, max_len=180) -> pd.DataFrame:
+    """
+    generates a library of random RNA designs, each with one hairpin whose
+    stem is complementary so structures are consistent with the sequences
+    :param n_seqs: number of sequences
+    :param seed: random seed
+    :param min_len: shortest sequence
+    :param max_len: longest sequence
+    :return: dataframe with `name`, `sequence` and `structure` columns
+    """
+    rng = np.random.default_rng(seed)
+    bases = np.frombuffer(b"ACGU", dtype=np.uint8)
+    comp = {ord("A"): "U", ord("C"): "G", ord("G"): "C", ord("U"): "A"}
+    lengths = rng.integers(min_len, max_len + 1, n_seqs)
+    stems = rng.integers(4, 13, n_seqs)
+    loops = rng.integers(3, 9, n_seqs)
+    seqs, structs = [], []
+    for length, stem, loop in zip(lengths, stems, loops):
+        hairpin = 2 * stem + loop
+        p5 = (length - hairpin) // 2
+        p3 = length - hairpin - p5
+        codes = bases[rng.integers(0, 4, length)]
+        stem_seq = codes[p5 : p5 + stem].tobytes().decode("ascii")
+        stem_comp = "".join(comp[c] for c in reversed(stem_seq.encode("ascii")))
+        seq = codes.tobytes().decode("ascii")
+        seq = seq[: p5 + stem + loop] + stem_comp + seq[p5 + hairpin :]
+        seqs.append(seq)
+        structs.append("." * p5 + "(" * stem + "." * loop + ")" * stem + "." * p3)
+    return pd.DataFrame(
+        {
+            "name": [f"seq_{i}" for i in range(n_seqs)],
+            "sequence": seqs,
+            "structure": structs,
+        }
+    )
+
+
+# benchmarks ##################################################################
+# each takes the library and returns a function that runs the benchmark once,
+# MAX_SIZES caps the library size for benchmarks that would take hours
+
+
+def bench_mw_scalar(df):
+    seqs = df["sequence"].tolist()
+    return lambda: [sequence.get_molecular_weight(s, "RNA") for s in seqs]
+
+
+def bench_mw(df):
+    return lambda: dataframe.get_molecular_weight(df, "RNA", False)
+
+
+def bench_rc_scalar(df):
+    seqs = df["sequence"].tolist()
+    return lambda: [sequence.get_reverse_complement(s, "RNA") for s in seqs]
+
+
+def bench_rc(df):
+    return lambda: dataframe.get_reverse_complement(df, "RNA")
+
+
+def bench_ec_scalar(df):
+    rows = list(zip(df["sequence"], df["structure"]))
+    return lambda: [
+        extinction_coeff.get_extinction_coeff(s, "RNA", False, ss) for s, ss in rows
+    ]
+
+
+def bench_ec(df):
+    return lambda: dataframe.get_extinction_coeff(df, "RNA", False)
+
+
+def bench_pairtable(df):
+    structs = df["structure"].tolist()
+    return lambda: [dot_bracket.dotbracket_to_pairtable(ss) for ss in structs]
+
+
+def bench_pairtables(df):
+    return lambda: dot_bracket.dotbracket_to_pairtables(df["structure"])
+
+
+def bench_find(df):
+    rows = [SequenceStructure(s, ss) for s, ss in zip(df["sequence"], df["structure"])]
+    sub = SequenceStructure("GNNNNC", "(....)")
+    return lambda: [find(row, sub) for row in rows]
+
+
+def bench_has_seq_struct(df):
+    sub = SequenceStructure("NNNNN", ".....")
+    return lambda: dataframe.has_seq_struct(df, sub)
+
+
+def bench_edit_distance(df):
+    return lambda: dataframe.calc_edit_distance(df)
+
+
+def bench_max_stretch_scalar(df):
+    seqs = df["sequence"].tolist()
+    return lambda: [sequence.get_max_stretch(s) for s in seqs]
+
+
+def bench_features(df):
+    return lambda: dataframe.get_sequence_features(df, "RNA")
+
+
+def bench_add(df):
+    # without a structure add does not refold
+    df = df.drop(columns=["structure"])
+    return lambda: dataframe.add(df, "GGAAGAUCGAGUAGAUCAAA", "AAAGAAACAACAACAACAAC")
+
+
+def bench_to_dna(df):
+    return lambda: dataframe.to_dna(df)
+
+
+def bench_trim(df):
+    return lambda: dataframe.trim(df, 5, 5)
+
+
+def bench_determine_ntype(df):
+    return lambda: dataframe.determine_ntype(df)
+
+
+def _cli_bench(command, *args):
+    """
+    returns a benchmark that runs a cli command end to end on a csv of the
+    library, including reading and writing files
+    """
+
+    def bench(df):
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "input.csv")
+        df.to_csv(path, index=False)
+        output = os.path.join(tmp_dir, "output.csv")
+        runner = CliRunner()
+
+        def run():
+            result = runner.invoke(command, [path, "-o", output, *args])
+            if result.exit_code != 0:
+                raise RuntimeError(result.output) from result.exception
+
+        return run
+
+    return bench
+
+
+BENCHMARKS = {
+    "sequence.get_molecular_weight": bench_mw_scalar,
+    "dataframe.get_molecular_weight": bench_mw,
+    "sequence.get_reverse_complement": bench_rc_scalar,
+    "dataframe.get_reverse_complement": bench_rc,
+    "extinction_coeff.get_extinction_coeff": bench_ec_scalar,
+    "dataframe.get_extinction_coeff": bench_ec,
+    "dot_bracket.dotbracket_to_pairtable": bench_pairtable,
+    "dot_bracket.dotbracket_to_pairtables": bench_pairtables,
+    "structure.find": bench_find,
+    "dataframe.has_seq_struct": bench_has_seq_struct,
+    "dataframe.calc_edit_distance": bench_edit_distance,
+    "dataframe.determine_ntype": bench_determine_ntype,
+    "sequence.get_max_stretch": bench_max_stretch_scalar,
+    "dataframe.get_sequence_features": bench_features,
+    "dataframe.add": bench_add,
+    "dataframe.to_dna": bench_to_dna,
+    "dataframe.trim": bench_trim,
+    "cli.mw": _cli_bench(cli.mw, "-nt", "RNA"),
+    "cli.ec": _cli_bench(cli.ec, "-nt", "RNA"),
+    "cli.rc": _cli_bench(cli.rc, "-nt", "RNA"),
+    "cli.to_dna": _cli_bench(cli.to_dna),
+    "cli.trim": _cli_bench(cli.trim, "-p5", "5", "-p3", "5"),
+}
+MAX_SIZES = {"dataframe.calc_edit_distance": 10_000}
+
+
+# running #####################################################################
+
+
+def time_benchmark(func, repeat) -> dict:
+    """
+    times a benchmark and measures its peak memory
+    :param func: function that runs the benchmark once
+    :param repeat: number of timed runs
+    :return: dictionary with min and median seconds and peak memory in MB
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min": min(times),
+        "median": float(np.median(times)),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def get_meta(size) -> dict:
+    """
+    returns information about the run stored with the results
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "size": size,
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def compare(results, old_results, threshold) -> list:
+    """
+    compares the min time of each benchmark to a previous run
+    :param results: results of this run
+    :param old_results: results of a previous run
+    :param threshold: ratio of new to old time that counts as a regression
+    :return: names of the benchmarks that regressed
+    """
+    rows, regressed = [], []
+    for name, res in results.items():
+        if name not in old_results:
+            continue
+        ratio = res["min"] / old_results[name]["min"]
+        mem_ratio = res["peak_mb"] / max(old_results[name]["peak_mb"], 1e-9)
+        status = ""
+        if ratio > threshold:
+            status = "SLOWER"
+            regressed.append(name)
+        elif ratio < 1 / threshold:
+            status = "faster"
+        rows.append(
+            [name, old_results[name]["min"], res["min"], ratio, mem_ratio, status]
+        )
+    print(
+        tabulate.tabulate(
+            rows,
+            headers=["benchmark", "old (s)", "new (s)", "time ratio", "mem ratio", ""],
+            floatfmt=".3f",
+        )
+    )
+    return regressed
+
+
+def main():
+    """
+    runs the benchmarks
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", default="1k", choices=list(SIZES))
+    parser.add_argument("-k", default="", help="only run benchmarks matching this")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default=None, help="write results json")
+    parser.add_argument("--compare", default=None, help="results json to compare to")
+    parser.add_argument(
+        "--threshold", type=float, default=1.2, help="time ratio that is a regression"
+    )
+    args = parser.parse_args()
+    n_seqs = SIZES[args.size]
+    df = generate_library(n_seqs)
+    results = {}
+    rows = []
+    for name, bench in BENCHMARKS.items():
+        if args.k not in name:
+            continue
+        if n_seqs > MAX_SIZES.get(name, n_seqs):
+            print(f"skipping {name}, it is capped at {MAX_SIZES[name]} sequences")
+            continue
+        res = time_benchmark(bench(df), args.repeat)
+        results[name] = res
+        rows.append([name, res["min"], res["median"], res["peak_mb"]])
+        print(f"{name}: {res['min']:.3f}s")
+    print(
+        tabulate.tabulate(
+            rows,
+            headers=["benchmark", "min (s)", "median (s)", "peak (MB)"],
+            floatfmt=".3f",
+        )
+    )
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": get_meta(args.size), "results": results}, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if old["meta"]["size"] != args.size:
+            print(f"warning: comparing to a run of size {old['meta']['size']}")
+        if compare(results, old["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,26 +6,60 @@ __author__ = "Joe Yesselman"
 __email__ = "jyesselm@unl.edu"
 __version__ = "0.7.2"
 
-from .dataframe import (
-    add,
-    calc_edit_distance,
-    determine_ntype,
-    fold,
-    has_sequence,
-    has_t7_promoter,
-    has_5p_sequence,
-    has_3p_sequence,
-    has_seq_struct,
-    get_default_names,
-    get_extinction_coeff,
-    get_length,
-    get_molecular_weight,
-    get_reverse_complement,
-    to_dna,
-    to_dna_template,
-    to_fasta,
-    to_rna,
-    trim,
-    transcribe,
-)
-from .structure import SequenceStructure
+import importlib
+
+# public names and the module they are defined in. They are imported on first
+# use so `import seq_tools` and the cli do not load pandas and vienna until a
+# function needing them is called
+_EXPORTS = {
+    "add": "dataframe",
+    "calc_edit_distance": "dataframe",
+    "determine_ntype": "dataframe",
+    "find_seq_struct": "dataframe",
+    "fold": "dataframe",
+    "from_packed": "dataframe",
+    "has_sequence": "dataframe",
+    "has_t7_promoter": "dataframe",
+    "has_5p_sequence": "dataframe",
+    "has_3p_sequence": "dataframe",
+    "has_seq_struct": "dataframe",
+    "get_default_names": "dataframe",
+    "get_extinction_coeff": "dataframe",
+    "get_length": "dataframe",
+    "get_nearest_neighbors": "dataframe",
+    "get_ntypes": "dataframe",
+    "get_sequence_features": "dataframe",
+    "get_molecular_weight": "dataframe",
+    "get_reverse_complement": "dataframe",
+    "to_dna": "dataframe",
+    "to_dna_template": "dataframe",
+    "to_fasta": "dataframe",
+    "to_packed": "dataframe",
+    "to_rna": "dataframe",
+    "trim": "dataframe",
+    "transcribe": "dataframe",
+    "read_library": "fileio",
+    "write_library": "fileio",
+    "Pipeline": "lazy",
+    "pipeline": "lazy",
+    "SequenceLibrary": "library",
+    "PackedSequenceArray": "packed",
+    "KmerIndex": "structure",
+    "SequenceStructure": "structure",
+    "SequenceStructureQuery": "structure",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,40 +1,50 @@
 """
 commandline interface for seq_tools
 """
+
+# pandas, tabulate and the seq_tools modules that need them are imported
+# inside the functions using them so `--help` and commands that do not need
+# them start fast
+# pylint: disable=import-outside-toplevel
 import os
 import click
-import tabulate
-import pandas as pd
 
-from seq_tools import sequence, dataframe
 from seq_tools.logger import setup_applevel_logger, get_logger
 
-pd.set_option("display.max_colwidth", None)
+# columns loaded by commands that only need the sequences
+SEQUENCE_COLUMNS = ["name", "sequence"]
 
 
-def validate_dataframe(df) -> None:
+def validate_dataframe(df, offset=0) -> None:
     """
     validates a dataframe to have a column named `sequence` and `name`
     :param df: dataframe with sequences
+    :param offset: row number of the first row, used to name chunks of a file
     :return: None
     """
     if "sequence" not in df.columns:
         raise ValueError("sequence column not found")
     if "name" not in df.columns:
-        df["name"] = [f"seq_{i}" for i in range(len(df))]
+        df["name"] = [f"seq_{i}" for i in range(offset, offset + len(df))]
 
 
-def get_input_dataframe(data) -> pd.DataFrame:
+def get_input_dataframe(data, columns=None):
     """
     returns a dataframe from a sequence or a file
-    :param data: can be a seqeunce or a file
+    :param data: can be a seqeunce or a file, csv, parquet, feather, fasta, fastq
+    or seqlib
+    :param columns: only load these columns from a file
     :return: pd.DataFrame
     """
+    import pandas as pd
+
+    from seq_tools.fileio import read_library
+
     log = get_logger("get_input_dataframe")
     if os.path.isfile(data):
         log.info(f"reading file {data}")
-        df = pd.read_csv(data)
-        log.info(f"csv file contains {len(df)} sequences")
+        df = read_library(data, columns, memory_map=True)
+        log.info(f"file contains {len(df)} sequences")
     else:
         log.info(f"reading sequence {data}")
         data_df = [["seq", data]]
@@ -43,6 +53,30 @@ def get_input_dataframe(data) -> pd.DataFrame:
     return df
 
 
+def get_input_chunks(data, chunksize=None, columns=None):
+    """
+    yields the input dataframe in chunks of at most chunksize rows, only one
+    chunk of a file is held in memory at a time
+    :param data: can be a sequence or a file, csv, parquet, feather, fasta or fastq
+    :param chunksize: number of rows per chunk, None reads everything at once
+    :param columns: only load these columns from a file
+    :return: generator of pd.DataFrame
+    """
+    if chunksize is None or not os.path.isfile(data):
+        yield get_input_dataframe(data, columns)
+        return
+    from seq_tools.fileio import read_library_chunks
+
+    log = get_logger("get_input_chunks")
+    log.info(f"reading file {data} in chunks of {chunksize} sequences")
+    offset = 0
+    for df in read_library_chunks(data, chunksize, columns, memory_map=True):
+        validate_dataframe(df, offset)
+        offset += len(df)
+        yield df
+    log.info(f"file contains {offset} sequences")
+
+
 def get_ntype(df, ntype) -> str:
     """
     handles the ntype parameter
@@ -50,6 +84,8 @@ def get_ntype(df, ntype) -> str:
     :param ntype: nucleotide type
     :return: str
     """
+    from seq_tools import dataframe
+
     log = get_logger("handle_ntype")
     df_ntype = dataframe.determine_ntype(df)
     log.info(f"determining nucleic acid type: {df_ntype}")
@@ -69,28 +105,202 @@ def handle_output(df, output) -> None:
     """
     handles the output of the dataframe
     :param df: dataframe with sequences
-    :param output: output file
+    :param output: output file, csv, parquet, feather, fasta or fastq
     :return: None
     """
+    import pandas as pd
+    import tabulate
+
+    from seq_tools.fileio import write_library
+
     log = get_logger("handle_output")
     if len(df) == 1:
-        log.info(f"output->\n{df.iloc[0]}")
+        with pd.option_context("display.max_colwidth", None):
+            log.info(f"output->\n{df.iloc[0]}")
     else:
-        log.info(f"output csv: {output}")
+        log.info(f"output file: {output}")
         if len(df) > 100:
             log.info(
                 "\n" + tabulate.tabulate(df[0:100], headers="keys", tablefmt="simple")
             )
         else:
             log.info("\n" + tabulate.tabulate(df, headers="keys", tablefmt="simple"))
-        df.to_csv(output, index=False)
+        write_library(df, output)
+
+
+def handle_chunked_output(chunks, output, summary_col=None) -> tuple:
+    """
+    writes chunks of the output dataframe to a file as they are produced
+    :param chunks: iterable of dataframes with the same columns
+    :param output: output file, csv, parquet, feather, fasta or fastq
+    :param summary_col: column to average over all rows
+    :return: number of rows written and the mean of summary_col, None if
+    summary_col is not given
+    """
+    import tabulate
+
+    from seq_tools.fileio import LibraryWriter
+
+    log = get_logger("handle_output")
+    log.info(f"output file: {output}")
+    total, count = 0.0, 0
+    with LibraryWriter(output) as writer:
+        for i, df in enumerate(chunks):
+            if i == 0:
+                log.info(
+                    "\n"
+                    + tabulate.tabulate(df[0:100], headers="keys", tablefmt="simple")
+                )
+            writer.write(df)
+            count += len(df)
+            if summary_col is not None:
+                total += df[summary_col].sum()
+    if summary_col is None or count == 0:
+        return count, None
+    return count, total / count
+
+
+def process_input(
+    data, output, chunksize, func, summary_col=None, columns=None
+) -> tuple:
+    """
+    reads the input, applies func and handles the output. If chunksize is
+    given and data is a file it is read, transformed and written chunk by
+    chunk so memory stays bounded by the chunksize
+    :param data: can be a sequence or a file
+    :param output: output file
+    :param chunksize: number of rows per chunk, None reads everything at once
+    :param func: function that takes and returns a dataframe, must only use
+    values within each row
+    :param summary_col: column to average over all rows
+    :param columns: only load these columns from a file
+    :return: number of rows and the mean of summary_col
+    """
+    if chunksize is None or not os.path.isfile(data):
+        df = func(get_input_dataframe(data, columns))
+        handle_output(df, output)
+        if summary_col is None:
+            return len(df), None
+        return len(df), df[summary_col].mean()
+    chunks = (func(df) for df in get_input_chunks(data, chunksize, columns))
+    return handle_chunked_output(chunks, output, summary_col)
+
+
+def ntype_resolver(ntype):
+    """
+    returns a function that handles the ntype parameter on the first dataframe
+    it is given and reuses that ntype for every later chunk. Every chunk is
+    still classified, so a library that mixes DNA and RNA across chunks is
+    rejected like dataframe.determine_ntype rejects it
+    :param ntype: nucleotide type, None determines it from the sequences
+    :return: function that takes a dataframe and returns the ntype
+    """
+    state = {"ntype": None, "dna": False, "rna": False, "bases": 0, "rows": 0}
+
+    def resolve(df) -> str:
+        from seq_tools import dataframe
+
+        if state["ntype"] is None:
+            state["ntype"] = get_ntype(df, ntype)
+        ntypes = dataframe.get_ntypes(df)
+        state["dna"] = state["dna"] or bool((ntypes == "DNA").any())
+        state["rna"] = state["rna"] or bool((ntypes == "RNA").any())
+        state["bases"] += int(df["sequence"].str.len().sum())
+        state["rows"] += len(df)
+        # the same rule as determine_ntype over the rows seen so far
+        if state["dna"] and state["rna"] and state["bases"] > 10 * state["rows"]:
+            raise ValueError("Cannot determine nucleotide type")
+        return state["ntype"]
+
+    return resolve
+
+
+def fold_cache_options(func):
+    """
+    adds the fold cache database and its size limits to a command
+    """
+    options = [
+        click.option(
+            "--cache", default=None, help="fold cache database, $SEQ_TOOLS_FOLD_CACHE"
+        ),
+        click.option(
+            "--cache-max-memory",
+            type=int,
+            default=None,
+            help="max folds kept in memory, 0 disables the memory tier",
+        ),
+        click.option(
+            "--cache-max-disk",
+            type=int,
+            default=None,
+            help="max folds kept in the database, the least recently used go first",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def get_fold_cache(cache, max_memory=None, max_disk=None):
+    """
+    returns the shared fold cache with the given limits used by a command
+    :param cache: fold cache database given to the command, None uses
+    $SEQ_TOOLS_FOLD_CACHE
+    :param max_memory: max folds kept in memory
+    :param max_disk: max folds kept in the database
+    :return: folding.FoldCache
+    """
+    from seq_tools import folding
+
+    if cache:
+        return folding.get_cache(cache, max_memory, max_disk)
+    return folding.get_default_cache(max_memory, max_disk)
+
+
+def log_fold_cache(fold_cache, before) -> None:
+    """
+    logs the hits and misses of the fold cache during a command, nothing is
+    logged if the command did not fold
+    :param fold_cache: folding.FoldCache from get_fold_cache
+    :param before: copy of fold_cache.stats from before the command ran, the
+    cache is shared by the process
+    :return: None
+    """
+    stats = {key: fold_cache.stats[key] - before[key] for key in before}
+    if stats["memory_hits"] + stats["disk_hits"] + stats["misses"] == 0:
+        return
+    log = get_logger("fold_cache")
+    log.info(
+        f"fold cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} "
+        f"disk hits, {stats['misses']} misses"
+    )
 
 
 @click.group()
-def cli():
+@click.option(
+    "--profile",
+    "profile_path",
+    default=None,
+    help="write a json report of the time, rows/s and memory of each operation",
+)
+@click.option("--cprofile", default=None, help="dump cProfile stats of the run")
+@click.pass_context
+def cli(ctx, profile_path, cprofile):
     """
     a set scripts to manipulate sequences in csv files
     """
+    if profile_path is None and cprofile is None:
+        return
+    from seq_tools import profiling
+
+    profiler = profiling.profile(profile_path, cprofile)
+    profiler.start()
+
+    def finish():
+        profiler.stop()
+        profiler.log_report()
+
+    ctx.call_on_close(finish)
 
 
 @cli.command(help="add a sequence to 5' and/or 3'")
@@ -98,32 +308,78 @@ def cli():
 @click.option("-p5", "--p5-seq", default="")
 @click.option("-p3", "--p3-seq", default="")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def add(data, p5_seq, p3_seq, output):
+@click.option(
+    "-j", "--jobs", default=1, help="number of processes to fold with, 0 uses all"
+)
+@fold_cache_options
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def add(
+    data,
+    p5_seq,
+    p3_seq,
+    output,
+    jobs,
+    cache,
+    cache_max_memory,
+    cache_max_disk,
+    chunksize,
+):
     """
     adds a sequence to a dataframe
     :param data: can be a sequence or a file
     :param p5_seq: sequence to add to 5'
     :param p3_seq: sequence to add to 3'
     :param output: output file
+    :param jobs: number of processes used to refold
+    :param cache: fold cache database
+    :param cache_max_memory: max folds kept in memory
+    :param cache_max_disk: max folds kept in the database
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = dataframe.add(df, p5_seq, p3_seq)
-    handle_output(df, output)
+    fold_cache = get_fold_cache(cache, cache_max_memory, cache_max_disk)
+    before = dict(fold_cache.stats)
+    process_input(
+        data,
+        output,
+        chunksize,
+        lambda df: dataframe.add(df, p5_seq, p3_seq, jobs, fold_cache),
+    )
+    log_fold_cache(fold_cache, before)
 
 
 @cli.command(help="calculate the edit distance of a library")
 @click.argument("data", type=click.Path(exists=True))
-def edit_distance(data):
+@click.option(
+    "-j", "--jobs", default=1, help="number of processes to search with, 0 uses all"
+)
+@click.option(
+    "-o", "--output", default=None, help="write each sequence's nearest neighbour"
+)
+def edit_distance(data, jobs, output):
     """
     calculates the edit distance of a library
     :param data: can be a sequence or a file
+    :param jobs: number of processes to search with
+    :param output: optional output file for the nearest neighbour of each sequence
     """
+    from seq_tools import dataframe
+    from seq_tools.fileio import read_library, write_library
+
     setup_applevel_logger()
-    df = pd.read_csv(data)
-    score = dataframe.calc_edit_distance(df)
+    df = read_library(data, ["name", "sequence"], memory_map=True)
     log = get_logger("edit_distance")
-    log.info(f"edit distance: {score}")
+    if len(df) == 1:
+        log.info("edit distance: 0")
+        return
+    df = dataframe.get_nearest_neighbors(df, jobs)
+    log.info(f"edit distance: {df['edit_distance'].mean()}")
+    if output is not None:
+        write_library(df, output)
 
 
 @cli.command(help="calculate the extinction coefficient for each sequence")
@@ -137,22 +393,36 @@ def edit_distance(data):
 )
 @click.option("-ds", "--double-stranded", is_flag=True)
 @click.option("-o", "--output", help="output file", default="output.csv")
-def ec(data, ntype, double_stranded, output):
+@click.option("-j", "--jobs", default=1, help="number of threads, 0 uses all")
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def ec(data, ntype, double_stranded, output, jobs, chunksize):
     """
     calculates the extinction coefficient for each sequence
     :param data: can be a sequence or a file
     :param ntype: type of nucleic acid
     :param double_stranded: if the sequence is double stranded
     :param output: output file
+    :param jobs: number of threads
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
     log = get_logger("extinction_coeff")
-    df = get_input_dataframe(data)
-    ntype = get_ntype(df, ntype)
-    df = dataframe.get_extinction_coeff(df, ntype, double_stranded)
-    handle_output(df, output)
-    if len(df) != 1:
-        log.info("avg extinction coefficient: " + str(df["extinction_coeff"].mean()))
+    get_chunk_ntype = ntype_resolver(ntype)
+    count, avg = process_input(
+        data,
+        output,
+        chunksize,
+        lambda df: dataframe.get_extinction_coeff(
+            df, get_chunk_ntype(df), double_stranded, jobs, "thread"
+        ),
+        "extinction_coeff",
+    )
+    if count != 1:
+        log.info("avg extinction coefficient: " + str(avg))
 
 
 @cli.command(help="calculate the molecular weight for each sequence")
@@ -166,22 +436,37 @@ def ec(data, ntype, double_stranded, output):
 )
 @click.option("-ds", "--double-stranded", is_flag=True)
 @click.option("-o", "--output", help="output file", default="output.csv")
-def mw(data, ntype, double_stranded, output):
+@click.option("-j", "--jobs", default=1, help="number of threads, 0 uses all")
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def mw(data, ntype, double_stranded, output, jobs, chunksize):
     """
     calculates the molecular weight for each sequence
     :param data:
     :param double_stranded:
     :param output:
+    :param jobs: number of threads
+    :param chunksize: number of rows per chunk for csv files
     :return:
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    ntype = get_ntype(df, ntype)
-    df = dataframe.get_molecular_weight(df, ntype, double_stranded)
-    handle_output(df, output)
+    get_chunk_ntype = ntype_resolver(ntype)
+    count, avg = process_input(
+        data,
+        output,
+        chunksize,
+        lambda df: dataframe.get_molecular_weight(
+            df, get_chunk_ntype(df), double_stranded, jobs, "thread"
+        ),
+        "mw",
+        columns=SEQUENCE_COLUMNS,
+    )
     log = get_logger("molecular_weight")
-    if len(df) != 1:
-        log.info("avg molecular weight: " + str(df["molecular_weight"].mean()))
+    if count != 1:
+        log.info("avg molecular weight: " + str(avg))
 
 
 @cli.command(help="calculate reverse complement for each sequence")
@@ -194,31 +479,63 @@ def mw(data, ntype, double_stranded, output):
     help="type of nucleic acid",
 )
 @click.option("-o", "--output", help="output file", default="output.csv")
-def rc(data, ntype, output):
+@click.option("-j", "--jobs", default=1, help="number of threads, 0 uses all")
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def rc(data, ntype, output, jobs, chunksize):
     """
     calculates the reverse complement for each sequence
     :param data: can be a sequence or a file
     :param output: output file
+    :param jobs: number of threads
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    ntype = get_ntype(df, ntype)
-    df = dataframe.get_reverse_complement(df, ntype)
-    handle_output(df, output)
+    get_chunk_ntype = ntype_resolver(ntype)
+    process_input(
+        data,
+        output,
+        chunksize,
+        lambda df: dataframe.get_reverse_complement(
+            df, get_chunk_ntype(df), jobs, "thread"
+        ),
+        columns=SEQUENCE_COLUMNS,
+    )
 
 
 @cli.command(help="fold rna sequences")
 @click.argument("data")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def fold(data, output):
+@click.option(
+    "-j", "--jobs", default=1, help="number of processes to fold with, 0 uses all"
+)
+@fold_cache_options
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def fold(data, output, jobs, cache, cache_max_memory, cache_max_disk, chunksize):
     """
     fold rna sequences
     :param data: can be a sequence or a file
+    :param output: output file
+    :param jobs: number of processes to fold with
+    :param cache: fold cache database
+    :param cache_max_memory: max folds kept in memory
+    :param cache_max_disk: max folds kept in the database
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = dataframe.fold(df)
-    handle_output(df, output)
+    fold_cache = get_fold_cache(cache, cache_max_memory, cache_max_disk)
+    before = dict(fold_cache.stats)
+    process_input(
+        data, output, chunksize, lambda df: dataframe.fold(df, jobs, fold_cache)
+    )
+    log_fold_cache(fold_cache, before)
 
 
 @cli.command(help="checks to see if p5 is present in all sequences")
@@ -231,22 +548,31 @@ def fold(data, output):
     type=click.Choice([None, "RNA", "DNA"]),
     help="type of nucleic acid",
 )
-def has_p5(data, p5_seq, ntype):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def has_p5(data, p5_seq, ntype, chunksize):
     """
     checks if a sequence has a p5 sequence
     :param data: can be a sequence or a file
     :param p5_seq: p5 sequence
     :param ntype: type of nucleic acid
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    get_ntype(df, ntype)
-    has_p5_seq = dataframe.has_5p_sequence(df, p5_seq)
     log = get_logger("has_p5")
-    if has_p5_seq:
-        log.info("p5 sequence is present in all sequences")
-    else:
-        log.info("p5 sequence is not present in all sequences")
+    # stop reading at the first chunk with a missing sequence
+    for df in get_input_chunks(data, chunksize):
+        get_ntype(df, ntype)
+        present, failed = dataframe.has_5p_sequence(df, p5_seq, True, 10)
+        if not present:
+            labels = df.loc[failed, "name"] if "name" in df.columns else failed
+            log.info("p5 sequence is not present in all sequences")
+            log.info(f"first sequences without it: {', '.join(map(str, labels))}")
+            return
+    log.info("p5 sequence is present in all sequences")
 
 
 @cli.command(help="checks to see if p3 is present in all sequences")
@@ -259,50 +585,69 @@ def has_p5(data, p5_seq, ntype):
     type=click.Choice([None, "RNA", "DNA"]),
     help="type of nucleic acid",
 )
-def has_p3(data, p3_seq, ntype):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def has_p3(data, p3_seq, ntype, chunksize):
     """
     checks if a sequence has a p3 sequence
     :param data: can be a sequence or a file
     :param p3_seq: p3 sequence
     :param ntype: type of nucleic acid
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    get_ntype(df, ntype)
-    has_p3_seq = dataframe.has_5p_sequence(df, p3_seq)
     log = get_logger("has_p3")
-    if has_p3_seq:
-        log.info("p3 sequence is present in all sequences")
-    else:
-        log.info("p3 sequence is not present in all sequences")
+    # stop reading at the first chunk with a missing sequence
+    for df in get_input_chunks(data, chunksize):
+        get_ntype(df, ntype)
+        present, failed = dataframe.has_3p_sequence(df, p3_seq, True, 10)
+        if not present:
+            labels = df.loc[failed, "name"] if "name" in df.columns else failed
+            log.info("p3 sequence is not present in all sequences")
+            log.info(f"first sequences without it: {', '.join(map(str, labels))}")
+            return
+    log.info("p3 sequence is present in all sequences")
 
 
 @cli.command(help="convert rna sequence(s) to dna")
 @click.argument("data")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def to_dna(data, output):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def to_dna(data, output, chunksize):
     """
     Convert RNA sequence to DNA
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = df[["name", "sequence"]]
-    df = dataframe.to_dna(df)
-    handle_output(df, output)
+    process_input(data, output, chunksize, dataframe.to_dna, columns=SEQUENCE_COLUMNS)
 
 
 @cli.command(help="convert rna sequence(s) to dna template, includes T7 promoter")
 @click.argument("data")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def to_dna_template(data, output):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def to_dna_template(data, output, chunksize):
     """
     Convert RNA sequence to DNA
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = df[["name", "sequence"]]
-    df = dataframe.to_dna_template(df)
-    handle_output(df, output)
+    process_input(
+        data,
+        output,
+        chunksize,
+        dataframe.to_dna_template,
+        columns=SEQUENCE_COLUMNS,
+    )
 
 
 @cli.command(help="generate fasta file from csv")
@@ -314,6 +659,8 @@ def to_fasta(data, output):
     :param data: can be a sequence or a file
     :param output: output file
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
     df = get_input_dataframe(data)
     dataframe.to_fasta(df, output)
@@ -329,6 +676,8 @@ def to_opool(data, name, output):
     :param data: can be a sequence or a file
     :param output: output file
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
     df = get_input_dataframe(data)
     dataframe.to_opool(df, name, output)
@@ -337,16 +686,124 @@ def to_opool(data, name, output):
 @cli.command(help="convert rna sequence(s) to dna")
 @click.argument("data")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def to_rna(data, output):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def to_rna(data, output, chunksize):
     """
     Convert DNA sequence to RNA
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = df[["name", "sequence"]]
-    # apply sequence.to_dna to `sequence` column
-    df["sequence"] = df["sequence"].apply(sequence.to_rna)
-    handle_output(df, output)
+    process_input(data, output, chunksize, dataframe.to_rna, columns=SEQUENCE_COLUMNS)
+
+
+@cli.command(help="run a chain of steps, e.g. to-dna-template ec mw")
+@click.argument("data")
+@click.argument("steps", nargs=-1)
+@click.option(
+    "-s", "--spec", type=click.Path(exists=True), help="json or yaml file of steps"
+)
+@click.option(
+    "-nt",
+    "--ntype",
+    default=None,
+    type=click.Choice([None, "RNA", "DNA"]),
+    help="type of nucleic acid",
+)
+@click.option("-o", "--output", help="output file", default="output.csv")
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def run(data, steps, spec, ntype, output, chunksize):
+    """
+    runs a chain of steps on the input and writes the output once. Steps are
+    written as `name` or `name:arg,arg,key=value`, e.g. `trim:20,0` or
+    `mw:double_stranded=true`, see lazy.parse_step
+    :param data: can be a sequence or a file
+    :param steps: steps to run in order
+    :param spec: json or yaml file with steps to run before the steps given
+    :param ntype: type of nucleic acid of the input
+    :param output: output file
+    :param chunksize: number of rows per chunk for csv files
+    """
+    from seq_tools import lazy
+
+    setup_applevel_logger()
+    log = get_logger("run")
+    try:
+        all_steps = lazy.load_steps(spec) if spec is not None else []
+        all_steps += [lazy.parse_step(step) for step in steps]
+    except ValueError as exc:
+        raise click.BadParameter(str(exc)) from exc
+    if not all_steps:
+        raise click.UsageError("no steps given")
+    log.info("steps: " + " -> ".join(name for name, _ in all_steps))
+    # every chunk must use the type of the whole input
+    get_chunk_ntype = ntype_resolver(ntype) if chunksize is not None else None
+
+    def run_chunk(df):
+        chunk_ntype = ntype if get_chunk_ntype is None else get_chunk_ntype(df)
+        return lazy.build_pipeline(df, all_steps).collect(chunk_ntype)
+
+    process_input(data, output, chunksize, run_chunk)
+
+
+@cli.command(help="keep a warm process answering requests, see seq-tools client")
+@click.option("-s", "--socket", "socket_path", default=None, help="unix socket path")
+@click.option("--stdio", is_flag=True, help="read json lines from stdin instead")
+@fold_cache_options
+def serve(socket_path, stdio, cache, cache_max_memory, cache_max_disk):
+    """
+    serves cli requests over a unix socket or stdin json lines
+    :param socket_path: unix socket path, defaults to $SEQ_TOOLS_SOCKET
+    :param stdio: serve stdin json lines instead of a socket
+    :param cache: fold cache database
+    :param cache_max_memory: max folds kept in memory
+    :param cache_max_disk: max folds kept in the database
+    """
+    from seq_tools import server
+
+    cache = get_fold_cache(cache, cache_max_memory, cache_max_disk)
+    if stdio:
+        server.serve_stdio(cache)
+        return
+    setup_applevel_logger()
+    log = get_logger("serve")
+    path = socket_path or server.get_default_socket()
+    log.info(f"serving on {path}")
+    try:
+        server.serve_socket(path, cache)
+    except KeyboardInterrupt:
+        log.info("stopped")
+
+
+@cli.command(
+    help="run a command in a running seq-tools serve",
+    context_settings={"ignore_unknown_options": True},
+)
+@click.option("-s", "--socket", "socket_path", default=None, help="unix socket path")
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def client(socket_path, args):
+    """
+    sends a command to a running server and prints the response, e.g.
+    `seq-tools client mw GGGGUUUUCCCC`
+    :param socket_path: unix socket path, defaults to $SEQ_TOOLS_SOCKET
+    :param args: command and its arguments
+    """
+    import json
+
+    from seq_tools.server import Client
+
+    with Client(socket_path) as conn:
+        response = conn.call(args)
+    if not response["ok"]:
+        raise click.ClickException(response["error"])
+    if "result" in response:
+        click.echo(json.dumps(response["result"]))
+    else:
+        click.echo(response["output"], nl=False)
 
 
 @cli.command(help="trim 5'/3' ends of sequences")
@@ -354,32 +811,53 @@ def to_rna(data, output):
 @click.option("-p5", "--p5-cut", default=0)
 @click.option("-p3", "--p3-cut", default=0)
 @click.option("-o", "--output", help="output file", default="output.csv")
-def trim(data, p5_cut, p3_cut, output):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def trim(data, p5_cut, p3_cut, output, chunksize):
     """
     trim 5'/3' ends of sequences
     :param data: can be a sequence or a file
     :param p5_cut: trim off 5' end
     :param p3_cut: trim off 3' end
     :param output: output file
+    :param chunksize: number of rows per chunk for csv files
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = dataframe.trim(df, p5_cut, p3_cut)
-    handle_output(df, output)
+    process_input(
+        data, output, chunksize, lambda df: dataframe.trim(df, p5_cut, p3_cut)
+    )
 
 
 @cli.command(help="convert dna sequence(s) to rna")
 @click.argument("data")
 @click.option("-o", "--output", help="output file", default="output.csv")
-def transcribe(data, output):
+@click.option(
+    "-j", "--jobs", default=1, help="number of processes to fold with, 0 uses all"
+)
+@fold_cache_options
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="rows per chunk for csv files"
+)
+def transcribe(data, output, jobs, cache, cache_max_memory, cache_max_disk, chunksize):
     """
     Convert DNA sequence to RN
     """
+    from seq_tools import dataframe
+
     setup_applevel_logger()
-    df = get_input_dataframe(data)
-    df = df[["name", "sequence"]]
-    df = dataframe.transcribe(df)
-    handle_output(df, output)
+    fold_cache = get_fold_cache(cache, cache_max_memory, cache_max_disk)
+    before = dict(fold_cache.stats)
+    process_input(
+        data,
+        output,
+        chunksize,
+        lambda df: dataframe.transcribe(df, workers=jobs, cache=fold_cache),
+        columns=SEQUENCE_COLUMNS,
+    )
+    log_fold_cache(fold_cache, before)
 
 
 # pylint: disable=no-value-for-parameter
@@ -1,125 +1,196 @@
 """
 module for working with dataframes that contain nucleotide sequences
 """
+
+import functools
+
 import pandas as pd
 import numpy as np
-import editdistance
-import vienna
 
-from seq_tools import sequence, extinction_coeff
+from seq_tools import (
+    edit_distance,
+    encoding,
+    extinction_coeff,
+    fileio,
+    folding,
+    parallel,
+    profiling,
+    sequence,
+)
+from seq_tools.packed import PackedSequenceArray
 from seq_tools.structure import SequenceStructure
-from seq_tools.structure import find as find_seq_struct
+from seq_tools.structure import compile_query
+
+# rows per chunk of the vectorized row-wise functions, small chunks keep the
+# temporary arrays in cache
+ROW_CHUNKSIZE = 10000
+
+
+def translate_sequences(seqs: pd.Series, mapping: dict) -> pd.Series:
+    """
+    replaces characters in a whole column of sequences. Arrow backed columns
+    are translated in their data buffer, other columns use the pandas string
+    methods
+    :param seqs: column of sequences
+    :param mapping: dictionary of character to replacement character
+    :return: pd.Series
+    """
+    if getattr(seqs.dtype, "storage", None) != "pyarrow":
+        return seqs.str.translate(str.maketrans(mapping))
+    table = encoding.get_translation_table(mapping)
+    array = encoding.translate_arrow(seqs.array.__arrow_array__(), table)
+    return pd.Series(pd.array(array, dtype=seqs.dtype), index=seqs.index)
+
+
+def _ec_chunk(seqs, structures=None, *, ntype, double_stranded) -> list:
+    return extinction_coeff.get_extinction_coeffs(
+        seqs, ntype, double_stranded, structures
+    ).tolist()
+
+
+def _mw_chunk(seqs, names, *, ntype, double_stranded) -> list:
+    return sequence.get_molecular_weights(seqs, ntype, double_stranded, names).tolist()
 
 
-def add(df: pd.DataFrame, p5_seq: str, p3_seq: str) -> pd.DataFrame:
+def _rc_chunk(seqs, *, ntype) -> list:
+    return sequence.get_reverse_complements(seqs, ntype)
+
+
+def _has_match_chunk(seqs, structs, *, query) -> list:
+    return [query.has_match(SequenceStructure(s, ss)) for s, ss in zip(seqs, structs)]
+
+
+def _find_chunk(seqs, structs, *, query) -> list:
+    return [list(query.find(SequenceStructure(s, ss))) for s, ss in zip(seqs, structs)]
+
+
+@profiling.timed
+def add(
+    df: pd.DataFrame,
+    p5_seq: str,
+    p3_seq: str,
+    workers=1,
+    cache=None,
+    backend="process",
+) -> pd.DataFrame:
     """
     adds a 5' and 3' sequence to the sequences in the dataframe
     :param df: dataframe
     :param p5_seq: 5' sequence
     :param p3_seq: 3' sequence
+    :param workers: number of workers used to refold, None uses all cores
+    :param cache: fold cache, see folding.fold_sequences
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: None
     """
     df = df.copy()
-    df["sequence"] = df["sequence"].apply(lambda x: p5_seq + x + p3_seq)
-    if "structure" in df.columns:
-        df = fold(df)
-    return df
+    df["sequence"] = p5_seq + df["sequence"] + p3_seq
+    if "structure" not in df.columns:
+        return df
+    return fold(df, workers, cache, backend)
 
 
-def calc_edit_distance(df: pd.DataFrame) -> float:
+@profiling.timed
+def calc_edit_distance(df: pd.DataFrame, workers=1, backend="process") -> float:
     """
     calculates the edit distance between each sequence in the dataframe
     :param df: dataframe
+    :param workers: number of workers to search with, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: the edit distance
     """
     if len(df) == 1:
         return 0
-    scores = [100 for _ in range(len(df))]
-    sequences = list(df["sequence"])
-    for i, seq1 in enumerate(sequences):
-        for j, seq2 in enumerate(sequences):
-            if i >= j:
-                continue
-            diff = editdistance.eval(seq1, seq2)
-            if scores[i] > diff:
-                scores[i] = diff
-            if scores[j] > diff:
-                scores[j] = diff
-    avg = np.mean(scores)
+    df = get_nearest_neighbors(df, workers, backend)
+    avg = np.mean(df["edit_distance"])
     return avg
 
 
-def determine_ntype(df: pd.DataFrame) -> str:
+def get_ntypes(df: pd.DataFrame) -> pd.Series:
+    """
+    classifies each sequence in the dataframe from the bases it contains, any
+    T makes it DNA, otherwise any U makes it RNA
+    :param df: dataframe
+    :return: series of DNA, RNA or UNCERTAIN aligned with the dataframe
+    """
+    buffer, starts, lengths = encoding.to_byte_buffer(df["sequence"])
+    has_t = encoding.segment_sum(buffer == ord("T"), starts, lengths) > 0
+    has_u = encoding.segment_sum(buffer == ord("U"), starts, lengths) > 0
+    labels = np.where(has_t, "DNA", np.where(has_u, "RNA", "UNCERTAIN"))
+    return pd.Series(labels, index=df.index)
+
+
+@profiling.timed
+def determine_ntype(df: pd.DataFrame, sample=None, chunksize=100000) -> str:
     """
-    determines the nucleotide type of the sequences in the dataframe
+    determines the nucleotide type of the sequences in the dataframe. The
+    library is scanned in chunks and scanning stops as soon as both DNA and
+    RNA sequences have been seen
     :param df: dataframe
+    :param sample: only look at the first sample sequences
+    :param chunksize: number of sequences classified at once
     :return: nucleotide type, RNA or DNA
     """
-    results = []
-    for _, row in df.iterrows():
-        ntype = "UNCERTAIN"
-        if row["sequence"].count("T") > 0:
-            ntype = "DNA"
-        elif row["sequence"].count("U") > 0:
-            ntype = "RNA"
-        results.append(ntype)
-    if df["sequence"].str.len().mean() > 10:
-        if results.count("DNA") > 0 and results.count("RNA") > 0:
-            raise ValueError("Cannot determine nucleotide type")
-    if results.count("RNA") > 0:
+    if sample is not None:
+        df = df.iloc[:sample]
+    has_dna, has_rna = False, False
+    for i in range(0, len(df), chunksize):
+        ntypes = get_ntypes(df.iloc[i : i + chunksize])
+        has_dna = has_dna or bool((ntypes == "DNA").any())
+        has_rna = has_rna or bool((ntypes == "RNA").any())
+        if has_dna and has_rna:
+            break
+    if has_dna and has_rna and df["sequence"].str.len().mean() > 10:
+        raise ValueError("Cannot determine nucleotide type")
+    if has_rna:
         return "RNA"
     return "DNA"
 
 
-def fold(df: pd.DataFrame) -> pd.DataFrame:
+@profiling.timed
+def fold(df: pd.DataFrame, workers=1, cache=None, backend="process") -> pd.DataFrame:
     """
     folds each sequence in the dataframe
     :param df: dataframe
+    :param workers: number of workers to fold with, None uses all cores
+    :param cache: fold cache, see folding.fold_sequences
+    :param backend: serial, thread or process, see parallel.map_columns
     """
-
-    def _fold(seq):
-        v_res = vienna.fold(seq)
-        return pd.Series(
-            [v_res.dot_bracket, v_res.mfe, v_res.ens_defect],
-            index=["structure", "mfe", "ens_defect"],
-        )
-
     df = df.copy()
-    df[["structure", "mfe", "ens_defect"]] = df["sequence"].apply(_fold)
+    results = folding.fold_sequences(
+        df["sequence"], workers, cache=cache, backend=backend
+    )
+    df["structure"] = [res[0] for res in results]
+    df["mfe"] = [res[1] for res in results]
+    df["ens_defect"] = [res[2] for res in results]
     return df
 
 
+@profiling.timed
 def get_extinction_coeff(
-    df: pd.DataFrame, ntype: str, double_stranded: bool
+    df: pd.DataFrame, ntype: str, double_stranded: bool, workers=1, backend="process"
 ) -> pd.DataFrame:
     """
     calculates the extinction coefficient for each sequence in the dataframe
     :param df: dataframe
     :param ntype: nucleotide type, RNA or DNA
     :param double_stranded: is double stranded?
+    :param workers: number of workers, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: None
     """
-
-    def compute_w_struct(row) -> float:
-        """
-        computes the extinction coefficient for a sequence with a structure
-        :param row: dataframe row
-        :return: extinction coefficient
-        """
-        return extinction_coeff.get_extinction_coeff(
-            row["sequence"], ntype, double_stranded, row["structure"]
-        )
-
     df = df.copy()
+    columns = [df["sequence"]]
     if ntype == "RNA" and "structure" in df.columns:
-        df["extinction_coeff"] = df.apply(compute_w_struct, axis=1)
-    else:
-        df["extinction_coeff"] = df["sequence"].apply(
-            lambda x: extinction_coeff.get_extinction_coeff(x, ntype, double_stranded)
-        )
+        columns.append(df["structure"])
+    func = functools.partial(_ec_chunk, ntype=ntype, double_stranded=double_stranded)
+    df["extinction_coeff"] = np.array(
+        parallel.map_columns(func, columns, workers, ROW_CHUNKSIZE, backend)
+    )
     return df
 
 
+@profiling.timed
 def get_length(df: pd.DataFrame) -> pd.DataFrame:
     """
     calculates the length of each sequence in the dataframe
@@ -131,22 +202,75 @@ def get_length(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+@profiling.timed
+def get_sequence_features(
+    df: pd.DataFrame, ntype=None, chunksize=10000
+) -> pd.DataFrame:
+    """
+    computes qc features of every sequence from the encoded library:
+    `length`, `gc_content` as a fraction, `max_stretch` of the same base and
+    the count of each base, `a_count`, `c_count`, `g_count`, `t_count` or
+    `u_count` and `other_count` for anything else
+    :param df: dataframe
+    :param ntype: nucleotide type, names the T/U column, by default it is
+    determined from the sequences
+    :param chunksize: number of sequences encoded at once, small chunks keep
+    the temporary arrays in cache and are several times faster
+    :return: new dataframe with the feature columns added
+    """
+    df = df.copy()
+    if ntype is None:
+        ntype = determine_ntype(df, chunksize=chunksize)
+    seqs = df["sequence"].tolist()
+    counts = np.zeros((len(seqs), encoding.INVALID_CODE + 1), dtype=np.int64)
+    lengths = np.zeros(len(seqs), dtype=np.int64)
+    max_stretch = np.zeros(len(seqs), dtype=np.int64)
+    for i in range(0, len(seqs), chunksize):
+        buffer, starts, chunk_lengths = encoding.to_byte_buffer(seqs[i : i + chunksize])
+        rows = slice(i, i + len(chunk_lengths))
+        counts[rows] = encoding.count_codes(
+            encoding.NUC_TABLE[buffer], starts, chunk_lengths
+        )
+        lengths[rows] = chunk_lengths
+        max_stretch[rows] = encoding.get_max_runs(buffer, starts, chunk_lengths)
+    df["length"] = lengths
+    gc_counts = counts[:, 1] + counts[:, 2]
+    df["gc_content"] = np.divide(
+        gc_counts, lengths, out=np.zeros(len(seqs)), where=lengths > 0
+    )
+    df["max_stretch"] = max_stretch
+    t_or_u = "u" if ntype == "RNA" else "t"
+    for i, base in enumerate(["a", "c", "g", t_or_u, "other"]):
+        df[f"{base}_count"] = counts[:, i]
+    return df
+
+
+@profiling.timed
 def get_molecular_weight(
-    df: pd.DataFrame, ntype: str, double_stranded: bool
+    df: pd.DataFrame, ntype: str, double_stranded: bool, workers=1, backend="process"
 ) -> pd.DataFrame:
     """
+    calculates the molecular weight of each sequence in the dataframe. Chunks
+    of the sequence column are encoded at once and weights are computed from
+    per row base counts, see sequence.get_molecular_weights
     :param df: pandas data frame
     :param ntype: nucleotide type, RNA or DNA
     :param double_stranded: is double stranded?
+    :param workers: number of workers, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: None
     """
     df = df.copy()
-    df["mw"] = df["sequence"].apply(
-        lambda x: sequence.get_molecular_weight(x, ntype, double_stranded)
+    func = functools.partial(_mw_chunk, ntype=ntype, double_stranded=double_stranded)
+    df["mw"] = np.array(
+        parallel.map_columns(
+            func, [df["sequence"], df.index], workers, ROW_CHUNKSIZE, backend
+        )
     )
     return df
 
 
+@profiling.timed
 def get_default_names(df: pd.DataFrame) -> pd.DataFrame:
     """
     Adds names to dataframe, if not already present
@@ -161,91 +285,280 @@ def get_default_names(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def get_reverse_complement(df: pd.DataFrame, ntype: str) -> pd.DataFrame:
+@profiling.timed
+def get_nearest_neighbors(
+    df: pd.DataFrame, workers=1, backend="process"
+) -> pd.DataFrame:
+    """
+    finds the closest other sequence in the library for each sequence. Like
+    calc_edit_distance distances are capped at 100
+    :param df: dataframe
+    :param workers: number of workers to search with, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
+    :return: dataframe with `edit_distance` and `nearest_neighbor` columns,
+    the neighbour is given by name if there is a `name` column
+    """
+    df = df.copy()
+    distances, ids = edit_distance.get_nearest_neighbors(
+        df["sequence"], workers, max_distance=100, backend=backend
+    )
+    labels = df["name"] if "name" in df.columns else df.index.to_series()
+    df["edit_distance"] = distances
+    df["nearest_neighbor"] = [labels.iloc[i] if i != -1 else None for i in ids]
+    return df
+
+
+@profiling.timed
+def get_reverse_complement(
+    df: pd.DataFrame, ntype: str, workers=1, backend="process"
+) -> pd.DataFrame:
     """
     reverse complements each sequence in the dataframe
     :param df: dataframe
     :param ntype: nucleotide type, RNA or DNA
+    :param workers: number of workers, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: stores reverse complement in dataframe rev_comp column
     """
     df = df.copy()
-    df["rev_comp"] = df["sequence"].apply(
-        lambda x: sequence.get_reverse_complement(x, ntype)
+    func = functools.partial(_rc_chunk, ntype=ntype)
+    df["rev_comp"] = parallel.map_columns(
+        func, [df["sequence"]], workers, ROW_CHUNKSIZE, backend
     )
     return df
 
 
-def has_5p_sequence(df: pd.DataFrame, p5_seq: str) -> bool:
-    """
-    checks to see if p5_seq is present in the 5' end of the sequence
+def _check_rows(values: pd.Series, predicate, return_failed, max_failed):
+    """
+    streams growing chunks of a column through a vectorized predicate. Stops
+    at the first chunk with a failing row, or when collecting the failing rows once
+    max_failed are found
+    :param values: column to check
+    :param predicate: function from a chunk of the column to a boolean series
+    :param return_failed: also return the labels of the failing rows
+    :param max_failed: stop after this many failing rows, None finds all
+    :return: bool, or tuple of (bool, pd.Index) if return_failed
+    """
+    failed = []
+    n_failed = 0
+    start, chunksize = 0, ROW_CHUNKSIZE
+    while start < len(values):
+        chunk = values.iloc[start : start + chunksize]
+        # bad input is usually caught in the first small chunk, later chunks
+        # grow so good input is not slowed down by many small ones
+        start += chunksize
+        chunksize = min(chunksize * 2, ROW_CHUNKSIZE * 64)
+        passed = predicate(chunk).fillna(False).to_numpy(dtype=bool)
+        if passed.all():
+            continue
+        if not return_failed:
+            return False
+        failed.append(chunk.index[~passed])
+        n_failed += len(failed[-1])
+        if max_failed is not None and n_failed >= max_failed:
+            break
+    if not return_failed:
+        return True
+    failed = values.index[:0].append(failed)[:max_failed]
+    return len(failed) == 0, failed
+
+
+@profiling.timed
+def has_5p_sequence(
+    df: pd.DataFrame, p5_seq: str, return_failed=False, max_failed=None
+):
+    """
+    checks to see if p5_seq is present in the 5' end of the sequence, stops
+    at the first chunk of rows where it is missing
     :param df: dataframe
-    :return: True if 5' sequence is present, False otherwise
-    """
-    return df["sequence"].str.startswith(p5_seq).all()
+    :param p5_seq: 5' sequence
+    :param return_failed: also return the labels of the rows without it
+    :param max_failed: stop after finding this many rows without it
+    :return: True if 5' sequence is present, False otherwise. With
+    return_failed a tuple of that and a pd.Index of the failing rows
+    """
+    return _check_rows(
+        df["sequence"],
+        lambda seqs: seqs.str.startswith(p5_seq),
+        return_failed,
+        max_failed,
+    )
 
 
-def has_3p_sequence(df: pd.DataFrame, p3_seq: str) -> bool:
+@profiling.timed
+def has_3p_sequence(
+    df: pd.DataFrame, p3_seq: str, return_failed=False, max_failed=None
+):
     """
-    checks to see if p5_seq is present in the 3' end of the sequence
+    checks to see if p3_seq is present in the 3' end of the sequence, stops
+    at the first chunk of rows where it is missing
     :param df: dataframe
-    :return: True if 3' sequence is present, False otherwise
-    """
-    return df["sequence"].str.endswith(p3_seq).all()
+    :param p3_seq: 3' sequence
+    :param return_failed: also return the labels of the rows without it
+    :param max_failed: stop after finding this many rows without it
+    :return: True if 3' sequence is present, False otherwise. With
+    return_failed a tuple of that and a pd.Index of the failing rows
+    """
+    return _check_rows(
+        df["sequence"],
+        lambda seqs: seqs.str.endswith(p3_seq),
+        return_failed,
+        max_failed,
+    )
 
 
-def has_sequence(df: pd.DataFrame, seq: str) -> bool:
+@profiling.timed
+def has_sequence(df: pd.DataFrame, seq: str, return_failed=False, max_failed=None):
     """
-    checks to see if seq is present in the sequence
+    checks to see if seq is present in the sequence, stops at the first chunk
+    of rows where it is missing
     :param df: dataframe
-    :return: True if sequence is present, False otherwise
-    """
-    return df["sequence"].str.contains(seq).all()
+    :param seq: sequence or regular expression
+    :param return_failed: also return the labels of the rows without it
+    :param max_failed: stop after finding this many rows without it
+    :return: True if sequence is present, False otherwise. With
+    return_failed a tuple of that and a pd.Index of the failing rows
+    """
+    return _check_rows(
+        df["sequence"],
+        lambda seqs: seqs.str.contains(seq),
+        return_failed,
+        max_failed,
+    )
 
 
-def has_t7_promoter(df: pd.DataFrame) -> bool:
+@profiling.timed
+def has_t7_promoter(df: pd.DataFrame, return_failed=False, max_failed=None):
     """
     checks if each sequence in the dataframe has a T7 promoter
     :param df: dataframe
-    :return: None
-    """
-    has_t7 = df[df["sequence"].str.startswith("TTCTAATACGACTCACTATA")]
-    if len(has_t7) != len(df):
-        return False
-    return True
+    :param return_failed: also return the labels of the rows without it
+    :param max_failed: stop after finding this many rows without it
+    :return: True if every sequence starts with the promoter. With
+    return_failed a tuple of that and a pd.Index of the failing rows
+    """
+    return has_5p_sequence(df, sequence.T7_PROMOTER, return_failed, max_failed)
+
+
+@profiling.timed
+def has_seq_struct(
+    df: pd.DataFrame,
+    seq_struct: SequenceStructure,
+    workers=1,
+    backend="process",
+    return_failed=False,
+    max_failed=None,
+):
+    """
+    checks if every sequence and structure in the dataframe contains a motif
+    :param df: dataframe with `sequence` and `structure` columns
+    :param seq_struct: motif to search for, strands are split on `&`
+    :param workers: number of workers, None uses all cores. With one worker
+    the search stops at the first row without the motif
+    :param backend: serial, thread or process, see parallel.map_columns
+    :param return_failed: also return the labels of the rows without it
+    :param max_failed: stop after finding this many rows without it
+    :return: True if every row contains the motif, False otherwise. With
+    return_failed a tuple of that and a pd.Index of the failing rows
+    """
+    query = compile_query(seq_struct)
+    if backend == "serial" or parallel.get_workers(workers) == 1:
+        failed = []
+        rows = zip(df.index, df["sequence"], df["structure"])
+        for label, seq, ss in rows:
+            if query.has_match(SequenceStructure(seq, ss)):
+                continue
+            if not return_failed:
+                return False
+            failed.append(label)
+            if max_failed is not None and len(failed) >= max_failed:
+                break
+        if not return_failed:
+            return True
+        failed = pd.Index(failed, dtype=df.index.dtype)
+        return len(failed) == 0, failed
+    func = functools.partial(_has_match_chunk, query=query)
+    columns = [df["sequence"], df["structure"]]
+    passed = pd.Series(
+        parallel.map_columns(func, columns, workers, backend=backend),
+        index=df.index,
+        dtype=bool,
+    )
+    return _check_rows(passed, lambda chunk: chunk, return_failed, max_failed)
 
 
-def has_seq_struct(df: pd.DataFrame, seq_struct: SequenceStructure) -> bool:
-    for _, row in df.iterrows():
-        row_seq_struct = SequenceStructure(row["sequence"], row["structure"])
-        if find_seq_struct(row_seq_struct, seq_struct) == 0:
-            return False
-    return True
+@profiling.timed
+def find_seq_struct(
+    df: pd.DataFrame,
+    seq_struct: SequenceStructure,
+    index=None,
+    workers=1,
+    backend="process",
+) -> pd.DataFrame:
+    """
+    finds every match of a motif in the dataframe
+    :param df: dataframe with `sequence` and `structure` columns
+    :param seq_struct: motif to search for, strands are split on `&`
+    :param index: optional structure.KmerIndex of df["sequence"], only rows
+    that contain the fixed bases of the motif are scanned. Build it once to
+    screen many motifs
+    :param workers: number of workers, None uses all cores
+    :param backend: serial, thread or process, see parallel.map_columns
+    :return: dataframe with the `row` label, the `name` if df has names and
+    the `match`, a tuple with one [start, end] per strand
+    """
+    query = compile_query(seq_struct)
+    rows = None
+    if index is not None:
+        rows = index.get_candidates(query)
+    if rows is None:
+        rows = np.arange(len(df))
+    rows = np.asarray(rows, dtype=np.int64)
+    seqs, structs = df["sequence"].to_numpy(), df["structure"].to_numpy()
+    func = functools.partial(_find_chunk, query=query)
+    row_matches = parallel.map_columns(
+        func, [seqs[rows], structs[rows]], workers, backend=backend
+    )
+    hit_rows, matches = [], []
+    for row, found in zip(rows.tolist(), row_matches):
+        for match in found:
+            hit_rows.append(row)
+            matches.append(match)
+    df_hits = pd.DataFrame({"row": df.index[hit_rows], "match": matches})
+    if "name" in df.columns:
+        df_hits.insert(1, "name", df["name"].to_numpy()[hit_rows])
+    return df_hits
 
 
+@profiling.timed
 def to_dna(df: pd.DataFrame) -> pd.DataFrame:
     """
     converts each sequence in dataframe to DNA
     :return: None
     """
     df = df.copy()
-    df["sequence"] = df["sequence"].apply(sequence.to_dna)
+    df["sequence"] = translate_sequences(df["sequence"], {"U": "T"})
     if "structure" in df.columns:
         df = df.drop(columns=["structure"])
     return df
 
 
+@profiling.timed
 def to_dna_template(df: pd.DataFrame) -> pd.DataFrame:
     """
     converts each sequence in dataframe to DNA
     :return: None
     """
     df = df.copy()
-    df["sequence"] = df["sequence"].apply(sequence.to_dna_template)
+    df["sequence"] = sequence.T7_PROMOTER + translate_sequences(
+        df["sequence"], {"U": "T"}
+    )
     if "structure" in df.columns:
         df = df.drop(columns=["structure"])
     return df
 
 
+@profiling.timed
 def to_fasta(df: pd.DataFrame, filename: str) -> None:
     """
     writes the sequences in the dataframe to a fasta file
@@ -253,12 +566,11 @@ def to_fasta(df: pd.DataFrame, filename: str) -> None:
     :param filename: fasta file path
     :return: None
     """
-    with open(filename, "w", encoding="utf-8") as f:
-        for _, row in df.iterrows():
-            f.write(f">{row['name']}\n")
-            f.write(f"{row['sequence']}\n")
+    with fileio.LibraryWriter(filename, "fasta") as writer:
+        writer.write(df)
 
 
+@profiling.timed
 def to_opool(df: pd.DataFrame, name: str, filename: str) -> None:
     """
     writes the sequences in the dataframe to an opool file
@@ -273,16 +585,44 @@ def to_opool(df: pd.DataFrame, name: str, filename: str) -> None:
     df.to_xlsx(filename, index=False)
 
 
+@profiling.timed
+def to_packed(df: pd.DataFrame, ntype=None) -> PackedSequenceArray:
+    """
+    packs the sequences in the dataframe at 2 bits per base
+    :param df: dataframe
+    :param ntype: nucleotide type, RNA or DNA, determined if not given
+    :return: PackedSequenceArray
+    """
+    return PackedSequenceArray.from_sequences(df["sequence"], ntype)
+
+
+@profiling.timed
+def from_packed(seqs: PackedSequenceArray, names=None) -> pd.DataFrame:
+    """
+    builds a dataframe from packed sequences
+    :param seqs: PackedSequenceArray
+    :param names: name of each sequence, defaults to `seq_0`, `seq_1`, etc.
+    :return: dataframe with `name` and `sequence` columns
+    """
+    df = pd.DataFrame({"sequence": seqs.to_list()})
+    if names is None:
+        return get_default_names(df)[["name", "sequence"]]
+    df.insert(0, "name", list(names))
+    return df
+
+
+@profiling.timed
 def to_rna(df: pd.DataFrame) -> pd.DataFrame:
     """
     converts each sequence in dataframe to DNA
     :return: None
     """
     df = df.copy()
-    df["sequence"] = df["sequence"].apply(sequence.to_rna)
+    df["sequence"] = translate_sequences(df["sequence"], {"T": "U"})
     return df
 
 
+@profiling.timed
 def trim(df, p5_length, p3_length) -> pd.DataFrame:
     """
     takes a data frame and trims the sequences. If there is a structure
@@ -305,11 +645,21 @@ def trim(df, p5_length, p3_length) -> pd.DataFrame:
     return df
 
 
-def transcribe(df: pd.DataFrame, ignore_missing_t7=False) -> pd.DataFrame:
+@profiling.timed
+def transcribe(
+    df: pd.DataFrame,
+    ignore_missing_t7=False,
+    workers=1,
+    cache=None,
+    backend="process",
+) -> pd.DataFrame:
     """
     transcribes each sequence in the dataframe (DNA -> RNA) removes t7 promoter
     :param df: dataframe with DNA template sequences
     :param ignore_missing_t7: ignore sequences that don't have a T7 promoter
+    :param workers: number of workers to fold with, None uses all cores
+    :param cache: fold cache, see folding.fold_sequences
+    :param backend: serial, thread or process, see parallel.map_columns
     :return: dataframe with RNA sequences
     """
     if not has_t7_promoter(df) and not ignore_missing_t7:
@@ -317,5 +667,5 @@ def transcribe(df: pd.DataFrame, ignore_missing_t7=False) -> pd.DataFrame:
     if not ignore_missing_t7:
         df = trim(df, 20, 0)
     df = to_rna(df)
-    df = fold(df)
+    df = fold(df, workers, cache, backend)
     return df
@@ -2,11 +2,16 @@
 simple parsing of dot bracket notation
 """
 
-import collections as col
+import numpy as np
+
+from seq_tools import encoding
 
 BRACKET_LEFT = "([{<ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 BRACKET_RIGHT = ")]}>abcdefghijklmnopqrstuvwxyz"
 
+# character classes used by the lookup tables
+DOT, OPEN, CLOSE, BREAK, INVALID = 0, 1, 2, 3, 4
+
 
 def inverse_brackets(bracket):
     """
@@ -14,10 +19,24 @@ def inverse_brackets(bracket):
     :param bracket:
     :return:
     """
-    res = col.defaultdict(int)
-    for i, a in enumerate(bracket):
-        res[a] = i
-    return res
+    return {a: i for i, a in enumerate(bracket)}
+
+
+INVERSE_BRACKET_LEFT = inverse_brackets(BRACKET_LEFT)
+INVERSE_BRACKET_RIGHT = inverse_brackets(BRACKET_RIGHT)
+# byte lookup tables from ascii to character class and to bracket type
+KIND_TABLE = encoding.get_code_table(
+    {
+        ".": DOT,
+        "&": BREAK,
+        **{a: OPEN for a in BRACKET_LEFT},
+        **{a: CLOSE for a in BRACKET_RIGHT},
+    },
+    default=INVALID,
+)
+TYPE_TABLE = encoding.get_code_table(
+    {**INVERSE_BRACKET_LEFT, **INVERSE_BRACKET_RIGHT}, default=0
+)
 
 
 def dotbracket_to_pairtable(struct):
@@ -27,33 +46,104 @@ def dotbracket_to_pairtable(struct):
     """
     if len(struct) == 0:
         raise ValueError("Cannot convert empty structure to pairtable")
-    pt = [0] * ((len(struct)) - struct.count("&"))
-    # pt[0] = len(struct) - struct.count("&")
-
-    stack = col.defaultdict(list)
-    inverse_bracket_left = inverse_brackets(BRACKET_LEFT)
-    inverse_bracket_right = inverse_brackets(BRACKET_RIGHT)
+    pt = [-1] * ((len(struct)) - struct.count("&"))
+    stacks = [[] for _ in BRACKET_LEFT]
 
     i = 0
     for a in struct:
         if a == "&":
             continue
+        if a in INVERSE_BRACKET_LEFT:
+            stacks[INVERSE_BRACKET_LEFT[a]].append(i)
+        elif a in INVERSE_BRACKET_RIGHT:
+            stack = stacks[INVERSE_BRACKET_RIGHT[a]]
+            if len(stack) == 0:
+                raise ValueError("Too many closing brackets!")
+            j = stack.pop()
+            pt[i] = j
+            pt[j] = i
+        elif a != ".":
+            raise ValueError(f"Invalid character in dot bracket: {a}")
         i += 1
-        # print i,a, pt
-        if a == ".":
-            pt[i - 1] = -1
-        else:
-            if a in inverse_bracket_left:
-                stack[inverse_bracket_left[a]].append(i)
-            else:
-                assert a in inverse_bracket_right
-                if len(stack[inverse_bracket_right[a]]) == 0:
-                    raise ValueError("Too many closing brackets!")
-                j = stack[inverse_bracket_right[a]].pop()
-                pt[i - 1] = j - 1
-                pt[j - 1] = i - 1
-
-    if len(stack[inverse_bracket_left[a]]) != 0:
+
+    if any(stacks):
         raise ValueError("Too many opening brackets!")
 
     return pt
+
+
+def dotbracket_to_pairtables(structs):
+    """
+    Converts a whole library of dot bracket structures into pair tables in one
+    pass. Each bracket type is matched separately so pseudoknots are handled,
+    `&` strand breaks are dropped as in dotbracket_to_pairtable. Brackets of
+    one type pair up when they are at the same nesting depth, so sorting them
+    by row, type, depth and position leaves each pair next to each other
+    :param structs: list of dot bracket structures
+    :return: tuple of (pairs, starts, lengths, errors). pairs is a flat int32
+    array with the partner of each position within its row or -1, starts and
+    lengths locate each row in it, errors are the indices of malformed rows,
+    which are left all -1
+    """
+    buffer, starts, lengths = encoding.to_byte_buffer(structs)
+    kinds = KIND_TABLE[buffer]
+    if np.any(kinds == BREAK):
+        # strand breaks are not positions in the pair table
+        lengths = lengths - encoding.segment_sum(kinds == BREAK, starts, lengths)
+        buffer = buffer[kinds != BREAK]
+        kinds = KIND_TABLE[buffer]
+        starts = np.zeros(len(lengths), dtype=np.int64)
+        if len(lengths) > 1:
+            np.cumsum(lengths[:-1], out=starts[1:])
+    bad = lengths == 0
+    # only brackets and invalid characters need any work
+    pos = np.flatnonzero(kinds != DOT)
+    rows = np.searchsorted(starts, pos, side="right") - 1
+    is_invalid = kinds[pos] == INVALID
+    bad[rows[is_invalid]] = True
+    pos, rows = pos[~is_invalid], rows[~is_invalid]
+
+    # nesting depth of every bracket within its row and bracket type
+    groups = rows * len(BRACKET_LEFT) + TYPE_TABLE[buffer[pos]]
+    order = np.argsort(groups, kind="stable")
+    pos, rows, groups = pos[order], rows[order], groups[order]
+    steps = np.where(kinds[pos] == OPEN, 1, -1)
+    depth = np.cumsum(steps)
+    new_group = np.ones(len(pos), dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(pos)), 0))
+    depth -= depth[group_start] - steps[group_start]
+    # a close below zero or a group that does not end at zero is unbalanced
+    group_end = np.ones(len(pos), dtype=bool)
+    group_end[:-1] = new_group[1:]
+    bad[rows[(depth < 0) | (group_end & (depth != 0))]] = True
+
+    good = ~bad[rows]
+    pos, rows, groups = pos[good], rows[good], groups[good]
+    depth, steps = depth[good], steps[good]
+    # an open bracket and its close share the depth before the close
+    level = depth + (steps == -1)
+    order = np.lexsort((pos, level, groups))
+    opens, closes = pos[order][0::2], pos[order][1::2]
+    row_starts = starts[rows[order][0::2]]
+    pairs = np.full(len(kinds), -1, dtype=np.int32)
+    pairs[opens] = closes - row_starts
+    pairs[closes] = opens - row_starts
+    return pairs, starts, lengths, np.flatnonzero(bad)
+
+
+def to_padded(pairs, starts, lengths, pad_value=-2) -> np.ndarray:
+    """
+    converts flat pair tables from dotbracket_to_pairtables into a matrix
+    :param pairs: flat pair tables
+    :param starts: start of each row in pairs
+    :param lengths: length of each row
+    :param pad_value: value after the end of shorter rows
+    :return: int32 np.ndarray of shape (n_rows, max_length)
+    """
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(lengths), width), pad_value, dtype=np.int32)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    cols = np.arange(len(pairs)) - np.repeat(starts, lengths)
+    matrix[rows, cols] = pairs
+    return matrix
@@ -0,0 +1,198 @@
+"""
+nearest neighbour edit distance search over sequence libraries. A q-gram
+index gives a lower bound on the edit distance to every other sequence so
+each sequence is only compared against the few that can still be closer
+than the best neighbour found so far
+"""
+
+import functools
+
+import editdistance
+import numpy as np
+
+from seq_tools import encoding
+from seq_tools.parallel import get_workers, map_chunks
+
+# index of a worker process, set once per process by _set_index
+_WORKER_INDEX = None
+
+
+class QGramIndex:
+    """
+    inverted index from q-gram to the sequences containing it. Uses the q-gram
+    lemma: if two sequences are within edit distance k they share at least
+    max(|a|, |b|) - q + 1 - k * q q-grams, so counting shared q-grams bounds k
+    from below. Sequences are compared in order of their bound and the search
+    stops as soon as the bound reaches the best distance found. All bounds are
+    conservative so the distances found are exact
+    """
+
+    def __init__(self, seqs, q=8, max_postings=None):
+        """
+        builds the index
+        :param seqs: list of sequences, ids are positions in this list
+        :param q: length of the q-grams
+        :param max_postings: q-grams found more often than this, e.g. constant
+        regions shared by the whole library, are not looked up. Every sequence
+        is assumed to share them which keeps the bound valid
+        """
+        self.seqs = list(seqs)
+        self.q = q
+        n_seqs = len(self.seqs)
+        if max_postings is None:
+            max_postings = max(1000, n_seqs // 50)
+        self.max_postings = max_postings
+        codes, starts, self.lengths = encoding.encode(self.seqs)
+        n_pos = max(len(codes) - q + 1, 0)
+        # q-grams in base 5 so invalid nucleotides still get their own digit
+        grams = np.zeros(n_pos, dtype=np.int64)
+        for k in range(q):
+            grams = grams * 5 + codes[k : k + n_pos]
+        rows = np.repeat(np.arange(n_seqs), self.lengths)[:n_pos]
+        # drop q-grams that run over the end of a sequence into the next
+        valid = np.arange(n_pos) - starts[rows] + q <= self.lengths[rows]
+        grams, rows = grams[valid], rows[valid]
+        self.row_grams = grams
+        self.row_starts = np.zeros(n_seqs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_seqs), out=self.row_starts[1:])
+        order = np.argsort(grams, kind="stable")
+        self.gram_values = grams[order]
+        self.gram_rows = rows[order].astype(np.int32)
+        self.len_order = np.argsort(self.lengths, kind="stable")
+        self.sorted_lengths = self.lengths[self.len_order]
+
+    def __len__(self):
+        """
+        return the number of sequences in the index
+        """
+        return len(self.seqs)
+
+    def _get_bounds(self, seq_len, n_grams, ids, shared):
+        """
+        lower bounds on the edit distance from a query to other sequences
+        :param seq_len: length of the query
+        :param n_grams: number of q-grams in the query
+        :param ids: ids of the other sequences
+        :param shared: upper bound on the q-grams each one shares with the query
+        :return: np.ndarray of int64
+        """
+        lengths = self.lengths[ids]
+        other_grams = np.maximum(lengths - self.q + 1, 0)
+        missing = np.maximum(other_grams, n_grams) - shared
+        qgram_bound = -(-missing // self.q)
+        return np.maximum(np.abs(lengths - seq_len), qgram_bound)
+
+    def nearest(self, seq_id, max_distance=None):
+        """
+        finds the closest other sequence in the index
+        :param seq_id: id of the query sequence
+        :param max_distance: only look for neighbours up to this distance
+        :return: tuple of (distance, id), id is None if there is no neighbour
+        within max_distance
+        """
+        seq = self.seqs[seq_id]
+        seq_len = len(seq)
+        n_grams = max(seq_len - self.q + 1, 0)
+        best = [np.inf if max_distance is None else max_distance + 1, None]
+
+        def verify(ids, bounds):
+            for i in np.argsort(bounds, kind="stable"):
+                if bounds[i] >= best[0]:
+                    break
+                dist = editdistance.eval(seq, self.seqs[ids[i]])
+                if dist < best[0]:
+                    best[0], best[1] = dist, int(ids[i])
+
+        grams = self.row_grams[self.row_starts[seq_id] : self.row_starts[seq_id + 1]]
+        grams, counts = np.unique(grams, return_counts=True)
+        lows = np.searchsorted(self.gram_values, grams, "left")
+        highs = np.searchsorted(self.gram_values, grams, "right")
+        frequent = highs - lows > self.max_postings
+        always_shared = counts[frequent].sum()
+        postings = [
+            self.gram_rows[low:high]
+            for low, high in zip(lows[~frequent], highs[~frequent])
+        ]
+        if postings:
+            ids, shared = np.unique(np.concatenate(postings), return_counts=True)
+        else:
+            ids, shared = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        keep = ids != seq_id
+        ids, shared = ids[keep], shared[keep]
+        verify(ids, self._get_bounds(seq_len, n_grams, ids, shared + always_shared))
+        # sequences sharing no looked up q-gram, only needed if the best
+        # neighbour so far is further than any of them could be
+        if -(-(n_grams - always_shared) // self.q) >= best[0]:
+            return best[0], best[1]
+        window = best[0] - 1 if np.isfinite(best[0]) else np.iinfo(np.int64).max // 2
+        low = np.searchsorted(self.sorted_lengths, seq_len - window, "left")
+        high = np.searchsorted(self.sorted_lengths, seq_len + window, "right")
+        others = self.len_order[low:high]
+        others = others[~np.isin(others, ids) & (others != seq_id)]
+        shared = np.full(len(others), always_shared, dtype=np.int64)
+        verify(others, self._get_bounds(seq_len, n_grams, others, shared))
+        return best[0], best[1]
+
+
+def _set_index(index) -> None:
+    """
+    stores the index in a worker process
+    :param index: QGramIndex
+    :return: None
+    """
+    # pylint: disable=global-statement
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+
+
+def _nearest_chunk(args, index=None) -> list:
+    """
+    finds the nearest neighbour of a chunk of sequences
+    :param args: list of (seq_id, max_distance)
+    :param index: QGramIndex of the library, defaults to the index of the
+    worker process
+    :return: list of (distance, id)
+    """
+    if index is None:
+        index = _WORKER_INDEX
+    return [index.nearest(seq_id, max_distance) for seq_id, max_distance in args]
+
+
+def get_nearest_neighbors(seqs, workers=1, max_distance=None, q=8, backend="process"):
+    """
+    computes the edit distance of each sequence to its closest other sequence
+    :param seqs: list of sequences
+    :param workers: number of workers to search with, None uses all cores
+    :param max_distance: cap on the reported distance, neighbours further
+    away than this are reported as max_distance with no id
+    :param q: q-gram length used by the index
+    :param backend: serial, thread or process, see parallel.map_columns
+    :return: tuple of (distances, ids), ids are -1 when no neighbour was found
+    and distances are -1 if there was also no max_distance
+    """
+    index = QGramIndex(seqs, q)
+    args = [(i, max_distance) for i in range(len(index))]
+    if backend == "process" and get_workers(workers) > 1 and len(args) > 1:
+        # the index is pickled once per worker instead of with every chunk,
+        # the global is only set inside the pool processes
+        results = map_chunks(
+            _nearest_chunk,
+            args,
+            workers,
+            initializer=_set_index,
+            initargs=(index,),
+            backend=backend,
+        )
+    else:
+        results = map_chunks(
+            functools.partial(_nearest_chunk, index=index),
+            args,
+            workers,
+            backend=backend,
+        )
+    not_found = -1 if max_distance is None else max_distance
+    distances = np.array(
+        [not_found if i is None else d for d, i in results], dtype=np.int64
+    )
+    ids = np.array([-1 if i is None else i for _, i in results], dtype=np.int64)
+    return distances, ids
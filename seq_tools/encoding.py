@@ -0,0 +1,189 @@
+"""
+helpers for encoding whole columns of sequences into contiguous numpy buffers
+so library wide computations can be done without per row python calls
+"""
+
+import numpy as np
+
+# A, C, G and T/U map to 0-3, everything else is flagged as invalid
+NUC_CODES = {"A": 0, "C": 1, "G": 2, "T": 3, "U": 3}
+INVALID_CODE = 4
+
+
+def get_code_table(codes=None, default=INVALID_CODE) -> np.ndarray:
+    """
+    builds a 256 entry lookup table from ascii byte to code
+    :param codes: dictionary of character to code, defaults to NUC_CODES
+    :param default: code used for characters not in codes
+    :return: np.ndarray of uint8
+    """
+    if codes is None:
+        codes = NUC_CODES
+    table = np.full(256, default, dtype=np.uint8)
+    for char, code in codes.items():
+        table[ord(char)] = code
+    return table
+
+
+NUC_TABLE = get_code_table()
+
+
+def get_translation_table(mapping) -> np.ndarray:
+    """
+    builds a 256 entry table that maps each ascii byte to itself, except the
+    characters in mapping
+    :param mapping: dictionary of character to replacement character
+    :return: np.ndarray of uint8
+    """
+    table = np.arange(256, dtype=np.uint8)
+    for char, new in mapping.items():
+        table[ord(char)] = ord(new)
+    return table
+
+
+def translate_arrow(array, table):
+    """
+    maps every byte of an arrow string array through a translation table.
+    Lengths do not change, so only the data buffer is rewritten and the
+    offsets and validity of each chunk are reused
+    :param array: pyarrow.Array or pyarrow.ChunkedArray of strings
+    :param table: table from get_translation_table
+    :return: pyarrow.ChunkedArray
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+
+    table = table.tobytes()
+    chunks = array.chunks if isinstance(array, pa.ChunkedArray) else [array]
+    translated = []
+    for chunk in chunks:
+        validity, offsets, data = chunk.buffers()
+        if data is not None:
+            data = pa.py_buffer(data.to_pybytes().translate(table))
+        translated.append(
+            pa.Array.from_buffers(
+                chunk.type,
+                len(chunk),
+                [validity, offsets, data],
+                chunk.null_count,
+                chunk.offset,
+            )
+        )
+    return pa.chunked_array(translated, array.type)
+
+
+def to_byte_buffer(seqs):
+    """
+    joins a list of sequences into a single uint8 buffer
+    :param seqs: iterable of sequences (list or pd.Series of str)
+    :return: tuple of (buffer, starts, lengths)
+    """
+    # tolist is much faster than iterating over a pd.Series of strings
+    seqs = seqs.tolist() if hasattr(seqs, "tolist") else list(seqs)
+    lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+    starts = np.zeros(len(seqs), dtype=np.int64)
+    if len(seqs) > 1:
+        np.cumsum(lengths[:-1], out=starts[1:])
+    buffer = np.frombuffer("".join(seqs).encode("ascii"), dtype=np.uint8)
+    return buffer, starts, lengths
+
+
+def from_byte_buffer(buffer, starts, lengths) -> list:
+    """
+    splits a uint8 buffer back into a list of sequences
+    :param buffer: np.ndarray of uint8
+    :param starts: start of each sequence in the buffer
+    :param lengths: length of each sequence
+    :return: list of str
+    """
+    text = buffer.tobytes().decode("ascii")
+    return [text[s : s + l] for s, l in zip(starts.tolist(), lengths.tolist())]
+
+
+def encode(seqs, table=None):
+    """
+    encodes a list of sequences into a single code array
+    :param seqs: iterable of sequences or a packed.PackedSequenceArray
+    :param table: lookup table from get_code_table, defaults to NUC_TABLE
+    :return: tuple of (codes, starts, lengths)
+    """
+    if table is None:
+        # packed arrays already hold NUC_TABLE codes, skip building strings
+        if hasattr(seqs, "get_codes"):
+            return seqs.get_codes()
+        table = NUC_TABLE
+    buffer, starts, lengths = to_byte_buffer(seqs)
+    return table[buffer], starts, lengths
+
+
+def segment_sum(values, starts, lengths) -> np.ndarray:
+    """
+    sums values over each segment defined by starts and lengths
+    :param values: 1d array aligned with the encoded buffer
+    :param starts: start of each segment
+    :param lengths: length of each segment
+    :return: np.ndarray of int64 with one entry per segment
+    """
+    sums = np.zeros(len(starts), dtype=np.int64)
+    # empty segments would break reduceat, the others tile the whole buffer
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        sums[nonempty] = np.add.reduceat(values, starts[nonempty], dtype=np.int64)
+    return sums
+
+
+def get_max_runs(values, starts, lengths) -> np.ndarray:
+    """
+    finds the longest run of equal consecutive values in each segment. Runs
+    start wherever a value differs from the one before it or a segment starts
+    :param values: 1d array aligned with the encoded buffer
+    :param starts: start of each segment
+    :param lengths: length of each segment
+    :return: np.ndarray of int64 with one entry per segment, 0 if empty
+    """
+    max_runs = np.zeros(len(starts), dtype=np.int64)
+    nonempty = lengths > 0
+    if len(values) == 0:
+        return max_runs
+    new_run = np.empty(len(values), dtype=bool)
+    new_run[0] = True
+    np.not_equal(values[1:], values[:-1], out=new_run[1:])
+    new_run[starts[nonempty]] = True
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, len(values)))
+    first_runs = np.searchsorted(run_starts, starts[nonempty])
+    max_runs[nonempty] = np.maximum.reduceat(run_lengths, first_runs)
+    return max_runs
+
+
+def count_codes(codes, starts, lengths, n_codes=INVALID_CODE + 1) -> np.ndarray:
+    """
+    counts the occurrence of each code in each sequence
+    :param codes: encoded buffer from encode
+    :param starts: start of each sequence
+    :param lengths: length of each sequence
+    :param n_codes: number of distinct codes
+    :return: np.ndarray of shape (n_seqs, n_codes)
+    """
+    counts = np.zeros((len(starts), n_codes), dtype=np.int64)
+    for code in range(n_codes):
+        counts[:, code] = segment_sum(codes == code, starts, lengths)
+    return counts
+
+
+def check_valid(counts, names=None) -> None:
+    """
+    raises an error if any sequence contains an invalid character
+    :param counts: output of count_codes
+    :param names: optional labels for each row used in the error message
+    :return: None
+    """
+    bad = np.flatnonzero(counts[:, INVALID_CODE])
+    if len(bad) == 0:
+        return
+    if names is not None:
+        names = list(names)
+        bad = [names[i] for i in bad[:10]]
+    else:
+        bad = bad[:10].tolist()
+    raise ValueError(f"invalid nucleotides found in sequences: {bad}")
@@ -2,7 +2,51 @@
 a module for calculating extinction coefficients for nucleic acids
 """
 
-from seq_tools import dot_bracket, sequence
+import numpy as np
+
+from seq_tools import dot_bracket, encoding, sequence
+
+DNA_DI = {
+    "AA": 27400,
+    "AC": 21200,
+    "AG": 25000,
+    "AT": 22800,
+    "CA": 21200,
+    "CC": 14600,
+    "CG": 18000,
+    "CT": 15200,
+    "GA": 25200,
+    "GC": 17600,
+    "GG": 21600,
+    "GT": 20000,
+    "TA": 23400,
+    "TC": 16200,
+    "TG": 19000,
+    "TT": 16800,
+}
+
+DNA_MONO = {"A": 15400, "C": 7400, "G": 11500, "T": 8700}
+
+RNA_DI = {
+    "AA": 27400,
+    "AC": 21200,
+    "AG": 25000,
+    "AU": 24000,
+    "CA": 21200,
+    "CC": 14600,
+    "CG": 18000,
+    "CU": 16200,
+    "GA": 25200,
+    "GC": 17600,
+    "GG": 21600,
+    "GU": 21200,
+    "UA": 24600,
+    "UC": 17200,
+    "UG": 20000,
+    "UU": 19600,
+}
+
+RNA_MONO = {"A": 15400, "C": 7400, "G": 11500, "U": 9900}
 
 
 def get_extinction_coeff(seq, ntype, double_stranded=False, structure=None):
@@ -14,47 +58,6 @@ def get_extinction_coeff(seq, ntype, double_stranded=False, structure=None):
     :param structure: structure of the sequence in dot bracket notation
     :return: float
     """
-    dna_di = {
-        "AA": 27400,
-        "AC": 21200,
-        "AG": 25000,
-        "AT": 22800,
-        "CA": 21200,
-        "CC": 14600,
-        "CG": 18000,
-        "CT": 15200,
-        "GA": 25200,
-        "GC": 17600,
-        "GG": 21600,
-        "GT": 20000,
-        "TA": 23400,
-        "TC": 16200,
-        "TG": 19000,
-        "TT": 16800,
-    }
-
-    dna_mono = {"A": 15400, "C": 7400, "G": 11500, "T": 8700}
-
-    rna_di = {
-        "AA": 27400,
-        "AC": 21200,
-        "AG": 25000,
-        "AU": 24000,
-        "CA": 21200,
-        "CC": 14600,
-        "CG": 18000,
-        "CU": 16200,
-        "GA": 25200,
-        "GC": 17600,
-        "GG": 21600,
-        "GU": 21200,
-        "UA": 24600,
-        "UC": 17200,
-        "UG": 20000,
-        "UU": 19600,
-    }
-
-    rna_mono = {"A": 15400, "C": 7400, "G": 11500, "U": 9900}
 
     def get_mono_contribution(seq, ntype) -> float:
         """
@@ -66,9 +69,9 @@ def get_extinction_coeff(seq, ntype, double_stranded=False, structure=None):
         total = 0
         for nuc in seq[1:-1]:
             if ntype == "RNA":
-                total += rna_mono[nuc]
+                total += RNA_MONO[nuc]
             else:
-                total += dna_mono[nuc]
+                total += DNA_MONO[nuc]
         return total
 
     def get_di_contribution(seq, ntype) -> float:
@@ -82,9 +85,9 @@ def get_extinction_coeff(seq, ntype, double_stranded=False, structure=None):
         for i in range(0, len(seq) - 1):
             distep = seq[i] + seq[i + 1]
             if ntype == "RNA":
-                total += rna_di[distep]
+                total += RNA_DI[distep]
             else:
-                total += dna_di[distep]
+                total += DNA_DI[distep]
         return total
 
     def get_hypochromicity_dna(seq) -> float:
@@ -155,3 +158,114 @@ def get_extinction_coeff(seq, ntype, double_stranded=False, structure=None):
     if ntype == "RNA":
         return get_coefficient_rna(seq, structure)
     return get_coefficient_dna(seq, double_stranded)
+
+
+def _get_tables(ntype):
+    """
+    converts the coefficient dictionaries into arrays indexed by nucleotide code
+    :param ntype: DNA or RNA
+    :return: tuple of (mono, di) arrays of shape (4,) and (4, 4)
+    """
+    nucs = "ACGU" if ntype == "RNA" else "ACGT"
+    mono_table = RNA_MONO if ntype == "RNA" else DNA_MONO
+    di_table = RNA_DI if ntype == "RNA" else DNA_DI
+    mono = np.array([mono_table[n] for n in nucs], dtype=np.int64)
+    di = np.array([[di_table[n1 + n2] for n2 in nucs] for n1 in nucs], dtype=np.int64)
+    return mono, di
+
+
+def _get_strand_terms(codes, starts, lengths, counts):
+    """
+    computes the per sequence nucleotide count matrices used by every
+    extinction coefficient term
+    :param codes: encoded sequences from encoding.encode
+    :param starts: start of each sequence
+    :param lengths: length of each sequence
+    :param counts: nucleotide counts from encoding.count_codes
+    :return: tuple of (mono, di) counts of shape (n, 4) and (n, 4, 4)
+    """
+    n_seqs = len(starts)
+    # mono contribution only covers seq[1:-1], remove first and last nucleotide
+    mono = counts[:, :4].copy()
+    has_ends = np.flatnonzero(lengths >= 2)
+    for pos in (starts[has_ends], starts[has_ends] + lengths[has_ends] - 1):
+        np.subtract.at(mono, (has_ends, codes[pos]), 1)
+    mono[lengths < 2] = 0
+    # dinucleotide steps, the last nucleotide of each sequence starts no step
+    pair_codes = np.full(len(codes), 16, dtype=np.uint8)
+    if len(codes) > 1:
+        pair_codes[:-1] = codes[:-1] * 4 + codes[1:]
+    ends = starts[lengths > 0] + lengths[lengths > 0] - 1
+    pair_codes[ends] = 16
+    di = encoding.count_codes(pair_codes, starts, lengths, n_codes=17)
+    return mono, di[:, :16].reshape(n_seqs, 4, 4)
+
+
+def _get_pair_counts(codes, starts, lengths, structures):
+    """
+    counts AU/UA and GC/CG base pairs in each structure, each pair is counted
+    from both of its nucleotides as in get_extinction_coeff
+    :param codes: encoded sequences from encoding.encode
+    :param starts: start of each sequence
+    :param lengths: length of each sequence
+    :param structures: dot bracket structures aligned with the sequences
+    :return: tuple of (au, gc) counts
+    """
+    partner, _, struct_lengths, errors = dot_bracket.dotbracket_to_pairtables(
+        structures
+    )
+    if len(errors) > 0:
+        raise ValueError(f"malformed dot bracket structures: {errors[:10].tolist()}")
+    mismatch = np.flatnonzero(struct_lengths != lengths)
+    if len(mismatch) > 0:
+        raise ValueError(
+            f"sequence and structure are not the same length: {mismatch[0]}"
+        )
+    partner = partner.astype(np.int64)
+    paired = partner != -1
+    # pair tables are local to each sequence, shift them into the buffer
+    offsets = np.repeat(starts, lengths)
+    pair_codes = np.full(len(codes), 16, dtype=np.uint8)
+    pair_codes[paired] = codes[partner[paired] + offsets[paired]] * 4 + codes[paired]
+    counts = encoding.count_codes(pair_codes, starts, lengths, n_codes=17)
+    # codes: A=0, C=1, G=2, U=3
+    au_counts = counts[:, 0 * 4 + 3] + counts[:, 3 * 4 + 0]
+    gc_counts = counts[:, 2 * 4 + 1] + counts[:, 1 * 4 + 2]
+    return au_counts, gc_counts
+
+
+def get_extinction_coeffs(seqs, ntype, double_stranded=False, structures=None):
+    """
+    get the extinction coefficient for a whole library of sequences at once.
+    Builds per sequence mononucleotide and dinucleotide count matrices and
+    takes their dot product with the coefficient tables, gives the same values
+    as calling get_extinction_coeff on each sequence
+    :param seqs: list or pd.Series of sequences
+    :param ntype: DNA or RNA
+    :param double_stranded: is double stranded? only used for DNA
+    :param structures: structures in dot bracket notation, only used for RNA
+    :return: np.ndarray with one coefficient per sequence
+    """
+    codes, starts, lengths = encoding.encode(seqs)
+    counts = encoding.count_codes(codes, starts, lengths)
+    encoding.check_valid(counts)
+    mono_table, di_table = _get_tables(ntype)
+    mono, di = _get_strand_terms(codes, starts, lengths, counts)
+    strand1 = np.einsum("nij,ij->n", di, di_table) - mono @ mono_table
+    if ntype == "RNA":
+        if structures is None:
+            return strand1
+        au_counts, gc_counts = _get_pair_counts(codes, starts, lengths, structures)
+        frac_au = au_counts / lengths
+        frac_gc = gc_counts / lengths
+        hc_val = frac_au * 0.26 + frac_gc * 0.059
+        return np.round((1 - hc_val) * strand1).astype(np.int64)
+    if not double_stranded:
+        return strand1
+    # the reverse complement swaps each step XY to comp(Y)comp(X), with codes
+    # A=0, C=1, G=2, T=3 the complement of a code is 3 - code
+    strand2 = np.einsum("nij,ij->n", di, di_table[::-1, ::-1].T)
+    strand2 -= mono @ mono_table[::-1]
+    frac_at = (counts[:, 0] + counts[:, 3]) / lengths
+    hc_val = frac_at * 0.287 + (1 - frac_at) * 0.059
+    return np.round((1 - hc_val) * (strand1 + strand2)).astype(np.int64)
@@ -0,0 +1,396 @@
+"""
+reading and writing libraries as csv, parquet, arrow ipc (feather), fasta,
+fastq or seq_tools library (seqlib) files, the format is picked from the file
+extension and anything unknown is treated as csv. Fasta and fastq files can
+be gzipped. Parquet and feather need pyarrow which is only imported when one
+of those formats is used
+"""
+
+import gzip
+import os
+
+import pandas as pd
+
+from seq_tools.library import LibraryFileWriter, SequenceLibrary
+
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+    ".fa": "fasta",
+    ".fasta": "fasta",
+    ".fna": "fasta",
+    ".fq": "fastq",
+    ".fastq": "fastq",
+    ".seqlib": "seqlib",
+}
+# columns stored in the sequence file formats
+SEQUENCE_FORMATS = {
+    "fasta": ["name", "sequence"],
+    "fastq": ["name", "sequence", "quality"],
+}
+# characters read from a fasta or fastq file at a time
+BLOCK_SIZE = 1 << 24
+# gzip level used when writing, higher levels are many times slower for
+# little gain on sequence files
+GZIP_LEVEL = 1
+
+
+def get_format(path) -> str:
+    """
+    returns the file format of a library from its extension
+    :param path: path to the file
+    :return: csv, parquet, feather, fasta, fastq or seqlib
+    """
+    path = str(path).lower()
+    if path.endswith(".gz"):
+        path = path[:-3]
+    return FORMATS.get(os.path.splitext(path)[1], "csv")
+
+
+def _import_pyarrow():
+    """
+    imports pyarrow with its ipc and parquet modules
+    :return: pyarrow module
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError(
+            "pyarrow is required for parquet and feather files, "
+            "pip install rna_seq_tools[arrow]"
+        ) from exc
+    return pyarrow
+
+
+def _get_columns(names, columns) -> list:
+    """
+    projects the requested columns onto the columns in a file, missing
+    columns are skipped so optional columns such as `name` can be requested
+    :param names: columns present in the file
+    :param columns: requested columns, None keeps all
+    :return: list of column names in file order
+    """
+    if columns is None:
+        return list(names)
+    return [name for name in names if name in columns]
+
+
+def _open_table(path, fmt, memory_map):
+    """
+    opens a parquet or feather file without reading its data
+    :param path: path to the file
+    :param fmt: parquet or feather
+    :param memory_map: memory map the file instead of reading it
+    :return: pyarrow.parquet.ParquetFile or pyarrow.ipc.RecordBatchFileReader
+    """
+    pa = _import_pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.ParquetFile(path, memory_map=memory_map)
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    return pa.ipc.open_file(source)
+
+
+def _open_text(path, mode):
+    """
+    opens a text file with a large buffer, gzipped if the path ends in .gz
+    :param path: path to the file
+    :param mode: r or w
+    :return: text file object
+    """
+    if str(path).lower().endswith(".gz"):
+        return gzip.open(path, mode + "t", GZIP_LEVEL, encoding="utf-8")
+    return open(path, mode, encoding="utf-8", buffering=BLOCK_SIZE)
+
+
+def _parse_fasta(text) -> tuple:
+    """
+    parses complete fasta records, the common layout of one line per
+    sequence is split in one pass and wrapped sequences are joined per record
+    :param text: fasta records starting with `>`
+    :return: tuple of (names, sequences)
+    """
+    # windows line endings would otherwise end up in names and sequences
+    text = text.strip().replace("\r\n", "\n")
+    if not text:
+        return [], []
+    if not text.startswith(">"):
+        raise ValueError("fasta records must start with >")
+    lines = text.split("\n")
+    n_records = text.count("\n>") + 1
+    if len(lines) == 2 * n_records and all(h[:1] == ">" for h in lines[0::2]):
+        return [h[1:].strip() for h in lines[0::2]], lines[1::2]
+    names, seqs = [], []
+    for record in text[1:].split("\n>"):
+        header, _, seq = record.partition("\n")
+        names.append(header.strip())
+        seqs.append(seq.replace("\n", ""))
+    return names, seqs
+
+
+def _iter_fasta(f):
+    """
+    yields the records of a fasta file a block at a time
+    :param f: text file object
+    :return: generator of (names, sequences)
+    """
+    tail = ""
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            break
+        text = tail + block
+        # only parse up to the last record that is known to be complete
+        cut = text.rfind("\n>")
+        if cut == -1:
+            tail = text
+            continue
+        tail = text[cut + 1 :]
+        yield _parse_fasta(text[:cut])
+    yield _parse_fasta(tail)
+
+
+def _parse_fastq(lines) -> tuple:
+    """
+    parses complete four line fastq records
+    :param lines: lines of the records
+    :return: tuple of (names, sequences, qualities)
+    """
+    if len(lines) % 4 != 0:
+        raise ValueError("fastq records must have four lines")
+    headers, pluses = lines[0::4], lines[2::4]
+    if not all(h[:1] == "@" for h in headers) or not all(p[:1] == "+" for p in pluses):
+        raise ValueError("fastq records must start with @ and have a + line")
+    return [h[1:].strip() for h in headers], lines[1::4], lines[3::4]
+
+
+def _iter_fastq(f):
+    """
+    yields the records of a fastq file a block at a time
+    :param f: text file object
+    :return: generator of (names, sequences, qualities)
+    """
+    tail = ""
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            break
+        # a \r cut off from its \n at the end of a block stays in the tail
+        lines = (tail + block).replace("\r\n", "\n").split("\n")
+        # the last line may be cut off, keep it and any partial record
+        n_lines = (len(lines) - 1) // 4 * 4
+        tail = "\n".join(lines[n_lines:])
+        yield _parse_fastq(lines[:n_lines])
+    yield _parse_fastq([line.rstrip("\r") for line in tail.split("\n") if line])
+
+
+def _read_sequence_chunks(path, fmt, chunksize=None, columns=None):
+    """
+    reads a fasta or fastq file chunksize records at a time
+    :param path: path to the file, may be gzipped
+    :param fmt: fasta or fastq
+    :param chunksize: max number of rows per chunk, None reads one chunk
+    :param columns: only keep these columns
+    :return: generator of pd.DataFrame
+    """
+    names = _get_columns(SEQUENCE_FORMATS[fmt], columns)
+    iter_records = _iter_fasta if fmt == "fasta" else _iter_fastq
+    pending = [[] for _ in SEQUENCE_FORMATS[fmt]]
+    with _open_text(path, "r") as f:
+        for records in iter_records(f):
+            for values, new_values in zip(pending, records):
+                values.extend(new_values)
+            while chunksize is not None and len(pending[0]) >= chunksize:
+                yield _to_dataframe(
+                    [values[:chunksize] for values in pending], fmt, names
+                )
+                pending = [values[chunksize:] for values in pending]
+    if pending[0] or chunksize is None:
+        yield _to_dataframe(pending, fmt, names)
+
+
+def _to_dataframe(values, fmt, names) -> pd.DataFrame:
+    """
+    builds a dataframe from the columns of parsed records
+    """
+    data = dict(zip(SEQUENCE_FORMATS[fmt], values))
+    return pd.DataFrame({name: data[name] for name in names})
+
+
+def read_library(path, columns=None, memory_map=False) -> pd.DataFrame:
+    """
+    reads a library file
+    :param path: path to a csv, parquet, feather, fasta, fastq or seqlib file
+    :param columns: only load these columns, columns missing from the file
+    are ignored
+    :param memory_map: memory map parquet and feather files
+    :return: pd.DataFrame
+    """
+    fmt = get_format(path)
+    if fmt in SEQUENCE_FORMATS:
+        return next(_read_sequence_chunks(path, fmt, None, columns))
+    if fmt == "seqlib":
+        with SequenceLibrary(path) as lib:
+            return lib.to_dataframe(columns)
+    if fmt == "csv":
+        usecols = None if columns is None else lambda name: name in columns
+        return pd.read_csv(path, usecols=usecols)
+    reader = _open_table(path, fmt, memory_map)
+    names = _get_columns(reader.schema.names, columns)
+    if fmt == "parquet":
+        table = reader.read(columns=names)
+    else:
+        table = reader.read_all().select(names)
+    return table.to_pandas()
+
+
+def read_library_chunks(path, chunksize, columns=None, memory_map=False):
+    """
+    reads a library file chunksize rows at a time
+    :param path: path to a csv, parquet, feather, fasta, fastq or seqlib file
+    :param chunksize: max number of rows per chunk
+    :param columns: only load these columns, columns missing from the file
+    are ignored
+    :param memory_map: memory map parquet and feather files
+    :return: generator of pd.DataFrame
+    """
+    fmt = get_format(path)
+    if fmt in SEQUENCE_FORMATS:
+        yield from _read_sequence_chunks(path, fmt, chunksize, columns)
+        return
+    if fmt == "seqlib":
+        with SequenceLibrary(path) as lib:
+            yield from lib.iter_chunks(chunksize, columns)
+        return
+    if fmt == "csv":
+        usecols = None if columns is None else lambda name: name in columns
+        yield from pd.read_csv(path, usecols=usecols, chunksize=chunksize)
+        return
+    reader = _open_table(path, fmt, memory_map)
+    names = _get_columns(reader.schema.names, columns)
+    if fmt == "parquet":
+        for batch in reader.iter_batches(batch_size=chunksize, columns=names):
+            yield batch.to_pandas()
+        return
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i).select(names)
+        for start in range(0, batch.num_rows, chunksize):
+            yield batch.slice(start, chunksize).to_pandas()
+
+
+def format_fasta(df) -> str:
+    """
+    formats the `name` and `sequence` columns as fasta records
+    :param df: dataframe
+    :return: str
+    """
+    lines = [""] * (2 * len(df))
+    lines[0::2] = [f">{name}" for name in df["name"]]
+    lines[1::2] = df["sequence"].tolist()
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def format_fastq(df) -> str:
+    """
+    formats the `name`, `sequence` and `quality` columns as fastq records
+    :param df: dataframe
+    :return: str
+    """
+    if "quality" not in df.columns:
+        raise ValueError("quality column is required to write fastq")
+    lines = ["+"] * (4 * len(df))
+    lines[0::4] = [f"@{name}" for name in df["name"]]
+    lines[1::4] = df["sequence"].tolist()
+    lines[3::4] = df["quality"].tolist()
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_library(df, path) -> None:
+    """
+    writes a library file
+    :param df: dataframe
+    :param path: path to a csv, parquet, feather, fasta, fastq or seqlib file
+    :return: None
+    """
+    with LibraryWriter(path) as writer:
+        writer.write(df)
+
+
+class LibraryWriter:
+    """
+    writes a library file a chunk at a time, every chunk must have the same
+    columns
+    """
+
+    def __init__(self, path, fmt=None):
+        """
+        :param path: path to a csv, parquet, feather, fasta, fastq or seqlib file
+        :param fmt: file format, by default it is picked from the extension
+        """
+        self.path = path
+        self.format = fmt or get_format(path)
+        self._writer = None
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is not None and isinstance(self._writer, LibraryFileWriter):
+            # a library is only assembled once every chunk was written
+            self._writer.abort()
+            self._writer = None
+        self.close()
+
+    def write(self, df) -> None:
+        """
+        appends a chunk to the file
+        :param df: dataframe
+        :return: None
+        """
+        if self.format in SEQUENCE_FORMATS:
+            text = format_fasta(df) if self.format == "fasta" else format_fastq(df)
+            if self._writer is None:
+                self._writer = _open_text(self.path, "w")
+            self._writer.write(text)
+            self._started = True
+            return
+        if self.format == "seqlib":
+            if self._writer is None:
+                self._writer = LibraryFileWriter(self.path)
+            self._writer.write(df)
+            self._started = True
+            return
+        if self.format == "csv":
+            df.to_csv(
+                self.path,
+                index=False,
+                mode="a" if self._started else "w",
+                header=not self._started,
+            )
+            self._started = True
+            return
+        pa = _import_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            if self.format == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+        self._started = True
+
+    def close(self) -> None:
+        """
+        finishes the file
+        :return: None
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,311 @@
+"""
+folding of whole libraries with vienna, folds are run in parallel and are
+cached in memory and optionally in a persistent on-disk database so a
+sequence is never folded twice
+"""
+
+import collections
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+from seq_tools.parallel import map_chunks
+
+# environment variable pointing to the default fold cache database
+FOLD_CACHE_ENV = "SEQ_TOOLS_FOLD_CACHE"
+# default number of folds kept in memory by a FoldCache
+DEFAULT_MAX_MEMORY = 100000
+
+
+class FoldCache:
+    """
+    two tier cache of vienna fold results, a bounded in memory lru in front of
+    an optional sqlite database. Results are keyed by the sha1 hash of each
+    sequence, both tiers evict the least recently used folds once they are
+    full
+    """
+
+    def __init__(self, path=None, max_memory=DEFAULT_MAX_MEMORY, max_disk=None):
+        """
+        opens or creates the cache database
+        :param path: path to the sqlite database, None only caches in memory
+        :param max_memory: max number of folds kept in memory, 0 disables the
+        memory tier
+        :param max_disk: max number of folds kept in the database, None is
+        unbounded
+        """
+        self.path = path
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        if path is None:
+            return
+        # the server answers requests from several threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS folds "
+            "(key TEXT PRIMARY KEY, dot_bracket TEXT, mfe REAL, ens_defect REAL)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(folds)")]
+        if "used" not in columns:
+            # databases from older versions have no access times
+            self._conn.execute("ALTER TABLE folds ADD COLUMN used REAL DEFAULT 0")
+        self._conn.commit()
+
+    def __len__(self):
+        """
+        return the number of cached folds
+        """
+        if self._conn is None:
+            return len(self._memory)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM folds").fetchone()[0]
+
+    def get_key(self, seq) -> str:
+        """
+        returns the cache key of a sequence
+        :param seq: sequence
+        :return: str
+        """
+        return hashlib.sha1(seq.encode("utf-8")).hexdigest()
+
+    def get_stats(self) -> dict:
+        """
+        returns hit and miss counts and the size of each tier
+        :return: dictionary with memory_hits, disk_hits, misses, evictions,
+        hit_rate, memory_size and disk_size
+        """
+        stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        stats["memory_size"] = len(self._memory)
+        stats["disk_size"] = len(self) if self._conn is not None else 0
+        return stats
+
+    def get_many(self, seqs) -> dict:
+        """
+        looks up the fold results of many sequences
+        :param seqs: list of sequences
+        :return: dictionary of sequence to (dot_bracket, mfe, ens_defect) for
+        the sequences found in the cache
+        """
+        with self._lock:
+            found = {}
+            keys = {}
+            memory_keys = []
+            for seq in seqs:
+                key = self.get_key(seq)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[seq] = self._memory[key]
+                    memory_keys.append(key)
+                else:
+                    keys[key] = seq
+            self.stats["memory_hits"] += len(found)
+            if self._conn is not None and self.max_disk is not None and memory_keys:
+                # folds served from memory are still the most used on disk
+                self._touch(memory_keys)
+                self._conn.commit()
+            from_disk = {}
+            if self._conn is not None and keys:
+                from_disk = self._get_disk(keys)
+                self._set_memory({self.get_key(s): r for s, r in from_disk.items()})
+                found.update(from_disk)
+            self.stats["disk_hits"] += len(from_disk)
+            self.stats["misses"] += len(keys) - len(from_disk)
+            return found
+
+    def _get_disk(self, keys) -> dict:
+        """
+        looks up keys in the database and marks them as used
+        :param keys: dictionary of key to sequence
+        :return: dictionary of sequence to fold result
+        """
+        key_list = list(keys)
+        found = {}
+        # stay under the sqlite limit on query parameters
+        for i in range(0, len(key_list), 500):
+            batch = key_list[i : i + 500]
+            params = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                "SELECT key, dot_bracket, mfe, ens_defect FROM folds "
+                f"WHERE key IN ({params})",
+                batch,
+            )
+            for key, dot_bracket, mfe, ens_defect in rows:
+                found[keys[key]] = (dot_bracket, mfe, ens_defect)
+        if self.max_disk is not None:
+            self._touch(key_list)
+            self._conn.commit()
+        return found
+
+    def _touch(self, keys) -> None:
+        """
+        marks keys in the database as used now, keys that are not stored are
+        ignored
+        :param keys: list of keys
+        """
+        now = time.time()
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            params = ",".join("?" * len(batch))
+            self._conn.execute(
+                f"UPDATE folds SET used = ? WHERE key IN ({params})", [now, *batch]
+            )
+
+    def _set_memory(self, results) -> None:
+        """
+        adds results to the memory tier and evicts the oldest ones
+        :param results: dictionary of key to fold result
+        """
+        if self.max_memory <= 0:
+            return
+        for key, res in results.items():
+            self._memory[key] = res
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def set_many(self, results) -> None:
+        """
+        stores fold results
+        :param results: dictionary of sequence to (dot_bracket, mfe, ens_defect)
+        :return: None
+        """
+        with self._lock:
+            keyed = {self.get_key(seq): res for seq, res in results.items()}
+            self._set_memory(keyed)
+            if self._conn is None:
+                return
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO folds VALUES (?, ?, ?, ?, ?)",
+                [(key, *res, now) for key, res in keyed.items()],
+            )
+            if self.max_disk is not None:
+                excess = len(self) - self.max_disk
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM folds WHERE key IN "
+                        "(SELECT key FROM folds ORDER BY used, rowid LIMIT ?)",
+                        (excess,),
+                    )
+                    self.stats["evictions"] += excess
+            self._conn.commit()
+
+    def close(self) -> None:
+        """
+        closes the database connection
+        :return: None
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# caches shared by every fold in the process, by database path and limits
+_CACHES = {}
+# every cache fold_sequences has used, including ones passed in directly
+_USED_CACHES = weakref.WeakSet()
+
+
+def get_cache(path=None, max_memory=None, max_disk=None) -> FoldCache:
+    """
+    returns the cache shared by the process for a database, so the memory
+    tier is kept between calls. Each set of limits gets its own cache so
+    callers never resize a cache someone else is using
+    :param path: path to the sqlite database, None for the memory only cache
+    :param max_memory: max number of folds kept in memory, None is the
+    FoldCache default
+    :param max_disk: max number of folds kept in the database, None is
+    unbounded
+    :return: FoldCache
+    """
+    path = None if path is None else os.path.abspath(path)
+    if max_memory is None:
+        max_memory = DEFAULT_MAX_MEMORY
+    key = (path, max_memory, max_disk)
+    if key not in _CACHES:
+        _CACHES[key] = FoldCache(path, max_memory, max_disk)
+    return _CACHES[key]
+
+
+def get_caches() -> list:
+    """
+    returns the caches shared by the process and any other cache that
+    fold_sequences has used
+    :return: list of FoldCache
+    """
+    caches = list(_CACHES.values())
+    return caches + [cache for cache in _USED_CACHES if cache not in caches]
+
+
+def get_default_cache(max_memory=None, max_disk=None):
+    """
+    returns the shared cache of the database pointed to by the
+    SEQ_TOOLS_FOLD_CACHE environment variable, or the shared memory only
+    cache if it is not set
+    :param max_memory: max number of folds kept in memory, see get_cache
+    :param max_disk: max number of folds kept in the database, see get_cache
+    :return: FoldCache
+    """
+    return get_cache(os.environ.get(FOLD_CACHE_ENV) or None, max_memory, max_disk)
+
+
+def _fold_chunk(seqs) -> list:
+    """
+    folds a chunk of sequences, runs inside the worker processes
+    :param seqs: list of sequences
+    :return: list of (dot_bracket, mfe, ens_defect)
+    """
+    # vienna is slow to import and only needed once something is folded
+    # pylint: disable=import-outside-toplevel
+    import vienna
+
+    results = []
+    for seq in seqs:
+        v_res = vienna.fold(seq)
+        results.append((v_res.dot_bracket, v_res.mfe, v_res.ens_defect))
+    return results
+
+
+def fold_sequences(
+    seqs, workers=1, chunksize=None, cache=None, backend="process"
+) -> list:
+    """
+    folds a library of sequences. Each unique sequence is folded at most once
+    and sequences already in the cache are not folded at all
+    :param seqs: list of sequences
+    :param workers: number of workers to fold with, None uses all cores
+    :param chunksize: number of sequences sent to a worker at once
+    :param cache: FoldCache or path to a database whose shared cache is
+    used, defaults to get_default_cache(), False disables caching
+    :param backend: serial, thread or process, see parallel.map_columns
+    :return: list of (dot_bracket, mfe, ens_defect) in the order of seqs
+    """
+    seqs = list(seqs)
+    if cache is False:
+        cache = None
+    elif cache is None:
+        cache = get_default_cache()
+    elif isinstance(cache, (str, os.PathLike)):
+        cache = get_cache(cache)
+    unique_seqs = list(dict.fromkeys(seqs))
+    results = {}
+    if cache is not None:
+        _USED_CACHES.add(cache)
+        results = cache.get_many(unique_seqs)
+    missing = [seq for seq in unique_seqs if seq not in results]
+    folded = map_chunks(_fold_chunk, missing, workers, chunksize, backend=backend)
+    folded = dict(zip(missing, folded))
+    results.update(folded)
+    if cache is not None and folded:
+        cache.set_many(folded)
+    return [results[seq] for seq in seqs]
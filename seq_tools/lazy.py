@@ -0,0 +1,453 @@
+"""
+lazy chains of dataframe operations. Steps are only recorded until collect is
+called, consecutive sequence transforms are then merged so each whole column
+kernel runs once and the output dataframe is built once instead of copying
+it for every step
+
+    df = pipeline(df).trim(20, 0).to_rna().mw("RNA").fold().collect()
+"""
+
+import inspect
+import json
+import os
+
+import pandas as pd
+
+from seq_tools import extinction_coeff, folding, sequence
+from seq_tools.dataframe import determine_ntype, translate_sequences
+
+# names of the Pipeline methods that add a step
+STEPS = (
+    "add",
+    "trim",
+    "to_dna",
+    "to_dna_template",
+    "to_rna",
+    "transcribe",
+    "fold",
+    "length",
+    "mw",
+    "ec",
+    "rc",
+)
+
+
+def _merge_mappings(first, second) -> dict:
+    """
+    returns the character mapping of translating with first and then second
+    """
+    merged = {char: second.get(new, new) for char, new in first.items()}
+    for char, new in second.items():
+        merged.setdefault(char, new)
+    return merged
+
+
+# how two consecutive transforms of the same kind combine into one
+_MERGES = {
+    "trim": lambda first, second: (first[0] + second[0], first[1] + second[1]),
+    "add": lambda first, second: (second[0] + first[0], first[1] + second[1]),
+    "translate": _merge_mappings,
+}
+
+
+def _push(transforms, kind, arg) -> None:
+    """
+    appends a column transform, merging it into the one before it where
+    possible so each column kernel runs at most once per flush
+    :param transforms: list of (kind, arg) pending transforms
+    :param kind: trim with (p5_length, p3_length), add with (p5_seq, p3_seq)
+    or translate with a character mapping
+    :param arg: argument of the transform
+    """
+    if transforms and transforms[-1][0] == kind:
+        transforms[-1] = (kind, _MERGES[kind](transforms[-1][1], arg))
+    elif kind == "translate" and transforms and transforms[-1][0] == "add":
+        # translating the flanks moves the translation in front of the add
+        _, (p5_seq, p3_seq) = transforms.pop()
+        table = str.maketrans(arg)
+        _push(transforms, kind, arg)
+        _push(transforms, "add", (p5_seq.translate(table), p3_seq.translate(table)))
+    else:
+        transforms.append((kind, arg))
+
+
+def _apply(values: pd.Series, transforms) -> pd.Series:
+    """
+    runs pending transforms with the vectorized column operations
+    """
+    for kind, arg in transforms:
+        if kind == "trim":
+            values = values.str.slice(arg[0] or None, -arg[1] or None)
+        elif kind == "add":
+            values = arg[0] + values + arg[1]
+        else:
+            values = translate_sequences(values, arg)
+    return values
+
+
+class Pipeline:
+    """
+    records dataframe operations and runs them at collect. The same operations
+    as in seq_tools.dataframe are available and give the same results
+    """
+
+    def __init__(self, df: pd.DataFrame, steps=()):
+        """
+        :param df: dataframe with a `sequence` column, it is never modified
+        :param steps: recorded steps, use the methods to add steps
+        """
+        if "sequence" not in df.columns:
+            raise ValueError("sequence column not found")
+        self.df = df
+        self.steps = tuple(steps)
+
+    def __repr__(self):
+        steps = " -> ".join(name for name, _ in self.steps)
+        return f"Pipeline({len(self.df)} sequences: {steps or 'no steps'})"
+
+    def _then(self, name, **kwargs):
+        """
+        returns a new pipeline with one more step
+        """
+        return Pipeline(self.df, self.steps + ((name, kwargs),))
+
+    def add(self, p5_seq="", p3_seq="", workers=1, cache=None):
+        """
+        adds a 5' and 3' sequence, refolds if there is a structure
+        """
+        return self._then(
+            "add", p5_seq=p5_seq, p3_seq=p3_seq, workers=workers, cache=cache
+        )
+
+    def trim(self, p5_length, p3_length):
+        """
+        trims the sequences and structures
+        """
+        return self._then("trim", p5_length=p5_length, p3_length=p3_length)
+
+    def to_dna(self):
+        """
+        converts the sequences to DNA and drops the structure
+        """
+        return self._then("to_dna")
+
+    def to_dna_template(self):
+        """
+        converts the sequences to DNA templates and drops the structure
+        """
+        return self._then("to_dna_template")
+
+    def to_rna(self):
+        """
+        converts the sequences to RNA
+        """
+        return self._then("to_rna")
+
+    def transcribe(self, ignore_missing_t7=False, workers=1, cache=None):
+        """
+        removes the T7 promoter, converts to RNA and folds
+        """
+        return self._then(
+            "transcribe",
+            ignore_missing_t7=ignore_missing_t7,
+            workers=workers,
+            cache=cache,
+        )
+
+    def fold(self, workers=1, cache=None):
+        """
+        folds the sequences into `structure`, `mfe` and `ens_defect`
+        """
+        return self._then("fold", workers=workers, cache=cache)
+
+    def length(self):
+        """
+        stores the length of each sequence in `length`
+        """
+        return self._then("length")
+
+    def mw(self, ntype=None, double_stranded=False):
+        """
+        stores the molecular weight in `mw`, if ntype is not given it is
+        determined from the sequences
+        """
+        return self._then("mw", ntype=ntype, double_stranded=double_stranded)
+
+    def ec(self, ntype=None, double_stranded=False):
+        """
+        stores the extinction coefficient in `extinction_coeff`, if ntype is not given it is
+        determined from the sequences
+        """
+        return self._then("ec", ntype=ntype, double_stranded=double_stranded)
+
+    def rc(self, ntype=None):
+        """
+        stores the reverse complement in `rev_comp`, if ntype is not given it
+        is determined from the sequences
+        """
+        return self._then("rc", ntype=ntype)
+
+    def collect(self, ntype=None) -> pd.DataFrame:
+        """
+        runs the recorded steps
+        :param ntype: nucleotide type of the input, by default it is
+        determined once when a step first needs it
+        :return: a new dataframe, the input dataframe is not modified
+        """
+        return _Run(self.df, ntype).run(self.steps)
+
+
+class _Run:
+    """
+    state of one run of a pipeline
+    """
+
+    def __init__(self, df, ntype=None):
+        self.df = df
+        self.ntype = ntype
+        self.seqs = df["sequence"]
+        self.structs = None
+        if "structure" in df.columns:
+            self.structs = df["structure"]
+        self.seq_transforms = []
+        self.struct_transforms = []
+        self.seqs_changed = False
+        self.structs_changed = False
+        self.drop_structure = False
+        self.columns = {}
+
+    def run(self, steps) -> pd.DataFrame:
+        """
+        runs the steps and builds the output dataframe
+        """
+        for name, kwargs in steps:
+            getattr(self, f"_{name}")(**kwargs)
+        self._flush()
+        df = self.df.copy(deep=False)
+        if self.drop_structure:
+            df = df.drop(columns=["structure"], errors="ignore")
+        if self.seqs_changed:
+            df["sequence"] = self.seqs
+        if self.structs_changed:
+            self.columns["structure"] = self.structs
+        for col, values in self.columns.items():
+            df[col] = values
+        return df
+
+    def _flush(self) -> None:
+        """
+        applies the pending transforms to each column, consecutive transforms
+        have already been merged so every kernel runs once
+        """
+        if self.seq_transforms:
+            self.seqs = _apply(self.seqs, self.seq_transforms)
+            self.seqs_changed = True
+            self.seq_transforms = []
+        if self.struct_transforms:
+            self.structs = _apply(self.structs, self.struct_transforms)
+            self.structs_changed = True
+            self.struct_transforms = []
+
+    def _get_ntype(self, ntype) -> str:
+        """
+        returns ntype or the type of the current sequences, which is only
+        determined once
+        """
+        if ntype is not None:
+            return ntype
+        if self.ntype is None:
+            self._flush()
+            self.ntype = determine_ntype(pd.DataFrame({"sequence": self.seqs}))
+        return self.ntype
+
+    def _drop_structure(self) -> None:
+        self.structs = None
+        self.struct_transforms = []
+        self.structs_changed = False
+        self.drop_structure = True
+        self.columns.pop("structure", None)
+
+    def _add(self, p5_seq, p3_seq, workers, cache):
+        _push(self.seq_transforms, "add", (p5_seq, p3_seq))
+        if self.structs is not None:
+            self._fold(workers, cache)
+
+    def _trim(self, p5_length, p3_length):
+        _push(self.seq_transforms, "trim", (p5_length, p3_length))
+        if self.structs is not None:
+            _push(self.struct_transforms, "trim", (p5_length, p3_length))
+
+    def _to_dna(self):
+        _push(self.seq_transforms, "translate", {"U": "T"})
+        self.ntype = "DNA"
+        self._drop_structure()
+
+    def _to_dna_template(self):
+        self._to_dna()
+        _push(self.seq_transforms, "add", (sequence.T7_PROMOTER, ""))
+
+    def _to_rna(self):
+        _push(self.seq_transforms, "translate", {"T": "U"})
+        self.ntype = "RNA"
+
+    def _transcribe(self, ignore_missing_t7, workers, cache):
+        if not ignore_missing_t7:
+            self._flush()
+            if not self.seqs.str.startswith(sequence.T7_PROMOTER).all():
+                raise ValueError("not all sequences start with T7 promoter")
+            self._trim(len(sequence.T7_PROMOTER), 0)
+        self._to_rna()
+        self._fold(workers, cache)
+
+    def _fold(self, workers, cache):
+        self._flush()
+        results = folding.fold_sequences(self.seqs.tolist(), workers, cache=cache)
+        self.structs = pd.Series([res[0] for res in results], index=self.seqs.index)
+        self.structs_changed = True
+        # a refold keeps the structure column where it is, as dataframe.fold
+        self.columns["structure"] = self.structs
+        self.columns["mfe"] = [res[1] for res in results]
+        self.columns["ens_defect"] = [res[2] for res in results]
+
+    def _length(self):
+        self._flush()
+        self.columns["length"] = [len(seq) for seq in self.seqs.tolist()]
+
+    def _mw(self, ntype, double_stranded):
+        ntype = self._get_ntype(ntype)
+        self._flush()
+        self.columns["mw"] = sequence.get_molecular_weights(
+            self.seqs.tolist(), ntype, double_stranded, self.df.index
+        )
+
+    def _ec(self, ntype, double_stranded):
+        ntype = self._get_ntype(ntype)
+        self._flush()
+        structs = (
+            self.structs.tolist()
+            if ntype == "RNA" and self.structs is not None
+            else None
+        )
+        self.columns["extinction_coeff"] = extinction_coeff.get_extinction_coeffs(
+            self.seqs.tolist(), ntype, double_stranded, structs
+        )
+
+    def _rc(self, ntype):
+        ntype = self._get_ntype(ntype)
+        self._flush()
+        self.columns["rev_comp"] = sequence.get_reverse_complements(
+            self.seqs.tolist(), ntype
+        )
+
+
+def _parse_value(value):
+    """
+    converts a value from a step string to a bool, int or str
+    """
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _bind_step(name, positional, kwargs) -> tuple:
+    """
+    checks a step name and binds its arguments to the Pipeline method
+    :param name: step name, dashes are read as underscores
+    :param positional: list of positional arguments
+    :param kwargs: dictionary of keyword arguments
+    :return: tuple of (name, kwargs)
+    """
+    name = name.strip().replace("-", "_")
+    if name not in STEPS:
+        raise ValueError(f"unknown step {name}, must be one of {', '.join(STEPS)}")
+    method = getattr(Pipeline, name)
+    try:
+        bound = inspect.signature(method).bind(None, *positional, **kwargs)
+    except TypeError as exc:
+        raise ValueError(f"invalid arguments for step {name}: {exc}") from exc
+    bound.arguments.pop("self")
+    return name, dict(bound.arguments)
+
+
+def parse_step(text) -> tuple:
+    """
+    parses a step written as `name` or `name:arg,arg,key=value`, e.g.
+    `trim:20,0`, `add:GGAA,` or `mw:ntype=RNA,double_stranded=true`.
+    Dashes in the name are read as underscores so cli names can be used
+    :param text: step string
+    :return: tuple of (name, kwargs)
+    """
+    name, _, args = text.partition(":")
+    positional, kwargs = [], {}
+    if args:
+        for arg in args.split(","):
+            key, sep, value = arg.partition("=")
+            if sep:
+                kwargs[key.strip()] = _parse_value(value.strip())
+            else:
+                positional.append(_parse_value(arg.strip()))
+    return _bind_step(name, positional, kwargs)
+
+
+def load_steps(path) -> list:
+    """
+    reads steps from a json or yaml file. The file holds a list, or a
+    dictionary with a `steps` list, of step strings or dictionaries with the
+    step name under `step` and its arguments as the other keys
+    :param path: path to a .json, .yml or .yaml file
+    :return: list of (name, kwargs)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yml", ".yaml"):
+            try:
+                # pylint: disable=import-outside-toplevel
+                import yaml
+            except ImportError as exc:
+                raise ImportError("pyyaml is required for yaml step files") from exc
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    if isinstance(spec, dict):
+        spec = spec["steps"]
+    steps = []
+    for step in spec:
+        if isinstance(step, str):
+            steps.append(parse_step(step))
+            continue
+        step = dict(step)
+        if "step" not in step:
+            raise ValueError(f"step {step} has no `step` name")
+        name = step.pop("step")
+        if ":" in name:
+            # arguments can also be given in the name, the keys add to them
+            name, kwargs = parse_step(name)
+            step = {**kwargs, **step}
+        steps.append(_bind_step(name, [], step))
+    return steps
+
+
+def build_pipeline(df: pd.DataFrame, steps) -> Pipeline:
+    """
+    builds a pipeline from a list of steps
+    :param df: dataframe with a `sequence` column
+    :param steps: list of (name, kwargs) from parse_step or load_steps
+    :return: Pipeline
+    """
+    chain = Pipeline(df)
+    for name, kwargs in steps:
+        if name not in STEPS:
+            raise ValueError(f"unknown step {name}")
+        chain = getattr(chain, name)(**kwargs)
+    return chain
+
+
+def pipeline(df: pd.DataFrame) -> Pipeline:
+    """
+    starts a lazy chain of operations on a dataframe
+    :param df: dataframe with a `sequence` column
+    :return: Pipeline
+    """
+    return Pipeline(df)
@@ -0,0 +1,473 @@
+"""
+native seq_tools library files. Columns are stored back to back in one file
+that is memory mapped when opened, so rows and slices are read without
+loading the library. Sequences are packed at 2 bits per base, other text
+columns are utf-8 with offsets and numeric columns are raw arrays. A hash
+index on `name` finds a row in O(1)
+
+    fileio.write_library(df, "designs.seqlib")
+    with SequenceLibrary("designs.seqlib") as lib:
+        df_hits = lib.lookup(["design_12", "design_904"])
+
+the file starts with an 8 byte magic and the length of a json header that
+describes where the sections of each column are, every section is aligned to
+8 bytes so it can be viewed as a numpy array in place
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from seq_tools import encoding
+from seq_tools.packed import PackedSequenceArray, get_offsets, pack_codes
+
+MAGIC = b"SEQTLIB1"
+ALIGNMENT = 8
+# column the hash index is built on
+INDEX_COLUMN = "name"
+# sequences unpacked at a time, small chunks avoid large temporary arrays
+UNPACK_CHUNKSIZE = 10000
+# sections stored for each kind of column
+SECTIONS = {
+    "packed": ["data", "starts", "lengths", "ambig_pos", "ambig_chars"],
+    "string": ["ends", "nulls", "data"],
+    "numeric": ["values"],
+}
+
+
+def _get_padding(size) -> int:
+    return -size % ALIGNMENT
+
+
+def _hash_name(name) -> int:
+    return zlib.crc32(name.encode("utf-8"))
+
+
+def _build_index(hashes) -> np.ndarray:
+    """
+    builds an open addressing hash table with linear probing. Rows are placed
+    in rounds, each free slot goes to the lowest row probing it, so a row is
+    always found before any later row with the same name
+    :param hashes: hash of each row, -1 for rows that are not indexed
+    :return: np.ndarray of int64 with row + 1 in each used slot and 0 in
+    empty ones
+    """
+    size = ALIGNMENT
+    while size < 2 * len(hashes):
+        size *= 2
+    table = np.zeros(size, dtype=np.int64)
+    pending = np.flatnonzero(hashes >= 0)
+    slots = hashes[pending] & (size - 1)
+    while len(pending):
+        free = table[slots] == 0
+        claimed, first = np.unique(slots[free], return_index=True)
+        table[claimed] = pending[free][first] + 1
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[np.flatnonzero(free)[first]] = True
+        pending = pending[~placed]
+        slots = (slots[~placed] + 1) & (size - 1)
+    return table
+
+
+class LibraryFileWriter:
+    """
+    writes a library file a chunk at a time, every chunk must have the same
+    columns. Each column is streamed to a temporary file next to the output,
+    the file is assembled and the name index built when it is closed
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of the library file
+        """
+        self.path = path
+        self._dir = tempfile.mkdtemp(
+            prefix=".seqlib", dir=os.path.dirname(os.path.abspath(path))
+        )
+        self._specs = None
+        self._state = []
+        self._files = {}
+        self._hashes = []
+        self._n_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        # a failed write must not leave a truncated library behind
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    @staticmethod
+    def _get_spec(name, values) -> dict:
+        """
+        picks how a column is stored from its first chunk
+        """
+        spec = {"name": str(name)}
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            spec.update(kind="numeric", dtype=dtype.str)
+        elif name == "sequence" and not values.isna().any():
+            spec.update(kind="packed", ntype=None)
+        else:
+            spec.update(kind="string", ascii=True)
+        return spec
+
+    def _append(self, col, section, data) -> None:
+        """
+        appends bytes to the temporary file of a section
+        """
+        key = (col, section)
+        if key not in self._files:
+            path = os.path.join(self._dir, f"{col}.{section}")
+            self._files[key] = open(path, "wb")  # pylint: disable=consider-using-with
+        self._files[key].write(np.ascontiguousarray(data).tobytes())
+
+    def write(self, df) -> None:
+        """
+        appends a chunk to the library
+        :param df: dataframe
+        :return: None
+        """
+        if self._specs is None:
+            self._specs = [self._get_spec(name, df[name]) for name in df.columns]
+            self._state = [{"bytes": 0, "bases": 0} for _ in self._specs]
+        elif [str(name) for name in df.columns] != [s["name"] for s in self._specs]:
+            raise ValueError("every chunk must have the same columns")
+        for col, spec in enumerate(self._specs):
+            values = df.iloc[:, col]
+            if spec["kind"] == "numeric":
+                self._append(col, "values", values.to_numpy(dtype=spec["dtype"]))
+            elif spec["kind"] == "packed":
+                self._write_packed(col, spec, values)
+            else:
+                texts = self._write_string(col, spec, values)
+                if spec["name"] == INDEX_COLUMN:
+                    nulls = values.isna().to_numpy()
+                    self._hashes.append(
+                        np.array(
+                            [
+                                -1 if null else _hash_name(t)
+                                for t, null in zip(texts, nulls)
+                            ],
+                            dtype=np.int64,
+                        )
+                    )
+        self._n_rows += len(df)
+
+    def _write_packed(self, col, spec, values) -> None:
+        """
+        packs a chunk of sequences, each chunk starts on a new byte of the
+        packed data
+        """
+        if values.isna().any():
+            raise ValueError("sequence column has missing values")
+        state = self._state[col]
+        buffer, _, lengths = encoding.to_byte_buffer(values)
+        if spec["ntype"] is None:
+            has_t = bool(np.any(buffer == ord("T")))
+            has_u = bool(np.any(buffer == ord("U")))
+            if has_t or has_u:
+                spec["ntype"] = "RNA" if has_u and not has_t else "DNA"
+        codes = encoding.NUC_TABLE[buffer]
+        is_ambig = codes == encoding.INVALID_CODE
+        # T and U share a code, the one that is not the ntype is kept exactly
+        other = "T" if spec["ntype"] == "RNA" else "U"
+        is_ambig |= buffer == ord(other)
+        ambig_pos = np.flatnonzero(is_ambig)
+        codes[ambig_pos] = 0
+        data = pack_codes(codes)
+        self._append(col, "data", data)
+        self._append(col, "starts", state["bases"] + get_offsets(lengths))
+        self._append(col, "lengths", lengths)
+        self._append(col, "ambig_pos", state["bases"] + ambig_pos)
+        self._append(col, "ambig_chars", buffer[ambig_pos])
+        state["bases"] += 4 * len(data)
+
+    def _write_string(self, col, spec, values) -> list:
+        """
+        writes a chunk of a text column, anything that is not a str is
+        stored as its string form
+        :return: the texts written
+        """
+        state = self._state[col]
+        nulls = values.isna().to_numpy()
+        texts = ["" if null else str(v) for v, null in zip(values.tolist(), nulls)]
+        joined = "".join(texts)
+        if joined.isascii():
+            data = joined.encode("ascii")
+            lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        else:
+            spec["ascii"] = False
+            encoded = [t.encode("utf-8") for t in texts]
+            data = b"".join(encoded)
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(texts))
+        self._append(col, "ends", state["bytes"] + np.cumsum(lengths))
+        self._append(col, "nulls", nulls.astype(np.uint8))
+        self._append(col, "data", np.frombuffer(data, dtype=np.uint8))
+        state["bytes"] += len(data)
+        return texts
+
+    def close(self) -> None:
+        """
+        assembles the library file and removes the temporary files
+        :return: None
+        """
+        if self._dir is None:
+            return
+        try:
+            for f in self._files.values():
+                f.close()
+            self._assemble()
+        finally:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def abort(self) -> None:
+        """
+        removes the temporary files without writing the library file
+        :return: None
+        """
+        if self._dir is None:
+            return
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._dir = None
+
+    def _assemble(self) -> None:
+        sections, columns = [], []
+        offset = 0
+        for col, spec in enumerate(self._specs or []):
+            spec = dict(spec, sections={})
+            for section in SECTIONS[spec["kind"]]:
+                path = os.path.join(self._dir, f"{col}.{section}")
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                spec["sections"][section] = [offset, size]
+                sections.append((path, size))
+                offset += size + _get_padding(size)
+            columns.append(spec)
+        index = None
+        if self._hashes:
+            index = _build_index(np.concatenate(self._hashes))
+        header = {
+            "version": 1,
+            "n_rows": self._n_rows,
+            "columns": columns,
+            "index": None,
+        }
+        if index is not None:
+            header["index"] = {"column": INDEX_COLUMN, "offset": offset}
+            header["index"]["size"] = int(index.nbytes)
+        header = json.dumps(header).encode("utf-8")
+        header += b" " * _get_padding(len(header))
+        with open(self.path, "wb") as out:
+            out.write(MAGIC)
+            out.write(len(header).to_bytes(8, "little"))
+            out.write(header)
+            for path, size in sections:
+                if size:
+                    with open(path, "rb") as f:
+                        shutil.copyfileobj(f, out, 1 << 24)
+                out.write(b"\0" * _get_padding(size))
+            if index is not None:
+                out.write(index.tobytes())
+
+
+class SequenceLibrary:
+    """
+    a memory mapped library file, rows are only read when they are selected
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of a library file written by LibraryFileWriter
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a seq_tools library file")
+            size = int.from_bytes(f.read(8), "little")
+            self.header = json.loads(f.read(size))
+        self.path = path
+        self._start = len(MAGIC) + 8 + size
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self._specs = {spec["name"]: spec for spec in self.header["columns"]}
+        self.columns = list(self._specs)
+        self._packed = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.header["n_rows"]
+
+    def __repr__(self):
+        return f"SequenceLibrary({self.path}, {len(self)} rows)"
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def __getitem__(self, item):
+        """
+        returns a row as a pd.Series for a name or an integer position,
+        slices and arrays of positions return a dataframe
+        """
+        if isinstance(item, str):
+            return self.lookup([item]).iloc[0]
+        if isinstance(item, (int, np.integer)):
+            return self.get_rows([item]).iloc[0]
+        return self.get_rows(item)
+
+    def close(self) -> None:
+        """
+        releases the memory map
+        :return: None
+        """
+        self._buffer = None
+        self._packed = {}
+
+    def _section(self, spec, section, dtype) -> np.ndarray:
+        offset, size = spec["sections"][section]
+        start = self._start + offset
+        return self._buffer[start : start + size].view(dtype)
+
+    def _find(self, name):
+        """
+        returns the row of a name or None
+        """
+        if self.header["index"] is None:
+            raise KeyError(f"library has no {INDEX_COLUMN} index")
+        index = self.header["index"]
+        start = self._start + index["offset"]
+        table = self._buffer[start : start + index["size"]].view(np.int64)
+        spec = self._specs[index["column"]]
+        slot = _hash_name(name) & (len(table) - 1)
+        while True:
+            row = int(table[slot]) - 1
+            if row < 0:
+                return None
+            if self._read_strings(spec, np.array([row]))[0] == name:
+                return row
+            slot = (slot + 1) & (len(table) - 1)
+
+    def get_row(self, name) -> int:
+        """
+        returns the position of the first row with a name
+        :param name: value of the `name` column
+        :return: int
+        """
+        row = self._find(name)
+        if row is None:
+            raise KeyError(name)
+        return row
+
+    def lookup(self, names, columns=None) -> pd.DataFrame:
+        """
+        reads the rows with the given names
+        :param names: list of names, raises KeyError if one is missing
+        :param columns: only read these columns
+        :return: pd.DataFrame indexed by row position
+        """
+        return self.get_rows(
+            np.array([self.get_row(name) for name in names], dtype=np.int64), columns
+        )
+
+    def get_rows(self, rows, columns=None) -> pd.DataFrame:
+        """
+        reads rows by position
+        :param rows: slice or list of positions
+        :param columns: only read these columns, missing columns are ignored
+        :return: pd.DataFrame indexed by row position
+        """
+        if isinstance(rows, slice):
+            index = pd.RangeIndex(len(self))[rows]
+            rows = np.arange(index.start, index.stop, index.step, dtype=np.int64)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            index = pd.Index(rows)
+        names = self.columns
+        if columns is not None:
+            names = [name for name in names if name in columns]
+        data = {}
+        for name in names:
+            spec = self._specs[name]
+            if spec["kind"] == "numeric":
+                data[name] = np.array(
+                    self._section(spec, "values", spec["dtype"])[rows]
+                )
+            elif spec["kind"] == "packed":
+                packed = self._get_packed(spec)
+                data[name] = []
+                for start in range(0, len(rows), UNPACK_CHUNKSIZE):
+                    chunk = rows[start : start + UNPACK_CHUNKSIZE]
+                    data[name].extend(packed[chunk].to_list())
+            else:
+                data[name] = self._read_strings(spec, rows)
+        return pd.DataFrame(data, index=index, columns=names)
+
+    def _get_packed(self, spec) -> PackedSequenceArray:
+        name = spec["name"]
+        if name not in self._packed:
+            self._packed[name] = PackedSequenceArray(
+                self._section(spec, "data", np.uint8),
+                self._section(spec, "starts", np.int64),
+                self._section(spec, "lengths", np.int64),
+                spec["ntype"] or "DNA",
+                self._section(spec, "ambig_pos", np.int64),
+                self._section(spec, "ambig_chars", np.uint8),
+            )
+        return self._packed[name]
+
+    def _read_strings(self, spec, rows) -> list:
+        """
+        decodes a text column at rows, consecutive ascii rows are decoded in
+        one pass
+        """
+        if len(rows) == 0:
+            return []
+        ends = self._section(spec, "ends", np.int64)
+        data = self._section(spec, "data", np.uint8)
+        stops = np.array(ends[rows])
+        starts = np.where(rows > 0, ends[np.maximum(rows - 1, 0)], 0)
+        if spec["ascii"] and np.all(np.diff(rows) == 1):
+            lo = int(starts[0])
+            values = encoding.from_byte_buffer(
+                data[lo : int(stops[-1])], starts - lo, stops - starts
+            )
+        else:
+            values = [
+                data[s:e].tobytes().decode("utf-8")
+                for s, e in zip(starts.tolist(), stops.tolist())
+            ]
+        nulls = self._section(spec, "nulls", np.uint8)[rows]
+        for i in np.flatnonzero(nulls):
+            values[i] = None
+        return values
+
+    def to_dataframe(self, columns=None) -> pd.DataFrame:
+        """
+        reads the whole library
+        :param columns: only read these columns
+        :return: pd.DataFrame
+        """
+        return self.get_rows(slice(None), columns)
+
+    def iter_chunks(self, chunksize, columns=None):
+        """
+        reads the library chunksize rows at a time
+        :param chunksize: max number of rows per chunk
+        :param columns: only read these columns
+        :return: generator of pd.DataFrame
+        """
+        for start in range(0, len(self), chunksize):
+            yield self.get_rows(slice(start, start + chunksize), columns)
@@ -0,0 +1,280 @@
+"""
+compact storage of large libraries, sequences are packed at 2 bits per base
+into one contiguous numpy buffer. Bases that are not A, C, G or T/U are kept
+in a sparse side table so every sequence round trips exactly
+"""
+
+import functools
+
+import numpy as np
+
+from seq_tools import encoding
+
+# complement of ambiguous iupac codes, anything missing is its own complement
+IUPAC_COMPLEMENT = {
+    "R": "Y",
+    "Y": "R",
+    "K": "M",
+    "M": "K",
+    "B": "V",
+    "V": "B",
+    "D": "H",
+    "H": "D",
+}
+BASES = {
+    "DNA": np.frombuffer(b"ACGT", np.uint8),
+    "RNA": np.frombuffer(b"ACGU", np.uint8),
+}
+
+
+def get_offsets(lengths) -> np.ndarray:
+    """
+    returns where each sequence starts if they are laid out back to back
+    :param lengths: length of each sequence
+    :return: np.ndarray of int64
+    """
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    if len(lengths) > 1:
+        np.cumsum(lengths[:-1], out=offsets[1:])
+    return offsets
+
+
+def pack_codes(codes) -> np.ndarray:
+    """
+    packs 2 bit codes 4 to a byte, the first base is in the lowest bits
+    :param codes: np.ndarray of uint8 codes between 0 and 3
+    :return: np.ndarray of uint8
+    """
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[: len(codes)] = codes
+    padded = padded.reshape(-1, 4)
+    return padded[:, 0] | padded[:, 1] << 2 | padded[:, 2] << 4 | padded[:, 3] << 6
+
+
+@functools.lru_cache(maxsize=None)
+def get_complement_table(ntype) -> np.ndarray:
+    """
+    returns a byte table that complements the characters kept in the side
+    table, upper and lower case as in sequence.get_complement_map, anything
+    else maps to itself
+    :param ntype: DNA or RNA
+    :return: np.ndarray of uint8
+    """
+    # sequence imports this module
+    from seq_tools import sequence  # pylint: disable=import-outside-toplevel
+
+    return encoding.get_translation_table(sequence.get_complement_map(ntype))
+
+
+class PackedSequenceArray:
+    """
+    an immutable array of sequences stored at 2 bits per base. Selecting rows
+    and trimming ends share the packed buffer with the original array
+    """
+
+    def __init__(self, data, starts, lengths, ntype, ambig_pos=None, ambig_chars=None):
+        """
+        use PackedSequenceArray.from_sequences to build an array from strings
+        :param data: packed codes from pack_codes
+        :param starts: position of the first base of each sequence in data
+        :param lengths: length of each sequence
+        :param ntype: DNA or RNA, sets whether code 3 is T or U
+        :param ambig_pos: sorted positions of bases that are not A, C, G, T/U
+        :param ambig_chars: ascii value of each ambiguous base
+        """
+        if ntype not in BASES:
+            raise ValueError(f"ntype must be DNA or RNA not {ntype}")
+        self.data = data
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.ntype = ntype
+        if ambig_pos is None:
+            ambig_pos = np.zeros(0, dtype=np.int64)
+            ambig_chars = np.zeros(0, dtype=np.uint8)
+        self.ambig_pos = ambig_pos
+        self.ambig_chars = ambig_chars
+
+    @classmethod
+    def from_sequences(cls, seqs, ntype=None):
+        """
+        packs a list of sequences
+        :param seqs: iterable of sequences
+        :param ntype: DNA or RNA, by default it is determined from the
+        sequences. T and U are stored the same way so given an ntype the
+        sequences are converted to it
+        :return: PackedSequenceArray
+        """
+        buffer, _, lengths = encoding.to_byte_buffer(seqs)
+        if ntype is None:
+            has_t = bool(np.any(buffer == ord("T")))
+            has_u = bool(np.any(buffer == ord("U")))
+            if has_t and has_u:
+                raise ValueError("Cannot determine nucleotide type")
+            ntype = "RNA" if has_u else "DNA"
+        codes = encoding.NUC_TABLE[buffer]
+        ambig_pos = np.flatnonzero(codes == encoding.INVALID_CODE)
+        codes[ambig_pos] = 0
+        return cls(
+            pack_codes(codes),
+            get_offsets(lengths),
+            lengths,
+            ntype,
+            ambig_pos,
+            buffer[ambig_pos],
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __repr__(self):
+        return f"PackedSequenceArray({len(self)} {self.ntype} sequences)"
+
+    def __getitem__(self, item):
+        """
+        returns a sequence as a str for an integer index, slices and arrays of
+        indices return a PackedSequenceArray sharing this array's buffer
+        """
+        if isinstance(item, (int, np.integer)):
+            return self._select([item]).to_list()[0]
+        return self._select(item)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        number of bytes used by the array
+        """
+        return sum(
+            arr.nbytes
+            for arr in (
+                self.data,
+                self.starts,
+                self.lengths,
+                self.ambig_pos,
+                self.ambig_chars,
+            )
+        )
+
+    def _select(self, item):
+        """
+        returns the sequences selected by item sharing the packed buffer
+        """
+        return self._replace(self.starts[item], self.lengths[item], self.ntype)
+
+    def _replace(self, starts, lengths, ntype):
+        """
+        returns a new array over the same buffer
+        """
+        return PackedSequenceArray(
+            self.data, starts, lengths, ntype, self.ambig_pos, self.ambig_chars
+        )
+
+    def _positions(self, reverse=False) -> np.ndarray:
+        """
+        returns the buffer position of every base in order
+        :param reverse: give the bases of each sequence from 3' to 5'
+        :return: np.ndarray of int64
+        """
+        offsets = get_offsets(self.lengths)
+        steps = np.arange(int(self.lengths.sum()), dtype=np.int64)
+        if reverse:
+            firsts = self.starts + self.lengths - 1 + offsets
+            return np.repeat(firsts, self.lengths) - steps
+        return np.repeat(self.starts - offsets, self.lengths) + steps
+
+    def _gather(self, positions):
+        """
+        reads the bases at positions
+        :param positions: buffer positions
+        :return: tuple of (codes, ambig_mask, ambig_chars) where ambig_chars
+        are the ascii values of the bases flagged in ambig_mask
+        """
+        codes = (self.data[positions >> 2] >> ((positions & 3) << 1)) & 3
+        mask = np.zeros(len(positions), dtype=bool)
+        if len(self.ambig_pos) == 0:
+            return codes, mask, np.zeros(0, dtype=np.uint8)
+        idx = np.searchsorted(self.ambig_pos, positions)
+        idx[idx == len(self.ambig_pos)] = 0
+        mask = self.ambig_pos[idx] == positions
+        return codes, mask, self.ambig_chars[idx[mask]]
+
+    def get_codes(self):
+        """
+        returns the sequences in the format of encoding.encode without
+        building any strings
+        :return: tuple of (codes, starts, lengths)
+        """
+        codes, mask, _ = self._gather(self._positions())
+        codes[mask] = encoding.INVALID_CODE
+        return codes, get_offsets(self.lengths), self.lengths.copy()
+
+    def to_list(self) -> list:
+        """
+        unpacks the sequences
+        :return: list of str
+        """
+        codes, mask, chars = self._gather(self._positions())
+        buffer = BASES[self.ntype][codes]
+        buffer[mask] = chars
+        return encoding.from_byte_buffer(
+            buffer, get_offsets(self.lengths), self.lengths
+        )
+
+    def get_lengths(self) -> np.ndarray:
+        """
+        returns the length of each sequence
+        :return: np.ndarray of int64
+        """
+        return self.lengths.copy()
+
+    def get_gc_count(self) -> np.ndarray:
+        """
+        counts G and C bases in each sequence
+        :return: np.ndarray of int64
+        """
+        codes, mask, _ = self._gather(self._positions())
+        is_gc = ((codes == 1) | (codes == 2)) & ~mask
+        return encoding.segment_sum(is_gc, get_offsets(self.lengths), self.lengths)
+
+    def to_dna(self):
+        """
+        returns the sequences as DNA, the buffer is shared
+        :return: PackedSequenceArray
+        """
+        return self._replace(self.starts, self.lengths, "DNA")
+
+    def to_rna(self):
+        """
+        returns the sequences as RNA, the buffer is shared
+        :return: PackedSequenceArray
+        """
+        return self._replace(self.starts, self.lengths, "RNA")
+
+    def trim(self, p5_length, p3_length):
+        """
+        removes bases from the ends of each sequence, the buffer is shared
+        :param p5_length: number of bases to remove from 5'
+        :param p3_length: number of bases to remove from 3'
+        :return: PackedSequenceArray
+        """
+        p5_length = np.minimum(p5_length, self.lengths)
+        lengths = np.maximum(self.lengths - p5_length - p3_length, 0)
+        return self._replace(self.starts + p5_length, lengths, self.ntype)
+
+    def get_reverse_complement(self, ntype=None):
+        """
+        reverse complements each sequence into a new buffer
+        :param ntype: DNA or RNA, defaults to the ntype of the array
+        :return: PackedSequenceArray
+        """
+        codes, mask, chars = self._gather(self._positions(reverse=True))
+        return PackedSequenceArray(
+            pack_codes(3 - codes),
+            get_offsets(self.lengths),
+            self.lengths.copy(),
+            ntype or self.ntype,
+            np.flatnonzero(mask),
+            get_complement_table(ntype or self.ntype)[chars],
+        )
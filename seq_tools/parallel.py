@@ -0,0 +1,115 @@
+"""
+helpers for running work over chunks of a library in this process, a thread
+pool or a process pool
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ways chunks can be run, threads suit work that releases the gil such as
+# numpy kernels, processes suit pure python work such as folding
+BACKENDS = ("serial", "thread", "process")
+
+
+def get_workers(workers=None) -> int:
+    """
+    returns the number of workers to use
+    :param workers: requested number of workers, None uses all cores
+    :return: int
+    """
+    if workers is None or workers < 1:
+        return os.cpu_count() or 1
+    return workers
+
+
+def get_chunks(items, chunksize) -> list:
+    """
+    splits a list into chunks of at most chunksize items
+    :param items: list of items
+    :param chunksize: max number of items per chunk
+    :return: list of lists
+    """
+    return [items[i : i + chunksize] for i in range(0, len(items), chunksize)]
+
+
+def map_columns(
+    func,
+    columns,
+    workers=1,
+    chunksize=None,
+    backend="process",
+    initializer=None,
+    initargs=(),
+) -> list:
+    """
+    applies func to aligned chunks of one or more columns and reassembles
+    the results in the original order. Only the given columns are sent to
+    the workers, func is called with one chunk of each column and must
+    return a list as long as the chunks. With the process backend func must
+    be a top level function or a functools.partial of one
+    :param func: function to apply to each chunk
+    :param columns: list of equally long lists or pd.Series
+    :param workers: number of workers, 1 runs in this process, None uses all
+    cores
+    :param chunksize: number of rows per chunk, defaults to the whole column
+    in this process and to 4 chunks per worker in a pool
+    :param backend: serial, thread or process
+    :param initializer: called once in each worker before any chunk, used to
+    set up large read only state without sending it with every chunk
+    :param initargs: arguments for initializer
+    :return: list of results
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}, must be one of {BACKENDS}")
+    columns = [col.tolist() if hasattr(col, "tolist") else list(col) for col in columns]
+    n_rows = len(columns[0]) if columns else 0
+    workers = 1 if backend == "serial" else get_workers(workers)
+    if chunksize is None:
+        chunksize = -(-n_rows // (workers * 4)) if workers > 1 else n_rows
+    chunksize = max(1, chunksize)
+    chunks = [get_chunks(col, chunksize) for col in columns]
+    results = []
+    if workers == 1 or n_rows <= chunksize:
+        if initializer is not None:
+            initializer(*initargs)
+        if n_rows == 0:
+            return func(*columns)
+        for args in zip(*chunks):
+            results.extend(func(*args))
+        return results
+    executor_class = ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor
+    with executor_class(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    ) as executor:
+        for chunk_results in executor.map(func, *chunks):
+            results.extend(chunk_results)
+    return results
+
+
+def map_chunks(
+    func,
+    items,
+    workers=1,
+    chunksize=None,
+    initializer=None,
+    initargs=(),
+    backend="process",
+) -> list:
+    """
+    applies func to chunks of items and reassembles the results in the
+    original order, see map_columns
+    :param func: function that takes a list and returns a list of the same
+    length
+    :param items: list of items
+    :param workers: number of workers, 1 runs in this process, None uses all
+    cores
+    :param chunksize: number of items sent to a worker at once, defaults to
+    splitting the items into 4 chunks per worker
+    :param initializer: called once in each worker before any chunk
+    :param initargs: arguments for initializer
+    :param backend: serial, thread or process
+    :return: list of results
+    """
+    return map_columns(
+        func, [items], workers, chunksize, backend, initializer, initargs
+    )
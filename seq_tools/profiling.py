@@ -0,0 +1,226 @@
+"""
+opt-in timing of dataframe operations. Operations decorated with `timed`
+cost a single check when no profiler is active, inside `profile()` each call
+records its wall time, rows per second, peak memory and fold cache hits
+
+    with profile("report.json") as prof:
+        df = dataframe.transcribe(df)
+    prof.get_report()
+"""
+
+import cProfile
+import functools
+import json
+import time
+import tracemalloc
+
+from seq_tools.logger import get_logger
+
+# profilers that are currently recording, innermost last
+_ACTIVE = []
+
+
+def _get_fold_cache_stats() -> dict:
+    """
+    returns the hits and misses of every fold cache folds have gone through,
+    shared caches and caches passed to fold_sequences directly
+    :return: dictionary of cache to (hits, misses)
+    """
+    # pylint: disable=import-outside-toplevel
+    from seq_tools import folding
+
+    return {
+        cache: (
+            cache.stats["memory_hits"] + cache.stats["disk_hits"],
+            cache.stats["misses"],
+        )
+        for cache in folding.get_caches()
+    }
+
+
+def _get_fold_cache_change(start) -> tuple:
+    """
+    returns the hits and misses since start, caches first used after start
+    count from zero
+    :param start: output of _get_fold_cache_stats
+    :return: tuple of (hits, misses)
+    """
+    hits, misses = 0, 0
+    for cache, (cache_hits, cache_misses) in _get_fold_cache_stats().items():
+        start_hits, start_misses = start.get(cache, (0, 0))
+        hits += cache_hits - start_hits
+        misses += cache_misses - start_misses
+    return hits, misses
+
+
+class _Call:
+    """
+    measurements of one running operation
+    """
+
+    def __init__(self, name, rows, memory):
+        self.name = name
+        self.rows = rows
+        self.memory = memory
+        self.child_peak = 0
+        self.cache_start = _get_fold_cache_stats()
+        self.mem_start = 0
+        if memory:
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+
+
+class Profiler:
+    """
+    records the operations run while it is active
+    """
+
+    def __init__(self, report_path=None, cprofile_path=None, memory=True):
+        """
+        :param report_path: write the json report here when stopped
+        :param cprofile_path: dump cProfile stats of the whole run here
+        :param memory: trace peak memory with tracemalloc, which slows
+        allocations down
+        """
+        self.report_path = report_path
+        self.cprofile_path = cprofile_path
+        self.memory = memory
+        self.operations = {}
+        self._calls = []
+        self._cprofile = None
+        self._start = None
+        self._seconds = 0.0
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self) -> None:
+        """
+        starts recording
+        :return: None
+        """
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.cprofile_path is not None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._start = time.perf_counter()
+        _ACTIVE.append(self)
+
+    def stop(self) -> None:
+        """
+        stops recording and writes the report and cProfile stats
+        :return: None
+        """
+        _ACTIVE.remove(self)
+        self._seconds = time.perf_counter() - self._start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if self.report_path is not None:
+            with open(self.report_path, "w", encoding="utf-8") as f:
+                json.dump(self.get_report(), f, indent=2)
+
+    def _enter(self, name, rows) -> None:
+        if self.memory and self._calls:
+            # keep the parent's peak before this call resets it
+            parent = self._calls[-1]
+            parent.child_peak = max(
+                parent.child_peak, tracemalloc.get_traced_memory()[1]
+            )
+        self._calls.append(_Call(name, rows, self.memory))
+
+    def _exit(self) -> None:
+        call = self._calls.pop()
+        seconds = time.perf_counter() - call.start
+        hits, misses = _get_fold_cache_change(call.cache_start)
+        op = self.operations.setdefault(
+            call.name,
+            {"calls": 0, "rows": 0, "seconds": 0.0, "peak_mb": 0.0},
+        )
+        op["calls"] += 1
+        op["rows"] += call.rows
+        op["seconds"] += seconds
+        if self.memory:
+            # the peak was reset when this call started, inner calls reset
+            # it again so their peaks are passed up
+            peak = max(tracemalloc.get_traced_memory()[1], call.child_peak)
+            op["peak_mb"] = max(op["peak_mb"], (peak - call.mem_start) / 1e6)
+            if self._calls:
+                parent = self._calls[-1]
+                parent.child_peak = max(parent.child_peak, peak)
+        if hits + misses > 0:
+            op["cache_hits"] = op.get("cache_hits", 0) + hits
+            op["cache_misses"] = op.get("cache_misses", 0) + misses
+
+    def get_report(self) -> dict:
+        """
+        returns the measurements of every operation
+        :return: dictionary with the total seconds and per operation calls,
+        rows, seconds, rows_per_second, peak_mb and, for operations that
+        folded, cache_hits, cache_misses and cache_hit_rate
+        """
+        operations = {}
+        for name, op in self.operations.items():
+            op = dict(op)
+            op["rows_per_second"] = op["rows"] / op["seconds"] if op["seconds"] else 0
+            if "cache_hits" in op:
+                lookups = op["cache_hits"] + op["cache_misses"]
+                op["cache_hit_rate"] = op["cache_hits"] / lookups
+            operations[name] = op
+        return {"seconds": self._seconds, "operations": operations}
+
+    def log_report(self) -> None:
+        """
+        logs one line per operation
+        :return: None
+        """
+        log = get_logger("profile")
+        for name, op in self.get_report()["operations"].items():
+            log.info(
+                f"{name}: {op['calls']} calls, {op['rows']} rows, "
+                f"{op['seconds']:.3f}s, {op['rows_per_second']:.0f} rows/s, "
+                f"peak {op['peak_mb']:.1f} MB"
+            )
+
+
+def profile(report_path=None, cprofile_path=None, memory=True) -> Profiler:
+    """
+    returns a profiler to use as a context manager around the code to measure
+    :param report_path: write the json report here when done
+    :param cprofile_path: dump cProfile stats of the whole run here
+    :param memory: trace peak memory
+    :return: Profiler
+    """
+    return Profiler(report_path, cprofile_path, memory)
+
+
+def timed(func):
+    """
+    decorator that records calls of a dataframe operation while a profiler is
+    active, the number of rows is the length of the first argument
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _ACTIVE:
+            return func(*args, **kwargs)
+        profiler = _ACTIVE[-1]
+        rows = len(args[0]) if args and hasattr(args[0], "__len__") else 0
+        profiler._enter(name, rows)  # pylint: disable=protected-access
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler._exit()  # pylint: disable=protected-access
+
+    return wrapper
@@ -2,6 +2,45 @@
 simple functions for gathering information about a sequence.
 """
 
+import numpy as np
+
+from seq_tools import encoding
+from seq_tools.packed import IUPAC_COMPLEMENT, PackedSequenceArray
+
+RNA_MW = {"A": 347.2, "C": 323.2, "G": 363.2, "U": 324.2}
+DNA_MW = {"A": 331.2, "C": 307.2, "G": 347.2, "T": 322.2}
+T7_PROMOTER = "TTCTAATACGACTCACTATA"
+
+
+def get_complement_map(ntype) -> dict:
+    """
+    returns the complement of every base and iupac ambiguity code, T and U
+    both complement to A and A complements to T or U depending on ntype
+    :param ntype: type of sequence (DNA or RNA)
+    :return: dictionary of base to complement in upper and lower case
+    """
+    t_or_u = "U" if ntype == "RNA" else "T"
+    comp = {"A": t_or_u, "T": "A", "U": "A", "G": "C", "C": "G"}
+    comp.update(IUPAC_COMPLEMENT)
+    comp.update({nuc: nuc for nuc in "SWN"})
+    comp.update({k.lower(): v.lower() for k, v in comp.items()})
+    return comp
+
+
+# str.translate tables for single sequences
+COMPLEMENT_TRANS = {
+    ntype: str.maketrans(get_complement_map(ntype)) for ntype in ["DNA", "RNA"]
+}
+# characters without a complement are left after translating with this
+VALID_BASES_TRANS = str.maketrans("", "", "".join(get_complement_map("DNA")))
+# byte lookup tables for whole libraries, 0 flags invalid characters
+COMPLEMENT_TABLES = {
+    ntype: encoding.get_code_table(
+        {k: ord(v) for k, v in get_complement_map(ntype).items()}, default=0
+    )
+    for ntype in ["DNA", "RNA"]
+}
+
 
 def get_max_stretch(seq) -> float:
     """
@@ -24,24 +63,34 @@ def get_max_stretch(seq) -> float:
     return max_stretch
 
 
+def get_max_stretches(seqs) -> np.ndarray:
+    """
+    computes the max stretch of the same letter in many sequences at once
+    :param seqs: list of sequences
+    :return: np.ndarray of int64
+    """
+    return encoding.get_max_runs(*encoding.to_byte_buffer(seqs))
+
+
 def get_molecular_weight(seq, ntype="DNA", double_stranded=False) -> float:
     """
     returns the molecular weight of a sequence
-    :param seq: the sequence
+    :param seq: the sequence, or a PackedSequenceArray to get an array with
+    the weight of every sequence
     :param ntype: type of sequence (DNA or RNA)
     :param double_stranded: is the sequence double stranded?
     :return: float
     """
-    rna_mw = {"A": 347.2, "C": 323.2, "G": 363.2, "U": 324.2}
-    dna_mw = {"A": 331.2, "C": 307.2, "G": 347.2, "T": 322.2}
+    if isinstance(seq, PackedSequenceArray):
+        return get_molecular_weights(seq, ntype, double_stranded)
 
     def compute_mw(seq, ntype):
         molecular_weight = 0
         for nuc in seq:
             if ntype == "RNA":
-                molecular_weight += rna_mw[nuc]
+                molecular_weight += RNA_MW[nuc]
             else:
-                molecular_weight += dna_mw[nuc]
+                molecular_weight += DNA_MW[nuc]
         return molecular_weight
 
     # enforce RNA or DNA typing
@@ -51,39 +100,80 @@ def get_molecular_weight(seq, ntype="DNA", double_stranded=False) -> float:
         seq = to_dna(seq)
     molecular_weight = compute_mw(seq, ntype)
     if double_stranded:
-        rev_comp = get_reverse_complement(seq, type)
+        rev_comp = get_reverse_complement(seq, ntype)
         molecular_weight += compute_mw(rev_comp, ntype)
     return molecular_weight
 
 
-def get_reverse_complement(seq, ntype="DNA") -> str:
+def get_molecular_weights(seqs, ntype="DNA", double_stranded=False, names=None):
     """
-    returns the reverse complement of a sequence
-    :param seq: sequence to reverse complement
+    returns the molecular weight of many sequences at once from their base
+    counts, sums are done in tenths of a dalton so results match
+    get_molecular_weight
+    :param seqs: list of sequences or a PackedSequenceArray
     :param ntype: type of sequence (DNA or RNA)
-    :return: reverse complement of sequence
+    :param double_stranded: are the sequences double stranded?
+    :param names: optional labels for each sequence used in error messages
+    :return: np.ndarray of float
     """
+    codes, starts, lengths = encoding.encode(seqs)
+    counts = encoding.count_codes(codes, starts, lengths)
+    encoding.check_valid(counts, names)
     if ntype == "RNA":
-        seq = to_rna(seq)
+        weights = [RNA_MW[nuc] for nuc in "ACGU"]
     else:
-        seq = to_dna(seq)
-    rev_comp = ""
-    rc_dna = {"A": "T", "T": "A", "G": "C", "C": "G"}
-    rc_rna = {"A": "U", "U": "A", "G": "C", "C": "G"}
-    for nuc in seq:
-        if ntype == "RNA":
-            rev_comp += rc_rna[nuc]
-        else:
-            rev_comp += rc_dna[nuc]
-    return rev_comp[::-1]
+        weights = [DNA_MW[nuc] for nuc in "ACGT"]
+    weights = np.rint(np.array(weights) * 10).astype(np.int64)
+    if double_stranded:
+        # complement of A,C,G,T/U is T/U,G,C,A, i.e. reversed code order
+        weights = weights + weights[::-1]
+    return (counts[:, :4] @ weights) / 10
+
+
+def get_reverse_complement(seq, ntype="DNA") -> str:
+    """
+    returns the reverse complement of a sequence, iupac ambiguity codes are
+    complemented too
+    :param seq: sequence to reverse complement or a PackedSequenceArray
+    :param ntype: type of sequence (DNA or RNA)
+    :return: reverse complement of sequence
+    """
+    if isinstance(seq, PackedSequenceArray):
+        return seq.get_reverse_complement(ntype)
+    if seq.translate(VALID_BASES_TRANS):
+        raise ValueError(f"invalid nucleotides found in sequence: {seq}")
+    if ntype != "RNA":
+        ntype = "DNA"
+    return seq.translate(COMPLEMENT_TRANS[ntype])[::-1]
+
+
+def get_reverse_complements(seqs, ntype="DNA") -> list:
+    """
+    returns the reverse complement of many sequences at once. The library is
+    joined into one byte buffer which is reversed and complemented in a single
+    pass, reversing the buffer also reverses the order of the sequences
+    :param seqs: list of sequences
+    :param ntype: type of sequence (DNA or RNA)
+    :return: list of reverse complements
+    """
+    if ntype != "RNA":
+        ntype = "DNA"
+    buffer, starts, lengths = encoding.to_byte_buffer(seqs)
+    rev_comp = COMPLEMENT_TABLES[ntype][buffer[::-1]]
+    if np.any(rev_comp == 0):
+        raise ValueError("invalid nucleotides found in sequences")
+    rev_starts = len(buffer) - starts - lengths
+    return encoding.from_byte_buffer(rev_comp, rev_starts, lengths)
 
 
 def to_dna(seq) -> str:
     """
     Convert RNA sequence to DNA
-    :param seq: RNA sequence
+    :param seq: RNA sequence or a PackedSequenceArray
     :return: DNA sequence
     """
+    if isinstance(seq, PackedSequenceArray):
+        return seq.to_dna()
     return seq.replace("U", "T")
 
 
@@ -93,13 +183,15 @@ def to_dna_template(seq) -> str:
     :param seq: RNA sequence
     :return: DNA sequence
     """
-    return "TTCTAATACGACTCACTATA" + to_dna(seq)
+    return T7_PROMOTER + to_dna(seq)
 
 
 def to_rna(seq) -> str:
     """
     Convert DNA sequence to RNA
-    :param seq: DNA sequence
+    :param seq: DNA sequence or a PackedSequenceArray
     :return: RNA sequence
     """
+    if isinstance(seq, PackedSequenceArray):
+        return seq.to_rna()
     return seq.replace("T", "U")
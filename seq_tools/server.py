@@ -0,0 +1,304 @@
+"""
+a warm seq-tools process that answers cli requests over a unix socket or
+stdin json lines, so callers that run many single sequence commands do not
+pay python startup and imports every time
+
+each request is one json line with the cli arguments, and optionally the
+directory relative paths are resolved against and an id that is echoed back
+
+    {"args": ["mw", "GGGGUUUUCCCC", "-nt", "RNA"], "cwd": "/data", "id": 1}
+
+commands given a single sequence are answered directly from the sequence
+functions with the output row as `result`, everything else runs the full
+command in the server and returns what it printed as `output`
+
+    {"ok": true, "result": {"name": "seq", "sequence": "...", "mw": 3902.4}}
+    {"ok": false, "error": "..."}
+
+nothing is ever printed to the real stdout, help is returned as `output` and
+usage errors as `error` with the usage line
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+import click
+
+# environment variable with the socket path used by serve and client
+SOCKET_ENV = "SEQ_TOOLS_SOCKET"
+
+
+def get_default_socket() -> str:
+    """
+    returns the socket path from SEQ_TOOLS_SOCKET or a per user default
+    :return: str
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".seq_tools.sock")
+
+
+def get_ntype(seq, ntype) -> str:
+    """
+    returns ntype or the type of a single sequence as the cli determines it,
+    any T makes it DNA, otherwise any U makes it RNA
+    """
+    if ntype is not None:
+        return ntype
+    if "T" not in seq and "U" in seq:
+        return "RNA"
+    return "DNA"
+
+
+class Server:
+    """
+    answers cli requests in one process, modules stay imported and folds are
+    kept in memory between requests
+    """
+
+    def __init__(self, cache=None):
+        """
+        :param cache: fold cache database or FoldCache, see
+        folding.fold_sequences
+        """
+        # pylint: disable=import-outside-toplevel
+        from seq_tools import cli, extinction_coeff, folding, sequence
+
+        self.cli = cli
+        self.extinction_coeff = extinction_coeff
+        self.folding = folding
+        self.sequence = sequence
+        self.cache = cache
+        # the full commands change the working directory and stdout
+        self._lock = threading.Lock()
+        self._handlers = {
+            "mw": self._mw,
+            "ec": self._ec,
+            "rc": self._rc,
+            "fold": self._fold,
+            "to-dna": self._convert(sequence.to_dna),
+            "to-dna-template": self._convert(sequence.to_dna_template),
+            "to-rna": self._convert(sequence.to_rna),
+        }
+
+    def handle(self, request) -> dict:
+        """
+        answers one request
+        :param request: dictionary with `args` and optionally `cwd` and `id`
+        :return: response dictionary
+        """
+        try:
+            response = self._handle(request["args"], request.get("cwd"))
+        except click.UsageError as exc:
+            error = f"Error: {exc.format_message()}"
+            if exc.ctx is not None:
+                error = exc.ctx.get_usage() + "\n" + error
+            response = {"ok": False, "error": error}
+        except Exception as exc:  # pylint: disable=broad-except
+            response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def handle_line(self, line) -> str:
+        """
+        answers one json line
+        :param line: json encoded request
+        :return: json encoded response without a newline
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as exc:
+            return json.dumps({"ok": False, "error": f"invalid json: {exc}"})
+        return json.dumps(self.handle(request))
+
+    def _handle(self, args, cwd) -> dict:
+        if not args:
+            raise ValueError("no command given")
+        cwd = cwd or os.getcwd()
+        handler = self._handlers.get(args[0])
+        if handler is not None:
+            out = io.StringIO()
+            # parsing prints help and some errors, keep them out of the
+            # stdio response stream
+            with self._lock, contextlib.redirect_stdout(out):
+                try:
+                    ctx = self.cli.cli.get_command(None, args[0]).make_context(
+                        f"seq-tools {args[0]}", list(args[1:])
+                    )
+                except click.exceptions.Exit:
+                    return {"ok": True, "output": out.getvalue()}
+            params = dict(ctx.params)
+            if params.get("cache"):
+                # the full commands run in cwd, resolve the database the same
+                params["cache"] = os.path.join(cwd, params["cache"])
+            data = params["data"]
+            if not os.path.isfile(os.path.join(cwd, data)):
+                row = {"name": "seq", "sequence": data}
+                row.update(handler(data, params))
+                return {"ok": True, "result": row}
+        return {"ok": True, "output": self._run_command(args, cwd)}
+
+    def _run_command(self, args, cwd) -> str:
+        """
+        runs a full cli command and returns what it printed
+        """
+        out = io.StringIO()
+        with self._lock, contextlib.redirect_stdout(out):
+            old_cwd = os.getcwd()
+            os.chdir(cwd)
+            try:
+                self.cli.cli.main(
+                    list(args), prog_name="seq-tools", standalone_mode=False
+                )
+            finally:
+                os.chdir(old_cwd)
+        return out.getvalue()
+
+    def _mw(self, seq, params) -> dict:
+        ntype = get_ntype(seq, params["ntype"])
+        # the batched version sums exactly like the cli does
+        weights = self.sequence.get_molecular_weights(
+            [seq], ntype, params["double_stranded"]
+        )
+        return {"mw": float(weights[0])}
+
+    def _ec(self, seq, params) -> dict:
+        ntype = get_ntype(seq, params["ntype"])
+        return {
+            "extinction_coeff": self.extinction_coeff.get_extinction_coeff(
+                seq, ntype, params["double_stranded"]
+            )
+        }
+
+    def _rc(self, seq, params) -> dict:
+        ntype = get_ntype(seq, params["ntype"])
+        return {"rev_comp": self.sequence.get_reverse_complement(seq, ntype)}
+
+    def _fold(self, seq, params) -> dict:
+        # the shared fold cache keeps its memory tier between requests
+        limits = params["cache_max_memory"], params["cache_max_disk"]
+        if params["cache"] or limits != (None, None):
+            # built like the fold command builds it
+            cache = self.cli.get_fold_cache(params["cache"], *limits)
+        else:
+            cache = self.cache
+        structure, mfe, ens_defect = self.folding.fold_sequences([seq], cache=cache)[0]
+        return {"structure": structure, "mfe": mfe, "ens_defect": ens_defect}
+
+    @staticmethod
+    def _convert(func):
+        return lambda seq, params: {"sequence": func(seq)}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    answers json lines on one connection until the client closes it
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.seq_server.handle_line(line)
+            self.wfile.write(response.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(path=None, cache=None, ready=None) -> None:
+    """
+    serves requests on a unix socket until interrupted
+    :param path: socket path, defaults to get_default_socket()
+    :param cache: fold cache database
+    :param ready: optional threading.Event set once the socket accepts
+    connections, the server is stored on it as `server`
+    :return: None
+    """
+    path = path or get_default_socket()
+    if os.path.exists(path):
+        os.remove(path)
+    with _UnixServer(path, _RequestHandler) as server:
+        server.seq_server = Server(cache)
+        if ready is not None:
+            ready.server = server
+            ready.set()
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def serve_stdio(cache=None, stdin=None, stdout=None) -> None:
+    """
+    serves json lines from stdin until it is closed, one response line is
+    written per request
+    :param cache: fold cache database
+    :param stdin: input stream, defaults to sys.stdin
+    :param stdout: output stream, defaults to sys.stdout
+    :return: None
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    seq_server = Server(cache)
+    for line in stdin:
+        if not line.strip():
+            continue
+        stdout.write(seq_server.handle_line(line) + "\n")
+        stdout.flush()
+
+
+class Client:
+    """
+    thin client for a running `seq-tools serve`, keeps one connection open so
+    each call is a single round trip
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: socket path, defaults to get_default_socket()
+        """
+        self.path = path or get_default_socket()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.path)
+        self._file = self._sock.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def call(self, args, cwd=None) -> dict:
+        """
+        sends cli arguments to the server
+        :param args: list of cli arguments, e.g. ["mw", "GGGG"]
+        :param cwd: directory relative paths are resolved against, defaults
+        to the current directory
+        :return: response dictionary
+        """
+        request = {"args": list(args), "cwd": cwd or os.getcwd()}
+        self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        """
+        closes the connection
+        :return: None
+        """
+        self._file.close()
+        self._sock.close()
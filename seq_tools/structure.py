@@ -3,9 +3,12 @@ simple functions for manipulating sequences and secondary structures
 """
 
 import re
+import functools
 import itertools
 from dataclasses import dataclass
-import pandas as pd
+import numpy as np
+
+from seq_tools import encoding
 
 
 @dataclass(frozen=True, order=True)
@@ -112,6 +115,165 @@ class SequenceStructure:
         return SequenceStructure(sequence, structure)
 
 
+class SequenceStructureQuery:
+    """
+    a compiled SequenceStructure motif that can be searched for in many
+    structures. Each strand becomes one regex over the sequence and structure
+    interleaved base by base, so both are matched in a single scan
+    """
+
+    def __init__(self, sub: SequenceStructure):
+        """
+        :param sub: the substructure to search for, strands are split on `&`
+        and `N` matches any base
+        """
+        self.sub = sub
+        self.strands = sub.split_strands()
+        self.patterns = []
+        for strand in self.strands:
+            parts = []
+            for nuc, dot in zip(strand.sequence, strand.structure):
+                parts.append(r"\S" if nuc == "N" else re.escape(nuc))
+                parts.append(re.escape(dot))
+            self.patterns.append(re.compile(r"(?=" + "".join(parts) + r")"))
+
+    def get_anchors(self) -> list:
+        """
+        returns the longest run of fixed bases in each strand
+        :return: list of str, empty for strands without fixed bases
+        """
+        return [max(strand.sequence.split("N"), key=len) for strand in self.strands]
+
+    @staticmethod
+    def _interleave(struct: SequenceStructure) -> str:
+        """
+        interleaves sequence and structure, `AC` and `()` become `A(C)`
+        """
+        pairs = zip(struct.sequence, struct.structure)
+        return "".join(itertools.chain.from_iterable(pairs))
+
+    @staticmethod
+    def _iter_starts(pattern, text):
+        """
+        yields the start of each match in an interleaved string, matches at odd
+        offsets are out of register and skipped
+        """
+        for m in pattern.finditer(text):
+            if m.start() % 2 == 0:
+                yield m.start() // 2
+
+    def find(self, struct: SequenceStructure, start=None, end=None) -> list:
+        """
+        find the position of the motif in a structure
+        :param struct: the structure to search
+        :param start: the start position to search from
+        :param end: the end position to search to
+        :return: list of tuples with one [start, end] per strand, for every
+        combination of strand matches
+        """
+        if start is None:
+            start = 0
+        if end is None:
+            end = len(struct)
+        text = self._interleave(struct[start:end])
+        strand_matches = []
+        for strand, pattern in zip(self.strands, self.patterns):
+            strand_matches.append(
+                [
+                    [pos + start, pos + len(strand) + start]
+                    for pos in self._iter_starts(pattern, text)
+                ]
+            )
+        return list(itertools.product(*strand_matches))
+
+    def has_match(self, struct: SequenceStructure) -> bool:
+        """
+        checks if the motif is in a structure, stops at the first match of
+        each strand
+        :param struct: the structure to search
+        :return: bool
+        """
+        text = self._interleave(struct)
+        for pattern in self.patterns:
+            if next(self._iter_starts(pattern, text), None) is None:
+                return False
+        return True
+
+
+class KmerIndex:
+    """
+    index of the rows of a library that contain each k-mer, used to skip rows
+    that cannot contain the fixed bases of a motif. T and U are indexed the
+    same and k-mers with other characters are not indexed
+    """
+
+    def __init__(self, seqs, k=8):
+        """
+        :param seqs: list of sequences
+        :param k: k-mer length, at most 16
+        """
+        if not 1 <= k <= 16:
+            raise ValueError(f"k must be between 1 and 16 not {k}")
+        self.k = k
+        self.n_seqs = len(seqs)
+        codes, starts, lengths = encoding.encode(seqs)
+        n_kmers = max(len(codes) - k + 1, 0)
+        values = np.zeros(n_kmers, dtype=np.int64)
+        for i in range(k):
+            values = (values << 2) | (codes[i : i + n_kmers] & 3)
+        invalid = np.concatenate([[0], np.cumsum(codes == encoding.INVALID_CODE)])
+        rows = np.repeat(np.arange(len(lengths)), lengths)[:n_kmers]
+        offsets = np.arange(n_kmers) - starts[rows]
+        keep = (offsets <= lengths[rows] - k) & (
+            invalid[k : k + n_kmers] == invalid[:n_kmers]
+        )
+        keys = np.unique(values[keep] * max(self.n_seqs, 1) + rows[keep])
+        self.kmers = keys // max(self.n_seqs, 1)
+        self.rows = keys % max(self.n_seqs, 1)
+
+    def get_rows(self, kmer) -> np.ndarray:
+        """
+        returns the rows that contain a k-mer
+        :param kmer: a sequence of length k of A, C, G and T/U
+        :return: sorted np.ndarray of row numbers
+        """
+        value = 0
+        for nuc in kmer:
+            value = (value << 2) | encoding.NUC_CODES[nuc]
+        lo, hi = np.searchsorted(self.kmers, [value, value + 1])
+        return self.rows[lo:hi]
+
+    def get_candidates(self, query: SequenceStructureQuery):
+        """
+        returns the rows that contain every indexable k-mer of the fixed bases
+        of a motif
+        :param query: compiled motif
+        :return: sorted np.ndarray of row numbers, or None if the motif has
+        no fixed run of k bases and every row is a candidate
+        """
+        rows = None
+        for anchor in query.get_anchors():
+            if len(anchor) < self.k or any(
+                nuc not in encoding.NUC_CODES for nuc in anchor
+            ):
+                continue
+            for i in range(len(anchor) - self.k + 1):
+                kmer_rows = self.get_rows(anchor[i : i + self.k])
+                rows = kmer_rows if rows is None else np.intersect1d(rows, kmer_rows)
+        return rows
+
+
+@functools.lru_cache(maxsize=128)
+def compile_query(sub: SequenceStructure) -> SequenceStructureQuery:
+    """
+    returns a compiled query for a substructure, queries are cached so
+    repeated calls to find with the same motif do not recompile it
+    :param sub: the substructure to search for
+    :return: SequenceStructureQuery
+    """
+    return SequenceStructureQuery(sub)
+
+
 def find(struct: SequenceStructure, sub: SequenceStructure, start=None, end=None):
     """
     find the position of a substructure in a structure
@@ -120,37 +282,4 @@ def find(struct: SequenceStructure, sub: SequenceStructure, start=None, end=None
     :param start: the start position to search from
     :param end: the end position to search to
     """
-    if start is None:
-        start = 0
-    if end is None:
-        end = len(struct)
-    struct = struct[start:end]
-    strands = sub.split_strands()
-    strand_matches = []
-    for strand in strands:
-        pattern_seq = re.compile(
-            (r"(?=(" + strand.sequence.replace("N", r"\S") + r"))")
-        )
-        pattern_ss = re.compile(
-            (
-                r"(?=("
-                + strand.structure.replace("(", r"\(")
-                .replace(")", r"\)")
-                .replace(".", r"\.")
-                + r"))"
-            )
-        )
-        matches_seq = [
-            str(m.start() + start) + "-" + str(m.end() + len(m.group(1)) + start)
-            for m in pattern_seq.finditer(struct.sequence)
-        ]
-        matches_ss = [
-            str(m.start() + start) + "-" + str(m.end() + len(m.group(1)) + start)
-            for m in pattern_ss.finditer(struct.structure)
-        ]
-        matches = list(set(matches_seq).intersection(set(matches_ss)))
-        # split each string in inter into a list of ints
-        matches = [list(map(int, i.split("-"))) for i in matches]
-        strand_matches.append(matches)
-    all_matches = list(itertools.product(*strand_matches))
-    return all_matches
+    return compile_query(sub).find(struct, start, end)
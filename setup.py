@@ -38,13 +38,24 @@ setup(
     py_modules=[
         "seq_tools/dataframe",
         "seq_tools/dot_bracket",
+        "seq_tools/edit_distance",
+        "seq_tools/encoding",
         "seq_tools/cli",
         "seq_tools/extinction_coeff",
+        "seq_tools/fileio",
+        "seq_tools/folding",
+        "seq_tools/lazy",
+        "seq_tools/library",
         "seq_tools/logger",
+        "seq_tools/packed",
+        "seq_tools/parallel",
+        "seq_tools/profiling",
         "seq_tools/sequence",
+        "seq_tools/server",
     ],
     include_package_data=True,
     install_requires=requirements,
+    extras_require={"arrow": ["pyarrow"]},
     zip_safe=False,
     keywords="seq_tools",
     classifiers=[
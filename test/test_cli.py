@@ -1,10 +1,13 @@
 """
 module to test the cli.py module
 """
+
+import json
 import os
 import pandas as pd
 from click.testing import CliRunner
-from seq_tools import cli
+from seq_tools import cli, dataframe, sequence
+from seq_tools.fileio import read_library, write_library
 
 resource_path = os.path.join(os.path.dirname(__file__), "resources")
 
@@ -87,3 +90,181 @@ def test_to_rna_single():
     runner = CliRunner()
     result = runner.invoke(cli.to_rna, ["GGGGTTTTCCCC"])
     assert result.exit_code == 0
+
+
+def test_has_p3(tmp_path):
+    """
+    Test has-p3 checks the 3' end and names the first failing rows
+    """
+    path = tmp_path / "test.csv"
+    pd.DataFrame(
+        {"name": ["a", "b", "c"], "sequence": ["GGAAC", "GGAAG", "CCAAC"]}
+    ).to_csv(path, index=False)
+    runner = CliRunner()
+    result = runner.invoke(cli.has_p3, [str(path), "-p3", "AAC", "-c", "1"])
+    assert result.exit_code == 0
+    assert "not present" in result.output
+    assert result.output.splitlines()[-1].endswith("first sequences without it: b")
+    result = runner.invoke(cli.has_p3, [str(path), "-p3", "C", "-c", "1"])
+    assert "not present" in result.output
+    result = runner.invoke(cli.has_p3, [str(path), "-p3", "A[CG]"])
+    assert "not present" in result.output
+
+
+def test_chunked_mixed_ntype(tmp_path):
+    """
+    Test a library mixing DNA and RNA is rejected when read in chunks
+    """
+    path = tmp_path / "mixed.csv"
+    seqs = ["GGGGTTTTCCCCAAAA"] * 3 + ["GGGGUUUUCCCCAAAA"] * 3
+    pd.DataFrame({"sequence": seqs}).to_csv(path, index=False)
+    runner = CliRunner()
+    for chunksize in [[], ["-c", "2"]]:
+        result = runner.invoke(
+            cli.mw, [str(path), "-o", str(tmp_path / "o.csv")] + chunksize
+        )
+        assert isinstance(result.exception, ValueError)
+        assert "Cannot determine nucleotide type" in str(result.exception)
+
+
+def test_chunksize():
+    """
+    Test that chunked output matches reading the whole file
+    """
+    runner = CliRunner()
+    path = os.path.join(resource_path, "test.csv")
+    result = runner.invoke(cli.mw, [path, "-o", "full.csv"])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.mw, [path, "-o", "chunked.csv", "-c", "4"])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[-1].startswith(
+        "SEQ_TOOLS.molecular_weight - INFO - avg molecular weight: "
+    )
+    df_full = pd.read_csv("full.csv")
+    df_chunked = pd.read_csv("chunked.csv")
+    os.remove("full.csv")
+    os.remove("chunked.csv")
+    assert df_full.equals(df_chunked)
+
+
+def test_run():
+    """
+    Test that a chain of steps matches running the commands one at a time
+    """
+    runner = CliRunner()
+    path = os.path.join(resource_path, "test.csv")
+    result = runner.invoke(cli.to_dna, [path, "-o", "dna.csv"])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.mw, ["dna.csv", "-o", "step.csv"])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.run, [path, "to-dna", "mw", "-o", "run.csv"])
+    assert result.exit_code == 0
+    with open("steps.json", "w", encoding="utf-8") as f:
+        f.write('{"steps": ["to-dna", {"step": "mw", "double_stranded": false}]}')
+    result = runner.invoke(
+        cli.run, [path, "-s", "steps.json", "-o", "spec.csv", "-c", "4"]
+    )
+    assert result.exit_code == 0
+    df_step = pd.read_csv("step.csv")
+    df_run = pd.read_csv("run.csv")
+    df_spec = pd.read_csv("spec.csv")
+    for f in ["dna.csv", "step.csv", "run.csv", "spec.csv", "steps.json"]:
+        os.remove(f)
+    assert df_run["mw"].equals(df_step["mw"])
+    assert df_run["sequence"].equals(df_step["sequence"])
+    assert df_spec.equals(df_run)
+    result = runner.invoke(cli.run, [path, "fly"])
+    assert result.exit_code != 0
+
+
+def test_fasta_input():
+    """
+    Test that commands accept fasta files
+    """
+    runner = CliRunner()
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    dataframe.to_fasta(df, "test_input.fa")
+    result = runner.invoke(cli.rc, ["test_input.fa", "-o", "rc.csv"])
+    assert result.exit_code == 0
+    df_rc = pd.read_csv("rc.csv")
+    os.remove("test_input.fa")
+    os.remove("rc.csv")
+    assert df_rc["name"].tolist() == df["name"].tolist()
+    assert df_rc["sequence"].tolist() == df["sequence"].tolist()
+    assert df_rc["rev_comp"].tolist() == [
+        sequence.get_reverse_complement(seq, "RNA") for seq in df["sequence"]
+    ]
+
+
+def test_gzipped_fasta_input(tmp_path):
+    """
+    Test that commands accept gzipped fasta files
+    """
+    runner = CliRunner()
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    path = str(tmp_path / "test_input.fa.gz")
+    write_library(df, path)
+    output = str(tmp_path / "rc.csv")
+    result = runner.invoke(cli.rc, [path, "-o", output])
+    assert result.exit_code == 0
+    df_rc = pd.read_csv(output)
+    assert df_rc["name"].tolist() == df["name"].tolist()
+    assert df_rc["rev_comp"].tolist() == [
+        sequence.get_reverse_complement(seq, "RNA") for seq in df["sequence"]
+    ]
+
+
+def test_profile():
+    """
+    Test the profile report of a command
+    """
+    runner = CliRunner()
+    path = os.path.join(resource_path, "test.csv")
+    result = runner.invoke(
+        cli.cli, ["--profile", "report.json", "mw", path, "-o", "mw.csv"]
+    )
+    assert result.exit_code == 0
+    with open("report.json", "r", encoding="utf-8") as f:
+        report = json.load(f)
+    os.remove("report.json")
+    os.remove("mw.csv")
+    assert report["operations"]["dataframe.get_molecular_weight"]["rows"] == 6
+
+
+def test_seqlib_input(tmp_path):
+    """
+    Test that commands read and write seqlib files
+    """
+    runner = CliRunner()
+    path = os.path.join(resource_path, "test.csv")
+    output = str(tmp_path / "mw.seqlib")
+    result = runner.invoke(cli.mw, [path, "-o", output])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.rc, [output, "-o", str(tmp_path / "rc.csv")])
+    assert result.exit_code == 0
+    df = pd.read_csv(path)
+    df_rc = pd.read_csv(tmp_path / "rc.csv")
+    assert df_rc["name"].tolist() == df["name"].tolist()
+    assert read_library(output)["mw"].notna().all()
+
+
+def test_fold_cache_limits(tmp_path):
+    """
+    Test the fold cache size limits can be set from the commandline
+    """
+    from seq_tools import folding
+
+    path = str(tmp_path / "folds.db")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.fold,
+        ["GGGGUUUUCCCC", "--cache", path, "--cache-max-memory", "5"]
+        + ["--cache-max-disk", "7"],
+    )
+    assert result.exit_code == 0
+    cache = folding.get_cache(path, 5, 7)
+    assert (cache.stats["misses"], len(cache)) == (1, 1)
+    # other users of the database keep the default limits
+    default = folding.get_cache(path)
+    assert default is not cache
+    assert (default.max_memory, default.max_disk) == (folding.DEFAULT_MAX_MEMORY, None)
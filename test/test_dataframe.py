@@ -1,6 +1,7 @@
 """
 module to test dataframe.py
 """
+
 import os
 import pytest
 import pandas as pd
@@ -8,12 +9,17 @@ from seq_tools.dataframe import (
     add,
     calc_edit_distance,
     determine_ntype,
+    find_seq_struct,
     fold,
     has_t7_promoter,
     has_5p_sequence,
     has_3p_sequence,
     has_seq_struct,
+    has_sequence,
     get_extinction_coeff,
+    get_nearest_neighbors,
+    get_ntypes,
+    get_sequence_features,
     get_molecular_weight,
     get_reverse_complement,
     to_dna,
@@ -23,8 +29,9 @@ from seq_tools.dataframe import (
     trim,
     transcribe,
 )
-from seq_tools.structure import SequenceStructure
-
+from seq_tools import sequence
+from seq_tools.folding import FoldCache
+from seq_tools.structure import KmerIndex, SequenceStructure, SequenceStructureQuery
 
 # generate test data ################################################################
 
@@ -67,6 +74,27 @@ def test_add():
     assert df["sequence"][0] == "AAAAGGGGTTTTCCCCCCCC"
 
 
+def test_add_fold_cache():
+    """
+    test adding the same flanks again takes every fold from the cache
+    """
+    seqs = ["GGGGAAAACCCC", "GGGGAAAAUUUU", "GAUCGGAAACGAUCAGUC"]
+    df = fold(pd.DataFrame({"sequence": seqs}), cache=False)
+    cache = FoldCache()
+    df_first = add(df, "CACACA", "ACACAC", cache=cache)
+    assert cache.stats["misses"] == 3
+    df_second = add(df, "CACACA", "ACACAC", cache=cache)
+    assert cache.stats["misses"] == 3
+    assert cache.stats["memory_hits"] == 3
+    df_full = fold(
+        pd.DataFrame({"sequence": ["CACACA" + s + "ACACAC" for s in seqs]}),
+        cache=False,
+    )
+    for col in ["sequence", "structure", "mfe", "ens_defect"]:
+        assert df_first[col].tolist() == df_full[col].tolist()
+        assert df_second[col].tolist() == df_full[col].tolist()
+
+
 def test_calc_edit_distance():
     """
     test calc_edit_distance function
@@ -82,6 +110,18 @@ def test_calc_edit_distance():
     assert val == 1
 
 
+def test_get_nearest_neighbors():
+    """
+    test get_nearest_neighbors function
+    """
+    df = get_test_data_dna()
+    df.loc[1] = ["seq_1", "GGGGTATTCCCC"]
+    df.loc[2] = ["seq_2", "GGGGTATTCCAA"]
+    df = get_nearest_neighbors(df)
+    assert df["edit_distance"].tolist() == [1, 1, 2]
+    assert df["nearest_neighbor"].tolist() == ["seq_1", "seq_0", "seq_1"]
+
+
 def test_determine_ntype():
     """
     test determine_ntype function
@@ -93,6 +133,17 @@ def test_determine_ntype():
     df = pd.concat([get_test_data_dna(), get_test_data_rna()])
     with pytest.raises(ValueError):
         determine_ntype(df)
+    with pytest.raises(ValueError):
+        determine_ntype(df, chunksize=1)
+    assert determine_ntype(df, sample=1) == "DNA"
+
+
+def test_get_ntypes():
+    """
+    test get_ntypes function
+    """
+    df = pd.DataFrame({"sequence": ["ACGT", "ACGU", "ACG", "", "UUTT"]})
+    assert get_ntypes(df).tolist() == ["DNA", "RNA", "UNCERTAIN", "UNCERTAIN", "DNA"]
 
 
 def test_fold():
@@ -142,6 +193,29 @@ def test_has_3p_sequence():
     assert not has_3p
 
 
+def test_return_failed():
+    """
+    test the predicates return the labels of the failing rows
+    """
+    df = pd.DataFrame(
+        {
+            "sequence": ["GGGGAAAACCCC", "AAAAGGGG", "GGGGCCCC"],
+            "structure": ["((((....))))", "........", "........"],
+        },
+        index=[10, 11, 12],
+    )
+    assert has_5p_sequence(df, "GGGG", return_failed=True)[1].tolist() == [11]
+    assert has_3p_sequence(df, "CCCC", return_failed=True)[1].tolist() == [11]
+    assert not has_sequence(df, "CCCC", return_failed=True)[0]
+    assert has_sequence(df, "AAAA", return_failed=True)[1].tolist() == [12]
+    passed, failed = has_t7_promoter(df, return_failed=True, max_failed=2)
+    assert not passed
+    assert failed.tolist() == [10, 11]
+    motif = SequenceStructure("GNNNNC", "(....)")
+    assert has_seq_struct(df, motif, return_failed=True)[1].tolist() == [11, 12]
+    assert has_seq_struct(df, motif, 2, "thread", True, 1)[1].tolist() == [11]
+
+
 def test_has_seq_struct():
     """
     test has_seq_struct function
@@ -149,6 +223,32 @@ def test_has_seq_struct():
     df = get_test_data_rna()
     has_struct = has_seq_struct(df, SequenceStructure("GUUUUC", "(....)"))
     assert has_struct
+    has_struct = has_seq_struct(df, SequenceStructure("GUUUUC", "......"))
+    assert not has_struct
+
+
+def test_find_seq_struct():
+    """
+    test find_seq_struct with and without a k-mer index
+    """
+    df = pd.DataFrame(
+        [
+            ["seq_0", "GGGGUUUUCCCC", "((((....))))"],
+            ["seq_1", "AAAAAAAAAAAA", "............"],
+            ["seq_2", "GUAAACGCAAAC", "(....)(....)"],
+        ],
+        columns=["name", "sequence", "structure"],
+    )
+    sub = SequenceStructure("GNAAAC", "(....)")
+    df_hits = find_seq_struct(df, sub)
+    assert df_hits["name"].tolist() == ["seq_2", "seq_2"]
+    assert df_hits["match"].tolist() == [([0, 6],), ([6, 12],)]
+    index = KmerIndex(df["sequence"], k=3)
+    assert index.get_candidates(SequenceStructureQuery(sub)).tolist() == [2]
+    df_hits_index = find_seq_struct(df, sub, index)
+    assert df_hits_index.equals(df_hits)
+    sub = SequenceStructure("GG&CC", "((&))")
+    assert len(find_seq_struct(df, sub, index)) == 9
 
 
 def test_get_extinction_coeff_dna():
@@ -191,6 +291,25 @@ def test_get_molecular_weight_rna():
     assert df["mw"][0] == 1034.6
 
 
+def test_get_molecular_weight_matches_sequence():
+    """
+    test the vectorized molecular weight matches the single sequence version
+    """
+    seqs = ["ATGATGATG", "ATGATGATGATG", "GGGGTTTTCCCC", "A", "", "AUGC"]
+    df = pd.DataFrame({"name": [f"seq_{i}" for i in range(6)], "sequence": seqs})
+    for double_stranded in [False, True]:
+        df_mw = get_molecular_weight(df, "DNA", double_stranded)
+        for seq, mw in zip(seqs, df_mw["mw"]):
+            expected = sequence.get_molecular_weight(seq, "DNA", double_stranded)
+            assert mw == pytest.approx(expected)
+    df_mw = get_molecular_weight(df, "RNA", False)
+    for seq, mw in zip(seqs, df_mw["mw"]):
+        assert mw == pytest.approx(sequence.get_molecular_weight(seq, "RNA"))
+    df.loc[6] = ["seq_6", "ACGN"]
+    with pytest.raises(ValueError):
+        get_molecular_weight(df, "DNA", False)
+
+
 def test_reverse_complement():
     """
     test reverse_complement function
@@ -200,6 +319,32 @@ def test_reverse_complement():
     assert df["sequence"][0] == "GGGGTTTTCCCC"
 
 
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_workers_match_serial(backend):
+    """
+    test the row-wise functions give the same rows in parallel
+    """
+    df = pd.DataFrame(
+        {
+            "sequence": ["GGGGUUUUCCCC", "GGAAACC", "ACGUACGU"] * 5,
+            "structure": ["((((....))))", "((...))", "........"] * 5,
+        }
+    )
+    motif = SequenceStructure("GNNNNC", "(....)")
+    for func, args in [
+        (get_extinction_coeff, ("RNA", False)),
+        (get_molecular_weight, ("RNA", False)),
+        (get_reverse_complement, ("RNA",)),
+    ]:
+        serial = func(df, *args)
+        assert serial.equals(func(df, *args, workers=2, backend=backend))
+    hits = find_seq_struct(df, motif)
+    assert hits.equals(find_seq_struct(df, motif, workers=2, backend=backend))
+    assert has_seq_struct(df, motif, workers=2, backend=backend) == has_seq_struct(
+        df, motif
+    )
+
+
 def test_to_dna():
     """
     test to_dna function
@@ -218,6 +363,31 @@ def test_to_dna_template():
     assert df["sequence"][0] == "TTCTAATACGACTCACTATAGGGGTTTTCCCC"
 
 
+@pytest.mark.parametrize("dtype", [None, object, "string"])
+def test_transforms_match_sequence(dtype):
+    """
+    test the column transforms give the same rows as the sequence functions,
+    including lower case and mixed bases
+    """
+    seqs = ["GGGGUUUUCCCC", "acgu", "", "TTUUNT", "GGAAAC"]
+    df = pd.DataFrame({"sequence": seqs})
+    if dtype is not None:
+        df = df.astype({"sequence": dtype})
+    expected = {
+        "add": ["GG" + s + "AA" for s in seqs],
+        "to_dna": [sequence.to_dna(s) for s in seqs],
+        "to_dna_template": [sequence.to_dna_template(s) for s in seqs],
+        "to_rna": [sequence.to_rna(s) for s in seqs],
+        "trim": [s[1:-2] for s in seqs],
+    }
+    assert add(df, "GG", "AA")["sequence"].tolist() == expected["add"]
+    assert to_dna(df)["sequence"].tolist() == expected["to_dna"]
+    assert to_dna_template(df)["sequence"].tolist() == expected["to_dna_template"]
+    assert to_rna(df)["sequence"].tolist() == expected["to_rna"]
+    assert trim(df, 1, 2)["sequence"].tolist() == expected["trim"]
+    assert df["sequence"].tolist() == seqs
+
+
 def test_to_fasta():
     """
     test to_fasta function
@@ -265,3 +435,25 @@ def test_transcribe():
     df.iloc[0]["sequence"] = "TTCTAATACGACTCACTATAGGGGTTTTCCCC"
     df = transcribe(df)
     assert df["sequence"][0] == "GGGGUUUUCCCC"
+
+
+def test_get_sequence_features():
+    """
+    test the feature table matches the per sequence functions
+    """
+    df = get_test_data_rna()
+    df_feat = get_sequence_features(df)
+    assert df_feat["length"].tolist() == [len(seq) for seq in df["sequence"]]
+    assert df_feat["max_stretch"].tolist() == [
+        sequence.get_max_stretch(seq) for seq in df["sequence"]
+    ]
+    gc_content = [
+        (seq.count("G") + seq.count("C")) / len(seq) for seq in df["sequence"]
+    ]
+    assert df_feat["gc_content"].tolist() == pytest.approx(gc_content)
+    assert df_feat["u_count"].tolist() == [seq.count("U") for seq in df["sequence"]]
+    assert (df_feat["other_count"] == 0).all()
+    df_dna = get_sequence_features(pd.DataFrame({"sequence": ["", "NNAT"]}), "DNA")
+    assert df_dna["gc_content"].tolist() == [0.0, 0.0]
+    assert df_dna["other_count"].tolist() == [0, 2]
+    assert df_dna["t_count"].tolist() == [0, 1]
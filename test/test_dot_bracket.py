@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from seq_tools import dot_bracket
 
 
@@ -13,3 +14,29 @@ def test_dot_bracket_2():
     ss = "((((....))))"
     pair_table = dot_bracket.dotbracket_to_pairtable(ss)
     assert pair_table[4] == -1
+
+
+def test_dot_bracket_pseudoknot():
+    ss = "((..[[..))..]]&.."
+    pair_table = dot_bracket.dotbracket_to_pairtable(ss)
+    assert pair_table[:6] == [9, 8, -1, -1, 13, 12]
+    assert len(pair_table) == 16
+    with pytest.raises(ValueError):
+        dot_bracket.dotbracket_to_pairtable("((.)")
+
+
+def test_dotbracket_to_pairtables():
+    structs = ["((()))", "((..[[..))..]]", "(.(&).)", ".)(.", "((.", "AA..aa"]
+    pairs, starts, lengths, errors = dot_bracket.dotbracket_to_pairtables(structs)
+    assert pairs.dtype == np.int32
+    assert errors.tolist() == [3, 4]
+    assert lengths.tolist() == [6, 14, 6, 4, 3, 6]
+    for i, ss in enumerate(structs):
+        row = pairs[starts[i] : starts[i] + lengths[i]].tolist()
+        if i in errors:
+            assert row == [-1] * lengths[i]
+        else:
+            assert row == dot_bracket.dotbracket_to_pairtable(ss)
+    matrix = dot_bracket.to_padded(pairs, starts, lengths)
+    assert matrix.shape == (6, 14)
+    assert matrix[0].tolist() == [5, 4, 3, 2, 1, 0] + [-2] * 8
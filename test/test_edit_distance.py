@@ -0,0 +1,72 @@
+"""
+module to test edit_distance.py
+"""
+
+import random
+
+import editdistance
+
+from seq_tools import edit_distance
+from seq_tools.edit_distance import QGramIndex, get_nearest_neighbors
+
+
+def get_random_library(n_seqs, seed=0) -> list:
+    """
+    generates a library of related sequences of different lengths
+    """
+    rng = random.Random(seed)
+    base = "".join(rng.choice("ACGU") for _ in range(30))
+    seqs = []
+    for _ in range(n_seqs):
+        seq = list(base)
+        for _ in range(rng.randint(0, 8)):
+            pos = rng.randrange(len(seq))
+            op = rng.choice(["sub", "ins", "del"])
+            if op == "sub":
+                seq[pos] = rng.choice("ACGU")
+            elif op == "ins":
+                seq.insert(pos, rng.choice("ACGU"))
+            else:
+                del seq[pos]
+        seqs.append("".join(seq))
+    return seqs
+
+
+def test_nearest_matches_all_pairs():
+    """
+    test the tree search finds the same distances as comparing all pairs
+    """
+    seqs = get_random_library(150) + ["ACGU", "ACGU"]
+    distances, ids = get_nearest_neighbors(seqs, q=4)
+    for i, seq in enumerate(seqs):
+        expected = min(
+            editdistance.eval(seq, other) for j, other in enumerate(seqs) if i != j
+        )
+        assert distances[i] == expected
+        assert ids[i] != i
+        assert editdistance.eval(seq, seqs[ids[i]]) == expected
+    assert distances[-1] == 0 and ids[-1] == len(seqs) - 2
+
+
+def test_nearest_max_distance():
+    """
+    test neighbours further than max_distance are not reported
+    """
+    distances, ids = get_nearest_neighbors(["AAAA", "CCCCCCCC"], max_distance=3)
+    assert distances.tolist() == [3, 3]
+    assert ids.tolist() == [-1, -1]
+    assert len(QGramIndex(["AAAA", "AAAA", "CC"])) == 3
+
+
+def test_nearest_parallel():
+    """
+    test searching in multiple processes gives the same result
+    """
+    seqs = get_random_library(60, seed=1)
+    serial = get_nearest_neighbors(seqs)
+    parallel = get_nearest_neighbors(seqs, workers=2)
+    assert serial[0].tolist() == parallel[0].tolist()
+    thread = get_nearest_neighbors(seqs, workers=2, backend="thread")
+    assert serial[0].tolist() == thread[0].tolist()
+    # the index only lives in the pool processes
+    assert edit_distance._WORKER_INDEX is None  # pylint: disable=protected-access
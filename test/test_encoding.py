@@ -0,0 +1,60 @@
+"""
+module to test encoding.py
+"""
+
+import numpy as np
+import pytest
+
+from seq_tools.encoding import (
+    INVALID_CODE,
+    count_codes,
+    encode,
+    from_byte_buffer,
+    get_translation_table,
+    segment_sum,
+    to_byte_buffer,
+    translate_arrow,
+)
+
+
+def test_byte_buffer_round_trip():
+    """
+    test that sequences survive being joined into a byte buffer
+    """
+    seqs = ["ACGT", "", "GG", "U", ""]
+    buffer, starts, lengths = to_byte_buffer(seqs)
+    assert len(buffer) == 7
+    assert starts.tolist() == [0, 4, 4, 6, 7]
+    assert from_byte_buffer(buffer, starts, lengths) == seqs
+
+
+def test_segment_sum():
+    """
+    test segment sums with empty rows at the start, middle and end
+    """
+    values = np.array([1, 2, 3, 4])
+    starts = np.array([0, 0, 2, 4, 4])
+    lengths = np.array([0, 2, 2, 0, 0])
+    assert segment_sum(values, starts, lengths).tolist() == [0, 3, 7, 0, 0]
+
+
+def test_count_codes():
+    """
+    test per sequence nucleotide counts
+    """
+    codes, starts, lengths = encode(["AACGT", "UUN", ""])
+    counts = count_codes(codes, starts, lengths)
+    assert counts[0].tolist() == [2, 1, 1, 1, 0]
+    assert counts[1].tolist() == [0, 0, 0, 2, 1]
+    assert counts[2].tolist() == [0] * (INVALID_CODE + 1)
+
+
+def test_translate_arrow():
+    """
+    test arrow strings are translated in place of their data buffer, keeping
+    nulls and slices
+    """
+    pa = pytest.importorskip("pyarrow")
+    array = pa.chunked_array([["AUUG", None, "uUc"], ["", "UUU"]])[1:]
+    table = get_translation_table({"U": "T"})
+    assert translate_arrow(array, table).to_pylist() == [None, "uTc", "", "TTT"]
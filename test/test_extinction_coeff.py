@@ -2,7 +2,7 @@
 test extinction coefficient module
 """
 
-from seq_tools.extinction_coeff import get_extinction_coeff
+from seq_tools.extinction_coeff import get_extinction_coeff, get_extinction_coeffs
 
 
 def test_ds_dna():
@@ -33,3 +33,22 @@ def test_rna_ss():
     assert c == 137100
     c = get_extinction_coeff(seq, "RNA", structure=ss)
     assert c == 113336
+
+
+def test_library_matches_single():
+    """
+    test the library level computation against get_extinction_coeff
+    """
+    dna_seqs = ["ACGT", "GGGGTTTTCCCC", "AT", "A", "TTTACGCGATCG"]
+    for double_stranded in [False, True]:
+        coeffs = get_extinction_coeffs(dna_seqs, "DNA", double_stranded)
+        for seq, coeff in zip(dna_seqs, coeffs):
+            assert coeff == get_extinction_coeff(seq, "DNA", double_stranded)
+    rna_seqs = ["AAAAAAAAUUUU", "GGGGUUUUCCCC", "ACGU", "GAUC"]
+    structs = ["((((....))))", "((((....))))", "....", "(())"]
+    coeffs = get_extinction_coeffs(rna_seqs, "RNA")
+    for seq, coeff in zip(rna_seqs, coeffs):
+        assert coeff == get_extinction_coeff(seq, "RNA")
+    coeffs = get_extinction_coeffs(rna_seqs, "RNA", structures=structs)
+    for seq, ss, coeff in zip(rna_seqs, structs, coeffs):
+        assert coeff == get_extinction_coeff(seq, "RNA", structure=ss)
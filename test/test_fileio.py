@@ -0,0 +1,134 @@
+"""
+module to test fileio.py
+"""
+
+import os
+import pandas as pd
+import pytest
+
+from seq_tools import fileio
+from seq_tools.fileio import (
+    LibraryWriter,
+    get_format,
+    read_library,
+    read_library_chunks,
+    write_library,
+)
+
+resource_path = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def get_test_data() -> pd.DataFrame:
+    """
+    get test library with an extra column
+    :return: pd.DataFrame
+    """
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    df["structure"] = ["." * len(seq) for seq in df["sequence"]]
+    return df
+
+
+def test_get_format():
+    """
+    test the format is picked from the extension
+    """
+    assert get_format("lib.csv") == "csv"
+    assert get_format("lib.PARQUET") == "parquet"
+    assert get_format("lib.feather") == "feather"
+    assert get_format("lib.txt") == "csv"
+    assert get_format("lib.fa.gz") == "fasta"
+    assert get_format("lib.FASTQ") == "fastq"
+    assert get_format("lib.seqlib") == "seqlib"
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet", "feather", "seqlib"])
+def test_round_trip(tmp_path, ext):
+    """
+    test writing and reading each format
+    """
+    pytest.importorskip("pyarrow")
+    df = get_test_data()
+    path = str(tmp_path / f"lib.{ext}")
+    write_library(df, path)
+    assert read_library(path).equals(df)
+    df_proj = read_library(path, ["name", "sequence", "missing"], memory_map=True)
+    assert list(df_proj.columns) == ["name", "sequence"]
+    assert df_proj.equals(df[["name", "sequence"]])
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet", "feather", "seqlib"])
+def test_chunks(tmp_path, ext):
+    """
+    test reading and writing a library a chunk at a time
+    """
+    pytest.importorskip("pyarrow")
+    df = get_test_data()
+    path = str(tmp_path / f"lib.{ext}")
+    with LibraryWriter(path) as writer:
+        writer.write(df[:4])
+        writer.write(df[4:])
+    chunks = list(read_library_chunks(path, 4, ["sequence"]))
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    df_read = pd.concat(chunks, ignore_index=True)
+    assert df_read.equals(df[["sequence"]])
+
+
+@pytest.mark.parametrize("ext", ["fa", "fasta.gz", "fq", "fastq.gz"])
+def test_sequence_formats(tmp_path, ext):
+    """
+    test writing and reading fasta and fastq files in chunks
+    """
+    df = get_test_data()[["name", "sequence"]]
+    if ext.startswith("fq") or ext.startswith("fastq"):
+        df["quality"] = ["I" * len(seq) for seq in df["sequence"]]
+    path = str(tmp_path / f"lib.{ext}")
+    with LibraryWriter(path) as writer:
+        writer.write(df[:4])
+        writer.write(df[4:])
+    assert read_library(path).equals(df)
+    chunks = list(read_library_chunks(path, 4, ["sequence"]))
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    assert pd.concat(chunks, ignore_index=True).equals(df[["sequence"]])
+
+
+def test_wrapped_fasta(tmp_path):
+    """
+    test fasta files with wrapped sequences, blank lines and windows newlines
+    """
+    path = tmp_path / "lib.fa"
+    path.write_bytes(b">seq_0 first\r\nGGGG\r\nAAAA\r\n\r\n>seq_1\r\nCCCC\r\n")
+    df = read_library(str(path))
+    assert df["name"].tolist() == ["seq_0 first", "seq_1"]
+    assert df["sequence"].tolist() == ["GGGGAAAA", "CCCC"]
+    path.write_text("GGGG\n")
+    with pytest.raises(ValueError):
+        read_library(str(path))
+
+
+@pytest.mark.parametrize("ext", ["fa", "fq"])
+@pytest.mark.parametrize("block_size", [7, 1 << 20])
+def test_crlf(monkeypatch, ext, block_size):
+    """
+    test windows line endings are not kept in names, sequences or qualities
+    """
+    monkeypatch.setattr(fileio, "BLOCK_SIZE", block_size)
+    path = os.path.join(resource_path, f"test_crlf.{ext}")
+    expected = pd.DataFrame(
+        {
+            "name": ["seq_0 first", "seq_1", "seq_2"],
+            "sequence": ["GGGGUUUUCCCC", "ACGUACGU", "GGAACC"],
+        }
+    )
+    if ext == "fq":
+        expected["quality"] = ["I" * len(seq) for seq in expected["sequence"]]
+    assert read_library(path).equals(expected)
+    chunks = list(read_library_chunks(path, 2))
+    assert pd.concat(chunks, ignore_index=True).equals(expected)
+    # the parsers do not rely on the file being opened with newline translation
+    # pylint: disable=protected-access
+    iter_records = fileio._iter_fasta if ext == "fa" else fileio._iter_fastq
+    with open(path, encoding="utf-8", newline="") as f:
+        records = [rec for recs in iter_records(f) for rec in zip(*recs)]
+    assert [list(values) for values in zip(*records)] == [
+        expected[col].tolist() for col in expected.columns
+    ]
@@ -0,0 +1,85 @@
+"""
+module to test folding.py
+"""
+
+import time
+
+import vienna
+
+from seq_tools import folding
+from seq_tools.folding import FoldCache, fold_sequences
+
+
+def test_fold_sequences():
+    """
+    test folding in parallel matches folding serially and keeps the order
+    """
+    seqs = ["GGGGUUUUCCCC", "GGGAAACCC", "AAAAAAAA", "GGGGUUUUCCCC"] * 3
+    serial = fold_sequences(seqs)
+    assert serial[0][0] == "((((....))))"
+    assert fold_sequences(seqs, workers=2, chunksize=2) == serial
+
+
+def test_fold_cache(tmp_path, monkeypatch):
+    """
+    test that cached sequences are not refolded
+    """
+    path = tmp_path / "folds.db"
+    results = fold_sequences(["GGGGUUUUCCCC", "GGGAAACCC"], cache=path)
+    cache = FoldCache(path)
+    assert len(cache) == 2
+    cache.close()
+    calls = []
+    vienna_fold = vienna.fold
+
+    def _fold(seq):
+        calls.append(seq)
+        return vienna_fold(seq)
+
+    monkeypatch.setattr(vienna, "fold", _fold)
+    monkeypatch.setenv(folding.FOLD_CACHE_ENV, str(path))
+    new_results = fold_sequences(["GGGAAACCC", "GGGGUUUUCCCC", "AAAAAAAA"])
+    assert calls == ["AAAAAAAA"]
+    assert new_results[:2] == results[::-1]
+
+
+def test_fold_cache_tiers(tmp_path):
+    """
+    test eviction from both tiers and the hit and miss counts
+    """
+    seqs = ["GGGGUUUUCCCC", "GGGAAACCC", "AAAAAAAA"]
+    cache = FoldCache(tmp_path / "folds.db", max_memory=2, max_disk=2)
+    results = fold_sequences(seqs, cache=cache)
+    stats = cache.get_stats()
+    assert stats["misses"] == 3
+    assert stats["memory_size"] == 2
+    assert stats["disk_size"] == 2
+    # the first sequence was evicted from both tiers
+    assert fold_sequences(seqs[1:], cache=cache) == results[1:]
+    assert cache.get_stats()["memory_hits"] == 2
+    assert cache.get_many(seqs[:1]) == {}
+    cache.close()
+    memory_cache = FoldCache(max_memory=10)
+    fold_sequences(seqs + seqs, cache=memory_cache)
+    fold_sequences(seqs, cache=memory_cache)
+    stats = memory_cache.get_stats()
+    assert (stats["memory_hits"], stats["misses"]) == (3, 3)
+    assert stats["hit_rate"] == 0.5
+    assert len(memory_cache) == 3
+
+
+def test_fold_cache_memory_hits_keep_disk_entries(tmp_path):
+    """
+    test folds served from memory are not the first evicted from disk
+    """
+    path = tmp_path / "folds.db"
+    cache = FoldCache(path, max_memory=10, max_disk=2)
+    fold_sequences(["GGGGUUUUCCCC", "GGGAAACCC"], cache=cache)
+    time.sleep(0.01)
+    assert fold_sequences(["GGGGUUUUCCCC"], cache=cache)
+    assert cache.get_stats()["memory_hits"] == 1
+    fold_sequences(["AAAAAAAA"], cache=cache)
+    cache.close()
+    disk_cache = FoldCache(path, max_memory=0)
+    assert set(disk_cache.get_many(["GGGGUUUUCCCC", "GGGAAACCC"])) == {"GGGGUUUUCCCC"}
+    disk_cache.close()
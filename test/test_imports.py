@@ -0,0 +1,87 @@
+"""
+test that importing seq_tools stays fast, heavy dependencies must only be
+imported by the functions that need them
+"""
+
+import os
+import subprocess
+import sys
+
+# cumulative import time of seq_tools.cli in seconds, click alone takes
+# about 0.04s and pandas alone over 0.3s
+CLI_IMPORT_BUDGET = 0.15
+HEAVY_MODULES = ["pandas", "vienna", "tabulate", "editdistance"]
+
+
+def run_python(code, *args) -> subprocess.CompletedProcess:
+    """
+    runs python code in a fresh interpreter with seq_tools importable
+    """
+    root = os.path.join(os.path.dirname(__file__), "..")
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(root))
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+
+
+def get_loaded(code) -> set:
+    """
+    returns which heavy modules are loaded after running code
+    """
+    res = run_python(
+        code + "\nimport sys\nprint(' '.join(m for m in sys.modules if '.' not in m))"
+    )
+    return set(res.stdout.split()) & set(HEAVY_MODULES)
+
+
+def test_import_does_not_load_dependencies():
+    """
+    Test that importing the package, cli and sequence functions does not load
+    pandas or vienna
+    """
+    assert get_loaded("import seq_tools") == set()
+    assert get_loaded("from seq_tools import cli") == set()
+    assert get_loaded("from seq_tools import sequence") == set()
+
+
+def test_help_does_not_load_dependencies():
+    """
+    Test that `seq-tools --help` only needs click
+    """
+    code = (
+        "from seq_tools.cli import cli\n"
+        "try:\n"
+        "    cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    assert get_loaded(code) == set()
+
+
+def test_lazy_exports():
+    """
+    Test that the public names are still available from the package
+    """
+    res = run_python(
+        "import seq_tools\n"
+        "print(seq_tools.get_reverse_complement.__module__)\n"
+        "print(set(seq_tools.__all__) <= set(dir(seq_tools)))"
+    )
+    assert res.stdout.split() == ["seq_tools.dataframe", "True"]
+
+
+def test_cli_import_time():
+    """
+    Test the import time of the cli is within its budget
+    """
+    res = run_python("import seq_tools.cli", "-X", "importtime")
+    for line in res.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if fields[-1] == "seq_tools.cli":
+            assert int(fields[1]) / 1e6 < CLI_IMPORT_BUDGET
+            return
+    raise AssertionError("seq_tools.cli not found in import times")
@@ -0,0 +1,142 @@
+"""
+module to test lazy.py
+"""
+
+import os
+import pandas as pd
+import pytest
+
+from seq_tools import dataframe, lazy
+from seq_tools.lazy import pipeline
+
+resource_path = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def get_test_data_template() -> pd.DataFrame:
+    """
+    get test DNA templates with a T7 promoter
+    :return: pd.DataFrame
+    """
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    return dataframe.to_dna_template(df)
+
+
+def test_matches_dataframe():
+    """
+    test a chain gives the same dataframe as the eager functions
+    """
+    df = get_test_data_template()
+    df_eager = dataframe.transcribe(df)
+    df_eager = dataframe.trim(df_eager, 2, 3)
+    df_eager = dataframe.get_molecular_weight(df_eager, "RNA", False)
+    df_eager = dataframe.get_extinction_coeff(df_eager, "RNA", False)
+    df_lazy = pipeline(df).transcribe().trim(2, 3).mw("RNA").ec("RNA").collect()
+    assert df_lazy.equals(df_eager)
+
+
+def test_structure_dropped():
+    """
+    test to_dna drops a structure added by an earlier fold
+    """
+    df = get_test_data_template()
+    df_eager = dataframe.add(dataframe.fold(df), "GG", "CC")
+    df_eager = dataframe.get_reverse_complement(dataframe.to_dna(df_eager), "DNA")
+    df_lazy = pipeline(df).fold().add("GG", "CC").to_dna().rc("DNA").collect()
+    assert df_lazy.equals(df_eager)
+
+
+def test_refold_column_order():
+    """
+    test refolding keeps the columns in the same order as the eager functions
+    """
+    df = get_test_data_template()
+    df_eager = dataframe.add(dataframe.fold(df), "GG", "CC")
+    df_eager = dataframe.trim(dataframe.add(df_eager, "A", "A"), 1, 1)
+    df_lazy = pipeline(df).fold().add("GG", "CC").add("A", "A").trim(1, 1).collect()
+    assert list(df_lazy.columns) == list(df_eager.columns)
+    assert df_lazy.equals(df_eager)
+    df_eager = dataframe.add(df_eager, "GG", "CC")
+    df_lazy = pipeline(df_lazy).add("GG", "CC").collect()
+    assert list(df_lazy.columns) == list(df_eager.columns)
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_fused_transforms(dtype):
+    """
+    test consecutive transforms are merged and match the eager functions
+    """
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    df["sequence"] = df["sequence"].astype(dtype)
+    transforms = []
+    for kind, arg in [
+        ("add", ("GG", "UU")),
+        ("translate", {"U": "T"}),
+        ("add", ("T", "")),
+        ("translate", {"T": "U"}),
+        ("trim", (1, 2)),
+        ("trim", (3, 0)),
+    ]:
+        lazy._push(transforms, kind, arg)  # pylint: disable=protected-access
+    assert [kind for kind, _ in transforms] == ["translate", "add", "trim"]
+    assert transforms[1][1] == ("UGG", "UU")
+    df_eager = dataframe.add(df, "GG", "UU")
+    df_eager = dataframe.add(dataframe.to_dna(df_eager), "T", "")
+    df_eager = dataframe.trim(dataframe.to_rna(df_eager), 4, 2)
+    chain = pipeline(df).add("GG", "UU").to_dna().add("T", "").to_rna().trim(1, 2)
+    df_lazy = chain.trim(3, 0).collect()
+    assert df_lazy["sequence"].tolist() == df_eager["sequence"].tolist()
+
+
+def test_lazy():
+    """
+    test steps are only run at collect and the input is not modified
+    """
+    df = get_test_data_template()
+    df_orig = df.copy()
+    chain = pipeline(df).trim(20, 0).to_rna()
+    assert repr(chain) == "Pipeline(6 sequences: trim -> to_rna)"
+    df_out = chain.length().collect()
+    assert df.equals(df_orig)
+    assert (
+        df_out["sequence"].tolist()
+        == pd.read_csv(os.path.join(resource_path, "test.csv"))["sequence"].tolist()
+    )
+    with pytest.raises(ValueError):
+        pipeline(df_out).transcribe().collect()
+
+
+def test_parse_step():
+    """
+    Test parsing of chained step strings
+    """
+    assert lazy.parse_step("trim:20,0") == ("trim", {"p5_length": 20, "p3_length": 0})
+    assert lazy.parse_step("to-dna-template") == ("to_dna_template", {})
+    name, kwargs = lazy.parse_step("mw:ntype=RNA,double_stranded=true")
+    assert name == "mw"
+    assert kwargs == {"ntype": "RNA", "double_stranded": True}
+    with pytest.raises(ValueError):
+        lazy.parse_step("trim:1,2,3")
+    with pytest.raises(ValueError):
+        lazy.parse_step("fly")
+
+
+def test_load_steps(tmp_path):
+    """
+    Test dictionary steps bind their keys as arguments
+    """
+    path = tmp_path / "steps.json"
+    path.write_text(
+        '{"steps": [{"step": "trim", "p5_length": 2, "p3_length": 0},'
+        ' {"step": "mw:ntype=RNA", "double_stranded": true}, "to-dna"]}'
+    )
+    assert lazy.load_steps(str(path)) == [
+        ("trim", {"p5_length": 2, "p3_length": 0}),
+        ("mw", {"ntype": "RNA", "double_stranded": True}),
+        ("to_dna", {}),
+    ]
+    path.write_text('[{"step": "trim", "p5_length": 2}]')
+    with pytest.raises(ValueError):
+        lazy.load_steps(str(path))
+    path.write_text('[{"step": "trim", "p5_length": 2, "p3_length": 0, "x": 1}]')
+    with pytest.raises(ValueError):
+        lazy.load_steps(str(path))
@@ -0,0 +1,123 @@
+"""
+module to test library.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from seq_tools.fileio import LibraryWriter, read_library, write_library
+from seq_tools.library import LibraryFileWriter, SequenceLibrary, _build_index
+
+
+def get_test_data() -> pd.DataFrame:
+    """
+    get a library with every kind of column
+    :return: pd.DataFrame
+    """
+    return pd.DataFrame(
+        {
+            "name": ["a", "b", "c", "d_é", "a"],
+            "sequence": ["ACGU", "GGNUU", "", "acgT", "UUUUT"],
+            "structure": ["....", None, "", "....", "....."],
+            "mfe": [-1.5, 0.0, 0.0, -2.25, -3.0],
+            "count": [1, 2, 3, 4, 5],
+            "keep": [True, False, True, True, False],
+        }
+    )
+
+
+def test_round_trip(tmp_path):
+    """
+    test every column type is read back exactly
+    """
+    df = get_test_data()
+    path = str(tmp_path / "lib.seqlib")
+    write_library(df, path)
+    pd.testing.assert_frame_equal(read_library(path), df)
+
+
+def test_chunks(tmp_path):
+    """
+    test writing in chunks keeps sequences and the index aligned
+    """
+    df = get_test_data()
+    path = str(tmp_path / "lib.seqlib")
+    with LibraryWriter(path) as writer:
+        writer.write(df[:3])
+        writer.write(df[3:])
+    with SequenceLibrary(path) as lib:
+        assert len(lib) == 5
+        df_read = pd.concat(lib.iter_chunks(2, ["name", "sequence"]))
+        assert df_read.equals(df[["name", "sequence"]])
+
+
+def test_failed_write(tmp_path):
+    """
+    test an error while writing leaves no library or temporary files behind
+    """
+    df = get_test_data()
+    path = str(tmp_path / "lib.seqlib")
+    with pytest.raises(ValueError):
+        with LibraryWriter(path) as writer:
+            writer.write(df[:3])
+            writer.write(df[["name", "sequence"]])
+    assert not list(tmp_path.iterdir())
+    with pytest.raises(RuntimeError):
+        with LibraryFileWriter(path) as writer:
+            writer.write(df)
+            raise RuntimeError("conversion failed")
+    assert not list(tmp_path.iterdir())
+
+
+def test_lookup(tmp_path):
+    """
+    test rows are found by name and position
+    """
+    df = get_test_data()
+    path = str(tmp_path / "lib.seqlib")
+    write_library(df, path)
+    with SequenceLibrary(path) as lib:
+        assert lib.get_row("c") == 2
+        assert lib.get_row("d_é") == 3
+        # duplicate names resolve to the first row
+        assert lib.get_row("a") == 0
+        assert "e" not in lib
+        with pytest.raises(KeyError):
+            lib.get_row("e")
+        assert lib["b"]["sequence"] == "GGNUU"
+        assert lib[4]["sequence"] == "UUUUT"
+        df_hits = lib.lookup(["d_é", "b"], ["sequence", "count"])
+        assert df_hits.index.tolist() == [3, 1]
+        assert df_hits["sequence"].tolist() == ["acgT", "GGNUU"]
+        assert df_hits["count"].tolist() == [4, 2]
+        assert lib[1:4]["name"].tolist() == ["b", "c", "d_é"]
+
+
+def test_build_index():
+    """
+    test every row with a hash can be found by probing
+    """
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 64, 100)
+    hashes[5] = -1
+    table = _build_index(hashes)
+    mask = len(table) - 1
+    for row, value in enumerate(hashes):
+        if value < 0:
+            assert row + 1 not in table
+            continue
+        slot = value & mask
+        while table[slot] != row + 1:
+            assert table[slot] != 0
+            slot = (slot + 1) & mask
+
+
+def test_not_a_library(tmp_path):
+    """
+    test other files are rejected
+    """
+    path = tmp_path / "lib.seqlib"
+    path.write_text("name,sequence\n")
+    with pytest.raises(ValueError):
+        SequenceLibrary(str(path))
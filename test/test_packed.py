@@ -0,0 +1,99 @@
+"""
+module to test packed.py
+"""
+
+import numpy as np
+import pytest
+
+from seq_tools import sequence
+from seq_tools.dataframe import from_packed, to_packed
+from seq_tools.packed import PackedSequenceArray
+
+SEQS = ["GGGGUUUUCCCC", "", "ACGUNACGU", "A", "GCRYAU"]
+
+
+def test_round_trip():
+    """
+    test sequences are unpacked exactly, including ambiguous bases
+    """
+    packed = PackedSequenceArray.from_sequences(SEQS)
+    assert packed.ntype == "RNA"
+    assert len(packed) == 5
+    assert packed.to_list() == SEQS
+    assert packed[2] == "ACGUNACGU"
+    assert packed[-1] == "GCRYAU"
+    assert packed.get_lengths().tolist() == [12, 0, 9, 1, 6]
+    assert packed.data.nbytes == 7
+
+
+def test_mixed_ntype():
+    """
+    test T and U in the same library need an explicit ntype
+    """
+    with pytest.raises(ValueError):
+        PackedSequenceArray.from_sequences(["ACGT", "ACGU"])
+    packed = PackedSequenceArray.from_sequences(["ACGT", "ACGU"], "DNA")
+    assert packed.to_list() == ["ACGT", "ACGT"]
+
+
+def test_select_and_trim():
+    """
+    test selecting rows and trimming ends share the buffer
+    """
+    packed = PackedSequenceArray.from_sequences(SEQS)
+    subset = packed[np.array([4, 0])]
+    assert subset.data is packed.data
+    assert subset.to_list() == ["GCRYAU", "GGGGUUUUCCCC"]
+    assert packed[1:3].to_list() == ["", "ACGUNACGU"]
+    assert packed.trim(2, 1).to_list() == ["GGUUUUCCC", "", "GUNACG", "", "RYA"]
+
+
+def test_conversions():
+    """
+    test reverse complement, to_dna and to_rna match the str functions
+    """
+    packed = PackedSequenceArray.from_sequences(SEQS[:2] + ["AUG"])
+    expected = [sequence.get_reverse_complement(s, "RNA") for s in packed]
+    assert sequence.get_reverse_complement(packed, "RNA").to_list() == expected
+    assert sequence.to_dna(packed).to_list() == [sequence.to_dna(s) for s in packed]
+    assert sequence.to_rna(sequence.to_dna(packed)).to_list() == packed.to_list()
+    ambig = PackedSequenceArray.from_sequences(["ARNG"])
+    assert ambig.get_reverse_complement().to_list() == ["CNYT"]
+
+
+@pytest.mark.parametrize("ntype", ["DNA", "RNA"])
+def test_reverse_complement_mixed_case(ntype):
+    """
+    test lowercase and ambiguous bases are complemented like the str path
+    """
+    rng = np.random.default_rng(0)
+    t_or_u = "U" if ntype == "RNA" else "T"
+    bases = list("ACG" + t_or_u + "acg" + t_or_u.lower() + "RYnk")
+    seqs = ["".join(rng.choice(bases, rng.integers(0, 30))) for _ in range(200)]
+    packed = PackedSequenceArray.from_sequences(seqs, ntype)
+    expected = [sequence.get_reverse_complement(s, ntype) for s in seqs]
+    assert sequence.get_reverse_complement(packed, ntype).to_list() == expected
+
+
+def test_gc_and_molecular_weight():
+    """
+    test counting and weights computed from the packed codes
+    """
+    packed = PackedSequenceArray.from_sequences(["GGGGTTTTCCCC", "ATSG", ""])
+    assert packed.get_gc_count().tolist() == [8, 1, 0]
+    packed = packed[[0, 2]]
+    weights = sequence.get_molecular_weight(packed, "DNA", True)
+    assert weights[0] == pytest.approx(
+        sequence.get_molecular_weight("GGGGTTTTCCCC", "DNA")
+        + sequence.get_molecular_weight("GGGGAAAACCCC", "DNA")
+    )
+    assert weights[1] == 0
+
+
+def test_dataframe():
+    """
+    test packing a dataframe and back
+    """
+    df = from_packed(PackedSequenceArray.from_sequences(SEQS))
+    assert df["name"].tolist()[:2] == ["seq_0", "seq_1"]
+    assert to_packed(df).to_list() == SEQS
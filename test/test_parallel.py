@@ -0,0 +1,39 @@
+"""
+module to test parallel.py
+"""
+
+import functools
+
+import pytest
+
+from seq_tools.parallel import map_chunks, map_columns
+
+
+def _add_chunk(values, others, *, offset) -> list:
+    return [a + b + offset for a, b in zip(values, others)]
+
+
+@pytest.mark.parametrize("backend", ["serial", "thread", "process"])
+def test_map_columns(backend):
+    """
+    test chunks of several columns are reassembled in order
+    """
+    func = functools.partial(_add_chunk, offset=100)
+    values = list(range(50))
+    results = map_columns(func, [values, values], 2, 7, backend)
+    assert results == [2 * v + 100 for v in values]
+
+
+def test_map_columns_empty():
+    """
+    test empty columns still call func once
+    """
+    assert map_columns(lambda seqs: [], [[]], 4, backend="thread") == []
+
+
+def test_map_chunks_backend():
+    """
+    test unknown backends are rejected
+    """
+    with pytest.raises(ValueError):
+        map_chunks(len, [1, 2], backend="cluster")
@@ -0,0 +1,69 @@
+"""
+module to test profiling.py
+"""
+
+import json
+import os
+import pstats
+
+import pandas as pd
+
+from seq_tools import dataframe
+from seq_tools.folding import FoldCache
+from seq_tools.profiling import profile
+
+resource_path = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def test_profile(tmp_path):
+    """
+    test operations are recorded only while profiling
+    """
+    df = pd.read_csv(os.path.join(resource_path, "test.csv"))
+    dataframe.get_molecular_weight(df, "RNA", False)
+    report_path = tmp_path / "report.json"
+    cprofile_path = tmp_path / "run.prof"
+    with profile(report_path, cprofile_path) as prof:
+        dataframe.get_molecular_weight(df, "RNA", False)
+        dataframe.get_molecular_weight(df, "RNA", False)
+        dataframe.add(df, "GGAA", "", cache=FoldCache())
+    report = prof.get_report()
+    mw = report["operations"]["dataframe.get_molecular_weight"]
+    assert mw["calls"] == 2
+    assert mw["rows"] == 2 * len(df)
+    assert mw["rows_per_second"] > 0
+    assert mw["peak_mb"] > 0
+    # add only refolds sequences that have a structure
+    assert report["operations"]["dataframe.add"]["calls"] == 1
+    assert "dataframe.fold" not in report["operations"]
+    with open(report_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["operations"].keys() == report["operations"].keys()
+    assert pstats.Stats(str(cprofile_path)).total_calls > 0
+
+
+def test_profile_fold_cache():
+    """
+    test fold cache hits are reported for operations that fold
+    """
+    df = pd.DataFrame({"name": ["a", "b"], "sequence": ["GGGGUUUUCCCC"] * 2})
+    with profile(memory=False) as prof:
+        dataframe.fold(df)
+        dataframe.fold(df)
+    fold = prof.get_report()["operations"]["dataframe.fold"]
+    assert fold["calls"] == 2
+    assert fold["cache_hits"] >= 1
+    assert 0 < fold["cache_hit_rate"] <= 1
+
+
+def test_profile_explicit_fold_cache():
+    """
+    test hits of a cache passed to the operation are reported
+    """
+    df = pd.DataFrame({"name": ["a", "b"], "sequence": ["GGGAAACCCAUG"] * 2})
+    cache = FoldCache(max_memory=10)
+    with profile(memory=False) as prof:
+        dataframe.fold(df, cache=cache)
+        dataframe.fold(df, cache=cache)
+    fold = prof.get_report()["operations"]["dataframe.fold"]
+    assert (fold["cache_hits"], fold["cache_misses"]) == (1, 1)
+    assert fold["cache_hit_rate"] == 0.5
@@ -2,12 +2,16 @@
 module to test sequence.py
 """
 
+import pytest
+
 from seq_tools.sequence import (
     to_dna,
     to_rna,
     get_reverse_complement,
+    get_reverse_complements,
     get_molecular_weight,
     get_max_stretch,
+    get_max_stretches,
 )
 
 
@@ -37,6 +41,22 @@ def test_get_reverse_complement():
     assert get_reverse_complement("CAU", "RNA") == "AUG"
     assert get_reverse_complement("ATGATGATG") == "CATCATCAT"
     assert get_reverse_complement("ATGATGATGATG") == "CATCATCATCAT"
+    assert get_reverse_complement("ATGNRY") == "RYNCAT"
+    assert get_reverse_complement("AUG") == "CAT"
+    with pytest.raises(ValueError):
+        get_reverse_complement("ATGX")
+
+
+def test_get_reverse_complements():
+    """
+    test the batch reverse complement matches the single sequence version
+    """
+    seqs = ["AUG", "", "GGGGUUUUCCCC", "A", "ACGUKM"]
+    expected = [get_reverse_complement(seq, "RNA") for seq in seqs]
+    assert get_reverse_complements(seqs, "RNA") == expected
+    assert get_reverse_complements(["ATG", "TTA"]) == ["CAT", "TAA"]
+    with pytest.raises(ValueError):
+        get_reverse_complements(["ATG", "AXG"])
 
 
 def test_get_molecular_weight():
@@ -59,3 +79,12 @@ def test_get_max_stretch():
     assert get_max_stretch("CAU") == 1
     assert get_max_stretch("AGGA") == 2
     assert get_max_stretch("AAAACCC") == 4
+
+
+def test_get_max_stretches():
+    """
+    test the batched version matches get_max_stretch
+    """
+    seqs = ["AUG", "", "AGGA", "AAAACCC", "C", "CCGGGGG", "AAAA"]
+    expected = [get_max_stretch(seq) for seq in seqs]
+    assert get_max_stretches(seqs).tolist() == expected
@@ -0,0 +1,130 @@
+"""
+module to test server.py
+"""
+
+import io
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+from seq_tools import dataframe, folding
+from seq_tools.server import Client, Server, serve_socket, serve_stdio
+
+resource_path = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def test_single_sequence():
+    """
+    Test that single sequences give the same results as the dataframe functions
+    """
+    server = Server()
+    seq = "GGGGUUUUCCCC"
+    df = pd.DataFrame({"name": ["seq"], "sequence": [seq]})
+    res = server.handle({"args": ["mw", seq]})
+    assert res["ok"]
+    expected = dataframe.get_molecular_weight(df, "RNA", False)["mw"][0]
+    assert res["result"]["mw"] == expected
+    res = server.handle({"args": ["ec", seq, "-ds"]})
+    expected = dataframe.get_extinction_coeff(df, "RNA", True)
+    assert res["result"]["extinction_coeff"] == expected["extinction_coeff"][0]
+    res = server.handle({"args": ["rc", "GGGGTTTT", "-nt", "DNA"], "id": 3})
+    assert res["result"]["rev_comp"] == "AAAACCCC"
+    assert res["id"] == 3
+    res = server.handle({"args": ["to-dna", seq]})
+    assert res["result"]["sequence"] == "GGGGTTTTCCCC"
+
+
+def test_errors():
+    """
+    Test that bad requests return errors instead of stopping the server
+    """
+    server = Server()
+    assert not server.handle({"args": ["not-a-command"]})["ok"]
+    assert not server.handle({"args": ["mw", "GGGG", "-nt", "XNA"]})["ok"]
+    assert not json.loads(server.handle_line("{not json"))["ok"]
+
+
+def test_help_and_usage(capsys):
+    """
+    Test that help and usage errors are returned and never printed
+    """
+    server = Server()
+    res = server.handle({"args": ["mw", "--help"]})
+    assert res["ok"]
+    assert res["output"].startswith("Usage: seq-tools mw [OPTIONS] DATA")
+    res = server.handle({"args": ["rc", "GGGG", "--bogus"]})
+    assert not res["ok"]
+    assert res["error"].startswith("Usage: seq-tools rc [OPTIONS] DATA")
+    assert "No such option" in res["error"]
+    assert server.handle({"args": ["run", "--help"]})["output"].startswith("Usage:")
+    assert capsys.readouterr().out == ""
+
+
+def test_fold_cache_limits(tmp_path):
+    """
+    Test the fast fold path uses the cache the fold command would use
+    """
+    server = Server()
+    args = ["fold", "GGGGUUUUCCCC", "--cache", "folds.db"]
+    res = server.handle(
+        {"args": args + ["--cache-max-memory", "3"], "cwd": str(tmp_path)}
+    )
+    assert res["result"]["structure"] == "((((....))))"
+    cache = folding.get_cache(str(tmp_path / "folds.db"), 3)
+    assert (cache.stats["misses"], len(cache)) == (1, 1)
+    server.handle({"args": args + ["--cache-max-memory", "3"], "cwd": str(tmp_path)})
+    assert cache.stats["memory_hits"] == 1
+
+
+def test_file_command():
+    """
+    Test that commands on files run the full command in the request directory
+    """
+    server = Server()
+    path = os.path.join(resource_path, "test.csv")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        res = server.handle({"args": ["mw", path, "-o", "out.csv"], "cwd": tmp_dir})
+        assert res["ok"]
+        assert "avg molecular weight" in res["output"]
+        df = pd.read_csv(os.path.join(tmp_dir, "out.csv"))
+    assert "mw" in df.columns
+
+
+def test_stdio():
+    """
+    Test serving json lines from a stream
+    """
+    requests = [{"args": ["rc", "GGGGTTTT"], "id": i} for i in range(3)]
+    stdin = io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n")
+    stdout = io.StringIO()
+    serve_stdio(stdin=stdin, stdout=stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == [0, 1, 2]
+    assert all(r["result"]["rev_comp"] == "AAAACCCC" for r in responses)
+
+
+def test_socket():
+    """
+    Test a client talking to a server over a unix socket
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "seq_tools.sock")
+        ready = threading.Event()
+        thread = threading.Thread(
+            target=serve_socket, args=(path,), kwargs={"ready": ready}, daemon=True
+        )
+        thread.start()
+        assert ready.wait(10)
+        try:
+            with Client(path) as client:
+                for _ in range(3):
+                    res = client.call(["mw", "GGGGUUUUCCCC"])
+                    assert res["ok"]
+                    assert res["result"]["mw"] > 0
+        finally:
+            ready.server.shutdown()
+            thread.join(10)
+        assert not os.path.exists(path)
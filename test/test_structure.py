@@ -2,7 +2,13 @@
 test structure module for seq_tools
 """
 import pytest
-from seq_tools.structure import SequenceStructure, find
+from seq_tools.structure import (
+    KmerIndex,
+    SequenceStructure,
+    SequenceStructureQuery,
+    compile_query,
+    find,
+)
 
 
 def test_init():
@@ -111,3 +117,28 @@ def test_failure():
     sub = SequenceStructure("GGGAAACU", "((....))")
     r = find(struct, sub)
     print(r)
+
+
+def test_query():
+    """
+    test a compiled query is reused and stops at the first match
+    """
+    sub = SequenceStructure("GG&CC", "((&))")
+    assert compile_query(sub) is compile_query(sub)
+    query = SequenceStructureQuery(sub)
+    assert query.get_anchors() == ["GG", "CC"]
+    assert query.has_match(SequenceStructure("GGGAAACCC", "(((...)))"))
+    assert not query.has_match(SequenceStructure("GGGAAACCC", "........."))
+    query = SequenceStructureQuery(SequenceStructure("GNNC", "(..)"))
+    assert query.find(SequenceStructure("AGAUCA", ".(..).")) == [([1, 5],)]
+
+
+def test_kmer_index():
+    """
+    test rows are found from the k-mers they contain
+    """
+    index = KmerIndex(["GGGAAACCC", "AAAA", "UUNAA", "AC"], k=3)
+    assert index.get_rows("AAA").tolist() == [0, 1]
+    assert index.get_rows("AAC").tolist() == [0]
+    assert index.get_rows("UUA").tolist() == []
+    assert index.get_rows("ACC").tolist() == [0]